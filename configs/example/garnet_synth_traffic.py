@@ -32,12 +32,14 @@ import m5
 from m5.objects import *
 from m5.defines import buildEnv
 from m5.util import addToPath
-import os, optparse, sys
+import math, os, optparse, sys
 
 addToPath('../')
+addToPath('../../util')
 
 from common import Options
 from ruby import Ruby
+from garnetstats import readNewDumps
 
 # Get paths we might need.  It's expected this file is in m5/configs/example.
 config_path = os.path.dirname(os.path.abspath(__file__))
@@ -65,6 +67,28 @@ parser.add_option("--precision", type="int", default=3,
 parser.add_option("--sim-cycles", type="int", default=1000,
                    help="Number of simulation cycles")
 
+parser.add_option("--warmup-cycles", type="int", default=0,
+                  help="Number of cycles simulated before the statistics\
+                        are reset. Set to -1 to end the warmup when the\
+                        packet latency of two consecutive\
+                        --convergence-cycles intervals differs less than\
+                        --convergence-ci.")
+
+parser.add_option("--convergence-cycles", type="int", default=0,
+                  help="After warmup, simulate in intervals of this many\
+                        cycles until the average packet latency has\
+                        converged, or --sim-cycles is reached.\
+                        Set to 0 to disable.")
+
+parser.add_option("--convergence-ci", type="float", default=0.05,
+                  help="Target half-width of the 95% confidence interval\
+                        of the average packet latency, relative to the\
+                        mean")
+
+parser.add_option("--convergence-min-intervals", type="int", default=5,
+                  help="Minimum number of --convergence-cycles intervals\
+                        to simulate after warmup")
+
 parser.add_option("--num-packets-max", type="int", default=-1,
                   help="Stop injecting after --num-packets-max.\
                         Set to -1 to disable.")
@@ -101,6 +125,10 @@ if options.inj_vnet > 2:
           "or 2 (5-flit) or -1 (random)" % (options.inj_vnet))
     sys.exit(1)
 
+if options.warmup_cycles < 0 and options.convergence_cycles <= 0:
+    print("Error: --warmup-cycles=-1 requires --convergence-cycles")
+    sys.exit(1)
+
 
 cpus = [ GarnetSyntheticTraffic(
                      num_packets_max=options.num_packets_max,
@@ -148,10 +176,126 @@ root.system.mem_mode = 'timing'
 # Not much point in this being higher than the L1 latency
 m5.ticks.setGlobalFrequency('1ns')
 
+# -----------------------
+# convergence detection
+# -----------------------
+
+LIMIT_REACHED = "simulate() limit reached"
+
+# Two-sided 95% Student's t quantiles for 1..30 degrees of freedom
+T_95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262,
+        2.228, 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101,
+        2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052,
+        2.048, 2.045, 2.042)
+
+class LatencyMonitor(object):
+    """ Follows the statistics dumps in stats.txt and returns the sums of
+        packet latencies and received packets of the network """
+
+    def __init__(self):
+        self.stats_file = os.path.join(m5.options.outdir,
+                                       m5.options.stats_file)
+        self.offset = 0
+
+    def dump(self):
+        m5.stats.dump()
+        (dumps, self.offset) = readNewDumps(self.stats_file, self.offset)
+        if not dumps:
+            return (0.0, 0.0)
+
+        # The latency vectors have no total, sum them over all vnets
+        network = "system.ruby.network."
+        dump = dumps[-1]
+        latency = sum(dump.getVector(network + "packet_network_latency")) + \
+                  sum(dump.getVector(network + "packet_queueing_latency"))
+        received = sum(dump.getVector(network + "packets_received"))
+        return (latency, received)
+
+## Return the mean and relative half-width of the 95% confidence interval
+## of samples, using the method of batch means
+def confidenceInterval(samples):
+    n = len(samples)
+    mean = sum(samples) / n
+    if n < 2 or mean == 0:
+        return (mean, float("inf"))
+
+    variance = sum((x - mean) ** 2 for x in samples) / (n - 1)
+    t = T_95[n - 2] if n - 1 <= len(T_95) else 1.960
+    return (mean, t * math.sqrt(variance / n) / mean)
+
+## Simulate a warmup phase, then simulate in intervals until the average
+## packet latency converges. Returns the exit cause
+def simulateUntilConverged(options):
+    interval = options.convergence_cycles or options.sim_cycles
+    monitor = LatencyMonitor()
+
+    if options.warmup_cycles > 0:
+        exit_event = m5.simulate(options.warmup_cycles)
+        if exit_event.getCause() != LIMIT_REACHED:
+            return exit_event.getCause()
+        m5.stats.reset()
+
+    elif options.warmup_cycles < 0:
+        # Warm up until the latency of consecutive intervals is stable
+        prev_latency = None
+        while True:
+            exit_event = m5.simulate(interval)
+            if exit_event.getCause() != LIMIT_REACHED:
+                return exit_event.getCause()
+
+            (latency, received) = monitor.dump()
+            m5.stats.reset()
+            if received == 0:
+                continue
+
+            latency /= received
+            if prev_latency is not None and \
+                    abs(latency - prev_latency) <= \
+                    options.convergence_ci * prev_latency:
+                break
+            prev_latency = latency
+
+    if options.warmup_cycles != 0:
+        print('Warmup completed @ tick', m5.curTick())
+
+    if options.convergence_cycles <= 0:
+        exit_event = m5.simulate(options.abs_max_tick)
+        return exit_event.getCause()
+
+    # Statistics are not reset between intervals: the final dump covers
+    # the whole measurement phase, the interval latencies are differences
+    # between consecutive dumps
+    samples = []
+    (prev_latency, prev_received) = (0.0, 0.0)
+    while True:
+        exit_event = m5.simulate(interval)
+        if exit_event.getCause() != LIMIT_REACHED:
+            return exit_event.getCause()
+
+        (latency, received) = monitor.dump()
+        if received > prev_received:
+            samples.append((latency - prev_latency) /
+                           (received - prev_received))
+        (prev_latency, prev_received) = (latency, received)
+
+        if not samples:
+            continue
+
+        (mean, ci) = confidenceInterval(samples)
+        print('Average packet latency %.3f +/- %.1f%% @ tick %d' % \
+              (mean, 100 * ci, m5.curTick()))
+
+        if len(samples) >= options.convergence_min_intervals and \
+                ci <= options.convergence_ci:
+            return "average packet latency converged"
+
 # instantiate configuration
 m5.instantiate()
 
-# simulate until program terminates
-exit_event = m5.simulate(options.abs_max_tick)
+if options.warmup_cycles != 0 or options.convergence_cycles > 0:
+    cause = simulateUntilConverged(options)
+else:
+    # simulate until program terminates
+    cause = m5.simulate(options.abs_max_tick).getCause()
 
-print('Exiting @ tick', m5.curTick(), 'because', exit_event.getCause())
+print('Exiting @ tick', m5.curTick(), 'because', cause)
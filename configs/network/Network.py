@@ -38,6 +38,9 @@ def define_options(parser):
 
     parser.add_option("--tikz", default=False, action="store_true",
                       help="write topology.tikz code to the output directory")
+    parser.add_option("--topology-layout", default=False, action="store_true",
+                      help="write the topology.json layout for plottopology.py "
+                           "to the output directory")
     parser.add_option("--escapevc", default=False, action="store_true",
                       help="use VC=0 as Escape VC. Requires NVCS>=2")
     parser.add_option("--concentration-factor", type="int", default=1,
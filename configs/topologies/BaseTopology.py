@@ -26,6 +26,9 @@
 #
 # Authors: Jason Power
 
+import json
+import os
+
 import m5
 
 class BaseTopology(object):
@@ -64,3 +67,101 @@ class SimpleTopology(BaseTopology):
 
     def __len__(self):
         return len(self.nodes)
+
+class LinkTopology(SimpleTopology):
+    """ SimpleTopology whose routers are connected by bidirectional links.
+        Connected router pairs are kept in a set, so checking for an
+        existing link takes constant time. Links are collected with
+        addBiLink() and all IntLinks are created at once by makeIntLinks().
+        writeLayout() stores the router positions and links for
+        plottopology.py.
+    """
+    description = "LinkTopology"
+
+    def initLinks(self):
+        # (min router id, max router id) of every unique link
+        self.link_pairs = set()
+
+        # (src_id, dst_id, src_outport, dst_inport, latency, weight)
+        self.link_specs = []
+
+    def hasBiLink(self, src_id, dst_id):
+        if src_id > dst_id:
+            (src_id, dst_id) = (dst_id, src_id)
+        return (src_id, dst_id) in self.link_pairs
+
+    def addBiLink(self, src_id, dst_id, latency, weight, src_outport="",
+                  dst_inport="", unique=True):
+        """ Adds a bidirectional link between routers src_id and dst_id.
+            If unique is set, the link is not added when both routers are
+            already connected by a unique link. Returns True if the link
+            was added.
+        """
+        if unique:
+            pair = (src_id, dst_id) if src_id < dst_id else (dst_id, src_id)
+            if pair in self.link_pairs:
+                return False
+            self.link_pairs.add(pair)
+
+        self.link_specs.append((src_id, dst_id, src_outport, dst_inport,
+                                latency, weight))
+        return True
+
+    def makeIntLinks(self, IntLink):
+        """ Creates the src->dst and dst->src IntLinks of all added links,
+            numbered consecutively from self.link_count, and returns them
+        """
+        routers = self.routers
+        link_id = self.link_count
+        int_links = []
+        append = int_links.append
+
+        for (src_id, dst_id, src_outport, dst_inport, latency, weight) \
+                in self.link_specs:
+            append(IntLink(link_id=link_id,
+                           src_node=routers[src_id],
+                           dst_node=routers[dst_id],
+                           src_outport=src_outport,
+                           dst_inport=dst_inport,
+                           latency=latency,
+                           weight=weight))
+            append(IntLink(link_id=link_id + 1,
+                           src_node=routers[dst_id],
+                           dst_node=routers[src_id],
+                           src_outport=dst_inport,
+                           dst_inport=src_outport,
+                           latency=latency,
+                           weight=weight))
+            link_id += 2
+
+        self.link_count = link_id
+        self.int_links = int_links
+        return int_links
+
+    def gridLayout(self, nrows, ncols):
+        """ Returns the (x, y) position of every router of a grid with
+            router 0 in the bottom left corner, as drawn by TikzTopology
+        """
+        return [(r % ncols, r / ncols) for r in xrange(nrows * ncols)]
+
+    def writeLayout(self, options, positions):
+        """ Writes the router positions and links to topology.json in the
+            output directory if --topology-layout is set. Links are written
+            once per router pair, as lists of src_id, dst_id and weight
+        """
+        if not getattr(options, "topology_layout", False):
+            return
+
+        specs = self.link_specs
+        layout = {"topology": self.description,
+                  "routers": positions,
+                  "links": {"src": [spec[0] for spec in specs],
+                            "dst": [spec[1] for spec in specs],
+                            "weight": [spec[5] for spec in specs]}}
+
+        layout_file = os.path.join(m5.options.outdir, "topology.json")
+        try:
+            with open(layout_file, "w") as f:
+                json.dump(layout, f, separators=(",", ":"))
+        except IOError as e:
+            m5.util.warn("could not write %s: %s", layout_file, e)
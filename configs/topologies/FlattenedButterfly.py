@@ -6,11 +6,11 @@ import m5
 from m5.params import *
 from m5.objects import *
 
-from BaseTopology import SimpleTopology
+from BaseTopology import LinkTopology
 from TikzTopology import TikzTopology
 from TopologyToDSENT import TopologyToDSENT
 
-class FlattenedButterfly(SimpleTopology):
+class FlattenedButterfly(LinkTopology):
     # Creates a generic FlattenedButterfly topology assuming an equal number of cache
     # and directory controllers.
     description='FlattenedButterfly'
@@ -25,29 +25,12 @@ class FlattenedButterfly(SimpleTopology):
         if not self.tikz_out is None:
             self.tikz_out.write(ln)
 
-    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport, 
-                   IntLink, tikz_bend_right, delay):
+    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport,
+                   tikz_bend_right, delay):
         # Makes a bidirectional link between routers src_id and dst_id
 
-        if not (src_id, dst_id) in self.lst_links and not (dst_id, src_id) in self.lst_links:
-            self.lst_links.append((src_id, dst_id))
-
-            self.int_links.append(IntLink(link_id=self.link_count,
-                                          src_node=self.routers[src_id],
-                                          dst_node=self.routers[dst_id],
-                                          src_outport=src_outport,
-                                          dst_inport=dst_inport,
-                                          latency=self.link_latency * delay,
-                                          weight=weight))
-            self.int_links.append(IntLink(link_id=self.link_count + 1,
-                                          src_node=self.routers[dst_id],
-                                          dst_node=self.routers[src_id],
-                                          src_outport=dst_inport,
-                                          dst_inport=src_outport,
-                                          latency=self.link_latency * delay,
-                                          weight=weight))
-            self.link_count += 2
-
+        if self.addBiLink(src_id, dst_id, self.link_latency * delay, weight,
+                          src_outport, dst_inport):
             # Generate Tikz code for edge
             # Limit number of edges for large scale topologies to the first 64 nodes
             if len(self.routers) > 64:
@@ -167,8 +150,7 @@ class FlattenedButterfly(SimpleTopology):
             self.writeTikz("\n    \\path[every node/.style={font=\\sffamily\\footnotesize},"
                            "every edge/.append style={bend left=30,line width=0.2mm}]")
 
-        self.int_links = []
-        self.lst_links = []
+        self.initLinks()
 
         # Create the flattened butterfly links.
         for row in xrange(nrows):
@@ -180,19 +162,20 @@ class FlattenedButterfly(SimpleTopology):
                     dst_id = dst_col + (row * ncols)
 
                     # Horizontal link (weight = 1)
-                    self.makeBiLink(src_id, dst_id, 1, "East", "West", IntLink, (row < nrows / 2), x)
+                    self.makeBiLink(src_id, dst_id, 1, "East", "West", (row < nrows / 2), x)
 
                 for y in xrange(1, nrows):
                     dst_row = (row + y) % nrows
                     dst_id = col + (dst_row * ncols)
 
                     # Vertical link (weight = 2)
-                    self.makeBiLink(src_id, dst_id, 2, "North", "South", IntLink, (col >= ncols / 2), y)
+                    self.makeBiLink(src_id, dst_id, 2, "North", "South", (col >= ncols / 2), y)
 
         if not self.tikz_out is None:
             self.tikz_out.close()
 
-        network.int_links = self.int_links
+        network.int_links = self.makeIntLinks(IntLink)
+        self.writeLayout(options, self.gridLayout(nrows, ncols))
         
         # Generate router.cfg and electrical-link.cfg for DSENT
         dsent = TopologyToDSENT(m5.options.outdir, options.link_width_bits, 
@@ -34,11 +34,11 @@ import m5
 from m5.params import *
 from m5.objects import *
 
-from BaseTopology import SimpleTopology
+from BaseTopology import LinkTopology
 from TikzTopology import TikzTopology
 from TopologyToDSENT import TopologyToDSENT
 
-class FullyConnected(SimpleTopology):
+class FullyConnected(LinkTopology):
     # Creates a generic Mesh assuming an equal number of cache
     # and directory controllers.
     # XY routing is enforced (using link weights)
@@ -55,12 +55,10 @@ class FullyConnected(SimpleTopology):
         if not self.tikz_out is None:
             self.tikz_out.write(ln)
 
-    def makeBiLink(self, src_id, dst_id, nrows, ncols, IntLink):
+    def makeBiLink(self, src_id, dst_id, nrows, ncols):
         # Makes a bidirectional link between routers src_id and dst_id
 
-        if not (src_id, dst_id) in self.lst_links and not (dst_id, src_id) in self.lst_links:
-            self.lst_links.append((src_id, dst_id))
-            
+        if not self.hasBiLink(src_id, dst_id):
             # Calculate distance in proportion to a straight link
             (src_x, src_y) = divmod(src_id, ncols)
             (dst_x, dst_y) = divmod(dst_id, ncols)
@@ -68,19 +66,9 @@ class FullyConnected(SimpleTopology):
             y_diff = float(abs(src_y - dst_y))
             distance = ceil(sqrt(x_diff ** 2 + y_diff ** 2))
 
-            self.int_links.append(IntLink(link_id=self.link_count,
-                                          src_node=self.routers[src_id],
-                                          dst_node=self.routers[dst_id],
-                                          latency=self.link_latency * distance,
-                                          weight=1))
-            self.int_links.append(IntLink(link_id=self.link_count + 1,
-                                          src_node=self.routers[dst_id],
-                                          dst_node=self.routers[src_id],
-                                          latency=self.link_latency * distance,
-                                          weight=1))
+            self.addBiLink(src_id, dst_id, self.link_latency * distance, 1)
 
             self.writeTikz("    ({0}) edge [line width=0.2mm] node[] {{}} ({1})".format(src_id, dst_id))
-            self.link_count += 2
 
     def makeTopology(self, options, network, IntLink, ExtLink, Router):
         nodes = self.nodes
@@ -187,19 +175,18 @@ class FullyConnected(SimpleTopology):
             self.writeTikz("\n    \\path[every node/.style={font=\\sffamily\\footnotesize},"
                            "every edge/.append style={line width=0.3mm}]")
 
-        self.int_links = []
-        self.lst_links = []
+        self.initLinks()
 
         # Fully connect the mesh
         for i in xrange(len(self.routers)):
-            for j in xrange(len(self.routers)):
-                if (i != j):
-                    self.makeBiLink(i, j, nrows, ncols, IntLink)
+            for j in xrange(i + 1, len(self.routers)):
+                self.makeBiLink(i, j, nrows, ncols)
 
         if not self.tikz_out is None:
             self.tikz_out.close()
 
-        network.int_links = self.int_links
+        network.int_links = self.makeIntLinks(IntLink)
+        self.writeLayout(options, self.gridLayout(nrows, ncols))
         
         # Generate router.cfg and electrical-link.cfg for DSENT
         dsent = TopologyToDSENT(m5.options.outdir, options.link_width_bits, 
@@ -5,13 +5,13 @@ import m5
 from m5.params import *
 from m5.objects import *
 
-from BaseTopology import SimpleTopology
+from BaseTopology import LinkTopology
 from TikzTopology import TikzTopology
 from TopologyToDSENT import TopologyToDSENT
 
 import numpy as np
 
-class HierarchicalRing(SimpleTopology):
+class HierarchicalRing(LinkTopology):
     # Creates a generic HierarchicalRing topology assuming an equal number of cache
     # and directory controllers.
     description='HierarchicalRing'
@@ -26,7 +26,7 @@ class HierarchicalRing(SimpleTopology):
         if not self.tikz_out is None:
             self.tikz_out.write(ln)
 
-    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport, IntLink, is_central_ring):
+    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport, is_central_ring):
         # Makes a bidirectional link between routers src_id and dst_id
 
         part_of_central_ring = False
@@ -39,33 +39,15 @@ class HierarchicalRing(SimpleTopology):
                 part_of_central_ring = True
                 new_weight = 1
         
-        if (part_of_central_ring and not (src_id, dst_id) in self.central_ring_links and\
-            not (dst_id, src_id) in self.central_ring_links) or new_weight == 2:
-
-            self.int_links.append(IntLink(link_id=self.link_count,
-                                          src_node=self.routers[src_id],
-                                          dst_node=self.routers[dst_id],
-                                          src_outport=src_outport,
-                                          dst_inport=dst_inport,
-                                          latency=self.link_latency,
-                                          weight=new_weight))
-
-            self.int_links.append(IntLink(link_id=self.link_count + 1,
-                                          src_node=self.routers[dst_id],
-                                          dst_node=self.routers[src_id],
-                                          src_outport=dst_inport,
-                                          dst_inport=src_outport,
-                                          latency=self.link_latency,
-                                          weight=new_weight))
-
-            if part_of_central_ring:
-                self.central_ring_links.append((src_id, dst_id))
-
-            thick_line = "line width=1mm" if new_weight == 1 else ""
-            self.writeTikz("    ({0}) edge [{1}] node[] {{}} ({2})".format(src_id, thick_line, dst_id))
-            self.link_count += 2
-
-    def connectRing(self, ring, weight, IntLink, is_central_ring=False):
+        if part_of_central_ring or new_weight == 2:
+            # Central ring links are only added once
+            if self.addBiLink(src_id, dst_id, self.link_latency, new_weight,
+                              src_outport, dst_inport,
+                              unique=part_of_central_ring):
+                thick_line = "line width=1mm" if new_weight == 1 else ""
+                self.writeTikz("    ({0}) edge [{1}] node[] {{}} ({2})".format(src_id, thick_line, dst_id))
+
+    def connectRing(self, ring, weight, is_central_ring=False):
         # Connects routers in the ring bidirectionally
 
         x_range = ring.shape[0]
@@ -79,7 +61,7 @@ class HierarchicalRing(SimpleTopology):
 
                     src_id = ring[x][y]
                     dst_id = ring[x][y + 1]
-                    self.makeBiLink(src_id, dst_id, weight, "East", "West", IntLink, is_central_ring)
+                    self.makeBiLink(src_id, dst_id, weight, "East", "West", is_central_ring)
 
                 if (not is_central_ring and x == 1 and (y == 0 or y == y_range - 1)) or\
                    (is_central_ring and x >= 1 and x <= x_range - 1):
@@ -87,7 +69,7 @@ class HierarchicalRing(SimpleTopology):
 
                     src_id = ring[x][y]
                     dst_id = ring[x - 1][y]
-                    self.makeBiLink(src_id, dst_id, weight, "North", "South", IntLink, is_central_ring)
+                    self.makeBiLink(src_id, dst_id, weight, "North", "South", is_central_ring)
 
     def makeTopology(self, options, network, IntLink, ExtLink, Router):
         nodes = self.nodes
@@ -134,7 +116,6 @@ class HierarchicalRing(SimpleTopology):
         if options.tikz:
             self.tikz_out = TikzTopology(m5.options.outdir, self.nrows, self.ncols)
 
-        self.central_ring_links = []
         rings_left = []
 
         # Gather routers for left half of sub-rings
@@ -273,22 +254,23 @@ class HierarchicalRing(SimpleTopology):
             self.writeTikz("\n    \\path[every node/.style={font=\\sffamily\\footnotesize},"
                            "every edge/.append style={line width=0.3mm}]")
 
-        self.int_links = []
+        self.initLinks()
 
         # Create sub-ring links (weight = 2)
         rings = rings_left + rings_right
 
         for ring in rings:
-            self.connectRing(ring, 2, IntLink)
+            self.connectRing(ring, 2)
 
 
         # Create central ring links (weight = 1)
-        self.connectRing(central_ring, 1, IntLink, True)
+        self.connectRing(central_ring, 1, True)
 
         if not self.tikz_out is None:
             self.tikz_out.close()
         
-        network.int_links = self.int_links
+        network.int_links = self.makeIntLinks(IntLink)
+        self.writeLayout(options, self.gridLayout(self.nrows, self.ncols))
         
         # Generate router.cfg and electrical-link.cfg for DSENT
         dsent = TopologyToDSENT(m5.options.outdir, options.link_width_bits, 
@@ -5,14 +5,14 @@ import m5
 from m5.params import *
 from m5.objects import *
 
-from BaseTopology import SimpleTopology
+from BaseTopology import LinkTopology
 from TikzTopology import TikzTopology
 from TopologyToDSENT import TopologyToDSENT
 
 
 import numpy as np
 
-class Line(SimpleTopology):
+class Line(LinkTopology):
     # Creates a simple Line topology assuming an equal number of cache
     # and directory controllers.
     description='Line'
@@ -27,31 +27,15 @@ class Line(SimpleTopology):
         if not self.tikz_out is None:
             self.tikz_out.write(ln)
 
-    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport, IntLink):
+    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport):
         # Makes a bidirectional link between routers src_id and dst_id
 
-        # src->dst link
-        self.int_links.append(IntLink(link_id=self.link_count,
-                                      src_node=self.routers[src_id],
-                                      dst_node=self.routers[dst_id],
-                                      src_outport=src_outport,
-                                      dst_inport=dst_inport,
-                                      latency=self.link_latency,
-                                      weight=weight))
-
-        # dst->src link
-        self.int_links.append(IntLink(link_id=self.link_count + 1,
-                                      src_node=self.routers[dst_id],
-                                      dst_node=self.routers[src_id],
-                                      src_outport=dst_inport,
-                                      dst_inport=src_outport,
-                                      latency=self.link_latency,
-                                      weight=weight))
+        self.addBiLink(src_id, dst_id, self.link_latency, weight,
+                       src_outport, dst_inport, unique=False)
 
         thick_line = "line width=1mm" if weight == 1 else ""
         self.writeTikz("    ({0}) edge [{1}] node[] {{}} ({2})".format(src_id, thick_line, dst_id))
         self.writeTikz("    ({0}) edge [{1}] node[] {{}} ({2})".format(dst_id, thick_line, src_id))
-        self.link_count += 2
 
     def makeTopology(self, options, network, IntLink, ExtLink, Router):
         nodes = self.nodes
@@ -144,17 +128,18 @@ class Line(SimpleTopology):
         self.writeTikz("\n    \\path[every node/.style={font=\\sffamily\\footnotesize},"
                        "every edge/.append style={line width=0.3mm}]")
 
-        self.int_links = []
+        self.initLinks()
 
         # Create the ring's links
         for r in xrange(ncols - 1):
             # Destination router is east of source router
-            self.makeBiLink(r, r + 1, 1, "East", "West", IntLink)
+            self.makeBiLink(r, r + 1, 1, "East", "West")
 
         if not self.tikz_out is None:
             self.tikz_out.close()
 
-        network.int_links = self.int_links
+        network.int_links = self.makeIntLinks(IntLink)
+        self.writeLayout(options, self.gridLayout(nrows, ncols))
 
         # Generate router.cfg and electrical-link.cfg for DSENT
         dsent = TopologyToDSENT(m5.options.outdir, options.link_width_bits, 
@@ -33,11 +33,11 @@ import m5
 from m5.params import *
 from m5.objects import *
 
-from BaseTopology import SimpleTopology
+from BaseTopology import LinkTopology
 from TikzTopology import TikzTopology
 from TopologyToDSENT import TopologyToDSENT
 
-class Mesh_XY(SimpleTopology):
+class Mesh_XY(LinkTopology):
     # Creates a generic Mesh assuming an equal number of cache
     # and directory controllers.
     # XY routing is enforced (using link weights)
@@ -54,30 +54,13 @@ class Mesh_XY(SimpleTopology):
         if not self.tikz_out is None:
             self.tikz_out.write(ln)
 
-    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport, IntLink):
+    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport):
         # Makes a bidirectional link between routers src_id and dst_id
 
-        if not (src_id, dst_id) in self.lst_links and not (dst_id, src_id) in self.lst_links:
-            self.lst_links.append((src_id, dst_id))
-
-            self.int_links.append(IntLink(link_id=self.link_count,
-                                          src_node=self.routers[src_id],
-                                          dst_node=self.routers[dst_id],
-                                          src_outport=src_outport,
-                                          dst_inport=dst_inport,
-                                          latency=self.link_latency,
-                                          weight=weight))
-            self.int_links.append(IntLink(link_id=self.link_count + 1,
-                                          src_node=self.routers[dst_id],
-                                          dst_node=self.routers[src_id],
-                                          src_outport=dst_inport,
-                                          dst_inport=src_outport,
-                                          latency=self.link_latency,
-                                          weight=weight))
-
+        if self.addBiLink(src_id, dst_id, self.link_latency, weight,
+                          src_outport, dst_inport):
             thick_line = "line width=1mm" if weight == 1 else ""
             self.writeTikz("    ({0}) edge [{1}] node[] {{}} ({2})".format(src_id, thick_line, dst_id))
-            self.link_count += 2
 
     def makeTopology(self, options, network, IntLink, ExtLink, Router):
         nodes = self.nodes
@@ -184,8 +167,7 @@ class Mesh_XY(SimpleTopology):
             self.writeTikz("\n    \\path[every node/.style={font=\\sffamily\\footnotesize},"
                            "every edge/.append style={line width=0.3mm}]")
 
-        self.int_links = []
-        self.lst_links = []
+        self.initLinks()
 
         # Create the mesh links
         for row in xrange(nrows):
@@ -196,19 +178,20 @@ class Mesh_XY(SimpleTopology):
 
                     src_id = col + (row * ncols)
                     dst_id = (col + 1) + (row * ncols)
-                    self.makeBiLink(src_id, dst_id, 1, "East", "West", IntLink)
+                    self.makeBiLink(src_id, dst_id, 1, "East", "West")
 
                 if (row + 1 < nrows):
                     # Vertical link (weight = 2)
 
                     src_id = col + (row * ncols)
                     dst_id = col + ((row + 1) * ncols)
-                    self.makeBiLink(src_id, dst_id, 2, "North", "South", IntLink)
+                    self.makeBiLink(src_id, dst_id, 2, "North", "South")
 
         if not self.tikz_out is None:
             self.tikz_out.close()
 
-        network.int_links = self.int_links
+        network.int_links = self.makeIntLinks(IntLink)
+        self.writeLayout(options, self.gridLayout(nrows, ncols))
         
         # Generate router.cfg and electrical-link.cfg for DSENT
         dsent = TopologyToDSENT(m5.options.outdir, options.link_width_bits, 
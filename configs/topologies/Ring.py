@@ -5,13 +5,13 @@ import m5
 from m5.params import *
 from m5.objects import *
 
-from BaseTopology import SimpleTopology
+from BaseTopology import LinkTopology
 from TikzTopology import TikzTopology
 from TopologyToDSENT import TopologyToDSENT
 
 import numpy as np
 
-class Ring(SimpleTopology):
+class Ring(LinkTopology):
     # Creates a generic Ring topology assuming an equal number of cache
     # and directory controllers.
     # XY routing is enforced (using link weights)
@@ -28,30 +28,14 @@ class Ring(SimpleTopology):
         if not self.tikz_out is None:
             self.tikz_out.write(ln)
 
-    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport, IntLink):
+    def makeBiLink(self, src_id, dst_id, weight, src_outport, dst_inport):
         # Makes a bidirectional link between routers src_id and dst_id
 
-        # src->dst link
-        self.int_links.append(IntLink(link_id=self.link_count,
-                                      src_node=self.routers[src_id],
-                                      dst_node=self.routers[dst_id],
-                                      src_outport=src_outport,
-                                      dst_inport=dst_inport,
-                                      latency=self.link_latency,
-                                      weight=weight))
-
-        # dst->src link
-        self.int_links.append(IntLink(link_id=self.link_count + 1,
-                                      src_node=self.routers[dst_id],
-                                      dst_node=self.routers[src_id],
-                                      src_outport=dst_inport,
-                                      dst_inport=src_outport,
-                                      latency=self.link_latency,
-                                      weight=weight))
+        self.addBiLink(src_id, dst_id, self.link_latency, weight,
+                       src_outport, dst_inport, unique=False)
 
         thick_line = "line width=1mm" if weight == 1 else ""
         self.writeTikz("    ({0}) edge [{1}] node[] {{}} ({2})".format(src_id, thick_line, dst_id))
-        self.link_count += 2
 
     def makeTopology(self, options, network, IntLink, ExtLink, Router):
         nodes = self.nodes
@@ -161,7 +145,7 @@ class Ring(SimpleTopology):
         self.writeTikz("\n    \\path[every node/.style={font=\\sffamily\\footnotesize},"
                        "every edge/.append style={line width=0.3mm}]")
 
-        self.int_links = []
+        self.initLinks()
 
         # Create the ring's links
         flip_horizontal = False
@@ -175,28 +159,35 @@ class Ring(SimpleTopology):
                     # Destination router is on a different row ==> Vertical link (weight = 1)
                     if flip_horizontal:
                         # West vertical link
-                        self.makeBiLink(src_id, dst_id, 1, "South", "North", IntLink)
+                        self.makeBiLink(src_id, dst_id, 1, "South", "North")
                     else:
                         # East vertical link
-                        self.makeBiLink(src_id, dst_id, 1, "North", "South", IntLink)
+                        self.makeBiLink(src_id, dst_id, 1, "North", "South")
                 else:
                     # Horizontal link (weight = 1)
 
                     if x == 0:
                         # Destination router is west of source router
 
-                        self.makeBiLink(src_id, dst_id, 1, "West", "East", IntLink)
+                        self.makeBiLink(src_id, dst_id, 1, "West", "East")
                     else:
                         # Destination router is east of source router
 
-                        self.makeBiLink(src_id, dst_id, 1, "East", "West", IntLink)
+                        self.makeBiLink(src_id, dst_id, 1, "East", "West")
 
             flip_horizontal = True
 
         if not self.tikz_out is None:
             self.tikz_out.close()
 
-        network.int_links = self.int_links
+        network.int_links = self.makeIntLinks(IntLink)
+
+        # Routers are positioned as placed on the ring
+        positions = [None] * self.nrouters
+        for x in xrange(nrows):
+            for y in xrange(ncols):
+                positions[ring[x][y]] = (y, nrows - 1 - x)
+        self.writeLayout(options, positions)
         
         # Generate router.cfg and electrical-link.cfg for DSENT
         dsent = TopologyToDSENT(m5.options.outdir, options.link_width_bits, 
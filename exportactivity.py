@@ -0,0 +1,139 @@
+#!/usr/bin/python2
+#
+# Usage: ./exportactivity.py [--top=N] [--format=csv,npz]
+#                            <simulation output directory>...
+#
+# Exports the activity of every router and link in the last dump of
+# stats.txt, for finding congestion hotspots:
+#   link_activity.csv:   flits and utilization (flits/cycle) per
+#                        unidirectional link, keyed by link_id, src/dst
+#                        router and port direction
+#   router_activity.csv: activity per cycle per router, with its position
+#                        in the topology layout
+#   activity.npz:        the same as NumPy arrays
+#   hotspots.txt:        the busiest int_links and routers
+#   link_heatmap.svg/png: the topology layout (see plottopology.py) with
+#                        links colored by utilization
+#
+# Per-link statistics require a gem5 binary that records the
+# link_utilization of every NetworkLink.
+
+import os
+import sys
+from optparse import OptionParser
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "util"))
+from garnetactivity import LinkActivity, RouterActivity, linkRows, \
+                           writeLinkCsv, writeNpz, writeRouterCsv
+from garnetconfig import NETWORK, NetworkTopology, readConfig
+from garnettopology import readLayout, writePng, writeSvg
+from garnetstats import readLastDump
+
+## Write the count busiest int_links and routers of a run to report_file
+def writeHotspots(report_file, routers, links, num_cycles, count,
+                  positions=None):
+    def where(r):
+        if r < 0:
+            return "NI"
+        if positions is None:
+            return "%d" % r
+        return "%d (%g,%g)" % (r, positions[r][0], positions[r][1])
+
+    int_rows = [row for row in linkRows(links, num_cycles)
+                if row[2] == "int"]
+    int_rows.sort(key=lambda row: row[-1], reverse=True)
+
+    with open(report_file, "w") as f:
+        f.write("Busiest int_links (utilization in flits/cycle):\n")
+        f.write("%-8s %-16s %-16s %-8s %-8s %s\n" % ("link_id", "src", "dst",
+                "outport", "inport", "utilization"))
+        for row in int_rows[:count]:
+            f.write("%-8d %-16s %-16s %-8s %-8s %.6f\n" % (row[0],
+                    where(row[3]), where(row[4]), row[5], row[6], row[9]))
+
+        rates = routers.rates(num_cycles)["crossbar_activity"]
+        order = sorted(xrange(len(rates)), key=lambda r: rates[r],
+                       reverse=True)
+
+        f.write("\nBusiest routers (crossbar activity in flits/cycle):\n")
+        for r in order[:count]:
+            f.write("%-16s %.6f\n" % (where(r), rates[r]))
+
+def exportActivity(outdir, options):
+    config_file = os.path.join(outdir, "config.ini")
+    if not os.path.isfile(config_file):
+        # Fall back to the JSON configuration
+        config_file = os.path.join(outdir, "config.json")
+    config = readConfig(config_file)
+    stats_file = os.path.join(outdir, "stats.txt")
+
+    if config is None or not os.path.isfile(stats_file):
+        print("%s: no config.ini or stats.txt found" % outdir)
+        return
+
+    topology = NetworkTopology(config)
+    stats = readLastDump(stats_file, [NETWORK, "sim_ticks", "system.cpu"])
+    num_cycles = stats.getNumCycles()
+    if not num_cycles:
+        print("%s: no simulated cycles in stats.txt" % outdir)
+        return
+
+    routers = RouterActivity(stats, topology.routers)
+    links = LinkActivity(stats, topology)
+    if not links.hasStats():
+        print("%s: stats.txt holds no per-link statistics" % outdir)
+
+    layout = readLayout(outdir)
+    positions = None
+    if layout is not None and len(layout) == len(topology.routers):
+        positions = layout.positions.tolist()
+
+    if "csv" in options.formats:
+        writeLinkCsv(os.path.join(outdir, "link_activity.csv"), links,
+                     num_cycles)
+        writeRouterCsv(os.path.join(outdir, "router_activity.csv"), routers,
+                       topology, num_cycles, positions)
+    if "npz" in options.formats:
+        writeNpz(os.path.join(outdir, "activity.npz"), routers, links,
+                 num_cycles)
+
+    writeHotspots(os.path.join(outdir, "hotspots.txt"), routers, links,
+                  num_cycles, options.top, positions)
+
+    if positions is not None:
+        # Links of the layout are drawn with their busiest direction
+        pairs = links.pairUtilization(num_cycles)
+        link_values = [pairs.get(pair, 0.0) for pair in layout.linkPairs()]
+
+        writeSvg(layout, os.path.join(outdir, "link_heatmap.svg"),
+                 link_values=link_values, label="flits/cycle")
+        writePng(layout, os.path.join(outdir, "link_heatmap.png"),
+                 link_values=link_values)
+
+    print("Written activity of %s" % outdir)
+
+def main():
+    parser = OptionParser(usage="%prog [options] <simulation output "
+                                "directory>...")
+    parser.add_option("--top", type="int", default=10,
+                      help="number of links and routers in hotspots.txt "
+                           "(default: %default)")
+    parser.add_option("--format", default="csv,npz",
+                      help="comma-separated export formats (default: "
+                           "%default)")
+    (options, args) = parser.parse_args()
+
+    if not args:
+        parser.print_usage()
+        sys.exit(1)
+
+    options.formats = [fmt.strip().lower() for fmt in options.format.split(",")]
+    for fmt in options.formats:
+        if fmt not in ("csv", "npz"):
+            parser.error("unknown export format: %s" % fmt)
+
+    for outdir in args:
+        exportActivity(outdir, options)
+
+if __name__ == "__main__":
+    main()
@@ -251,7 +251,7 @@ namespace DSENT
         }
     }
 
-    static TechModel* constructTechModel(const map<String, String>& params)
+    TechModel* constructTechModel(const map<String, String>& params)
     {
         // Allocate static TechModel instance
         const String& electrical_tech_model_filename =
@@ -289,6 +289,13 @@ namespace DSENT
         return buildModel(config, tech_model);
     }
 
+    Model *initialize(const map<String, String> &config,
+                      TechModel *tech_model)
+    {
+        // Build the specified model in the config
+        return buildModel(config, tech_model);
+    }
+
     void finalize(map<String, String> &config, Model *ms_model)
     {
         // Delete the model
@@ -59,6 +59,15 @@ namespace DSENT
     Model *initialize(const char *config_file_name,
                       std::map<String, String> &config);
 
+    // Construct the technology model(s) specified in config.  The returned
+    // model can be shared by any number of models built with initialize().
+    TechModel *constructTechModel(const std::map<String, String> &config);
+
+    // Build the model specified in config, using an existing technology
+    // model instead of reading the technology file(s) again
+    Model *initialize(const std::map<String, String> &config,
+                      TechModel *tech_model);
+
     void finalize(std::map<String, String> &config,
                   Model *ms_model);
 
@@ -31,6 +31,7 @@
 #include <cstdio>
 
 #include "DSENT.h"
+#include "libutil/Log.h"
 #include "libutil/String.h"
 #include "model/Model.h"
 
@@ -48,10 +49,20 @@ static PyObject* dsent_computeLinkPower(PyObject*, PyObject*);
 map<String, String> params;
 DSENT::Model *ms_model;
 
+// Config files read by initialize() with parameter overrides, keyed by file
+// name, and the technology models constructed so far, keyed by technology
+// file name(s).  Both are retained across calls to initialize() and
+// finalize(), such that evaluating many routers or links only reads each
+// config and technology file once.
+map<String, map<String, String> > base_configs;
+map<String, DSENT::TechModel *> tech_models;
+
 
 static PyMethodDef DSENTMethods[] = {
-    {"initialize", dsent_initialize, METH_O,
-     "initialize dsent using a config file."},
+    {"initialize", dsent_initialize, METH_VARARGS,
+     "initialize dsent using a config file.  If a dict of parameters "
+     "overriding those in the config file is given, the config file is "
+     "only read on the first call."},
 
     {"finalize", dsent_finalize, METH_NOARGS,
      "finalize dsent by dstroying the config object"},
@@ -79,20 +90,75 @@ initdsent(void)
     PyModule_AddObject(m, "error", DSENTError);
 
     ms_model = nullptr;
+
+    // Init the log file once for all calls to initialize()
+    Log::allocate("/tmp/dsent.log");
 }
 
 
 static PyObject *
-dsent_initialize(PyObject *self, PyObject *arg)
+dsent_initialize(PyObject *self, PyObject *args)
 {
-    const char *config_file = PyString_AsString(arg);
+    const char *config_file;
+    PyObject *overrides = NULL;
+
     //Read the arguments sent from the python script
-    if (!config_file) {
-        Py_RETURN_NONE;
+    if (!PyArg_ParseTuple(args, "s|O!", &config_file, &PyDict_Type,
+                          &overrides)) {
+        return NULL;
+    }
+
+    if (!overrides) {
+        // Read the config file as is
+        params.clear();
+        LibUtil::readFile(config_file, params);
+    } else {
+        // Read the config file, unless it has been read before
+        auto config_it = base_configs.find(config_file);
+        if (config_it == base_configs.end()) {
+            map<String, String> config;
+            LibUtil::readFile(config_file, config);
+            config_it = base_configs.insert(
+                make_pair(String(config_file), config)).first;
+        }
+        params = config_it->second;
+
+        // Overwrite parameters with the given values
+        PyObject *key, *value;
+        Py_ssize_t pos = 0;
+
+        while (PyDict_Next(overrides, &pos, &key, &value)) {
+            PyObject *key_str = PyObject_Str(key);
+            PyObject *value_str = PyObject_Str(value);
+
+            if (!key_str || !value_str) {
+                Py_XDECREF(key_str);
+                Py_XDECREF(value_str);
+                return NULL;
+            }
+
+            params[PyString_AsString(key_str)] =
+                PyString_AsString(value_str);
+
+            Py_DECREF(key_str);
+            Py_DECREF(value_str);
+        }
+    }
+
+    // Construct the technology model, unless it has been constructed before
+    String tech_key = params.at("ElectricalTechModelFilename");
+    if (params.count("PhotonicTechModelFilename") != 0) {
+        tech_key += ";" + params.at("PhotonicTechModelFilename");
+    }
+
+    auto tech_it = tech_models.find(tech_key);
+    if (tech_it == tech_models.end()) {
+        tech_it = tech_models.insert(
+            make_pair(tech_key, DSENT::constructTechModel(params))).first;
     }
 
     // Initialize DSENT
-    ms_model = DSENT::initialize(config_file, params);
+    ms_model = DSENT::initialize(params, tech_it->second);
     Py_RETURN_NONE;
 }
 
@@ -100,9 +166,11 @@ dsent_initialize(PyObject *self, PyObject *arg)
 static PyObject *
 dsent_finalize(PyObject *self, PyObject *args)
 {
-    // Finalize DSENT
-    DSENT::finalize(params, ms_model);
+    // Finalize DSENT.  The technology model is retained for subsequent
+    // calls to initialize().
+    delete ms_model;
     ms_model = nullptr;
+    params.clear();
     Py_RETURN_NONE;
 }
 
@@ -1,54 +1,160 @@
 #!/usr/bin/python2
 #
 # Script for parsing GarnetStandalone debug prints
+#
+# Usage: ./grepdebug.py [options] filename
+#
+# The debug file, which may be gzip or zstd compressed, is read once. Lines
+# matching any of the patterns are written to <filename>_parsed_<pattern>,
+# to <filename>_parsed (grouped by pattern, or in input order with --mixed)
+# and, version-sorted in reverse by `sort -rV`, to <filename>_parsed_sorted.
 
+import gzip
+import io
 import ntpath
+import os
+import re
+import shutil
 import subprocess
 import sys
+from optparse import OptionParser
 
 # Options
 in_file = "debug.txt" # default file name in case no args supplied
 greps = ["command line:", "vc_busy_counter", "send_allowed=1"]
 mixed_greps = False
 sorting = True
+sort_memory = 512 # MB of memory used by sort before it spills to disk
+
+BUFFER_SIZE = 1 << 20
 
 
 def exit_verbose(s):
     print s
     sys.exit(1)
 
-if len(sys.argv) > 1:
-    in_file = sys.argv[1]
+class PipeInput(object):
+    """ Lines written by a decompression command. A command that fails,
+        e.g. on a truncated archive, is reported once its output ends """
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                     bufsize=BUFFER_SIZE)
+
+    def __iter__(self):
+        for line in self.proc.stdout:
+            yield line
+        self.close()
+        if self.proc.returncode != 0:
+            exit_verbose("{0} failed with exit code {1}".format(
+                " ".join(self.cmd), self.proc.returncode))
+
+    def close(self):
+        if self.proc.returncode is None:
+            self.proc.stdout.close()
+            self.proc.wait()
+
+## Open a plain, gzip or zstd compressed file for reading lines
+def openInput(filename):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rb")
+    elif filename.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            return PipeInput(["zstd", "-dc", filename])
+        # The decompression reader itself cannot read lines
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(filename, "rb"))
+        return io.BufferedReader(reader, BUFFER_SIZE)
+    return open(filename, "rt", BUFFER_SIZE)
+
+## File name suffix for a pattern
+def patternSlug(grep):
+    return re.sub("[^0-9A-Za-z]+", "_", grep).strip("_")
+
+parser = OptionParser(usage="%prog [options] filename")
+parser.add_option("-p", "--pattern", action="append", dest="greps",
+                  help="pattern to match, may be repeated [default: %s]" % \
+                       ", ".join("'%s'" % g for g in greps))
+parser.add_option("--mixed", action="store_true", default=mixed_greps,
+                  help="write matching lines to <filename>_parsed in input "
+                       "order instead of grouped by pattern")
+parser.add_option("--no-sort", action="store_false", dest="sorting",
+                  default=sorting, help="do not write <filename>_parsed_sorted")
+parser.add_option("--sort-memory", type="int", default=sort_memory,
+                  help="MB of memory sort -rV uses before spilling to "
+                       "temporary files [default: %default]")
+(options, args) = parser.parse_args()
+
+if len(args) > 0:
+    in_file = args[0]
     if not ntpath.isfile(in_file):
         exit_verbose("File {0} does not exist.".format(in_file))
 else:
-    exit_verbose("Usage: ./grepdebug.py filename")
+    exit_verbose("Usage: ./grepdebug.py [options] filename")
+
+greps = options.greps or greps
 
 dir_name, base_name = ntpath.split(in_file)
 fn, ext = ntpath.splitext(base_name)
+if ext in (".gz", ".zst"):
+    fn, ext = ntpath.splitext(fn)
 if len(dir_name) > 0:
     dir_name += "/"
 
-out_file = ntpath.join(dir_name, fn + "_parsed" + ext) 
+out_file = ntpath.join(dir_name, fn + "_parsed" + ext)
 out_file_sorted = ntpath.join(dir_name, fn + "_parsed_sorted" + ext)
+pattern_files = [ntpath.join(dir_name, fn + "_parsed_" + patternSlug(g) + ext)
+                 for g in greps]
+
+# A single regex finds lines matching any pattern; only those lines are
+# checked for the individual patterns
+any_grep = re.compile("|".join(re.escape(g) for g in greps))
+
+fin = openInput(in_file)
+fouts = [open(f, "wt", BUFFER_SIZE) for f in pattern_files]
+fmixed = open(out_file, "wt", BUFFER_SIZE) if options.mixed else None
+try:
+    search = any_grep.search
+    for line in fin:
+        if not search(line):
+            continue
 
-with open(in_file, "rt") as fin, open(out_file, "wt") as fout:
-    if mixed_greps:
-         for line in fin:
-            for grep in greps:
-                if grep in line:
-                    fout.write(line)
+        matched = False
+        for (grep, fout) in zip(greps, fouts):
+            if grep in line:
+                fout.write(line)
+                matched = True
+                if options.mixed:
                     break
-    else:
-        for grep in greps:
-            for line in fin:
-                if grep in line:
-                    fout.write(line)
-            fin.seek(0)
-    print "Parsed debug info written to: " + out_file
-
-if sorting:
-    proc = subprocess.Popen("sort -rV " + out_file + " -o " + out_file_sorted,
-                            shell=True)
-    proc.wait()
+
+        if matched and options.mixed:
+            fmixed.write(line)
+finally:
+    fin.close()
+    for fout in fouts:
+        fout.close()
+    if fmixed is not None:
+        fmixed.close()
+
+for f in pattern_files:
+    print "Parsed debug info written to: " + f
+
+if not options.mixed:
+    # Lines grouped by pattern, in the order of the patterns
+    with open(out_file, "wt", BUFFER_SIZE) as fout:
+        for f in pattern_files:
+            with open(f, "rt") as fin:
+                shutil.copyfileobj(fin, fout, BUFFER_SIZE)
+print "Parsed debug info written to: " + out_file
+
+if options.sorting:
+    # sort spills to temporary files beyond --sort-memory itself
+    cmd = ["sort", "-rV", "-S", "%dM" % options.sort_memory]
+    if len(dir_name) > 0:
+        cmd += ["-T", dir_name]
+    if subprocess.call(cmd + ["-o", out_file_sorted, out_file]) != 0:
+        exit_verbose("Sorting {0} failed.".format(out_file))
     print "Sorted debug info written  to: " + out_file_sorted
@@ -17,6 +17,18 @@ out_file_name = os.path.join(sys.argv[1], "network_stats.txt")
 
 if os.path.isfile(in_file_name):
     with open(in_file_name, "rt") as fin:
+        # Only copy the last dump, earlier dumps are warmup or convergence
+        # intervals of garnet_synth_traffic.py
+        last_dump = 0
+        while True:
+            pos = fin.tell()
+            line = fin.readline()
+            if not line:
+                break
+            elif "Begin Simulation Statistics" in line:
+                last_dump = pos
+        fin.seek(last_dump)
+
         line = ""
         while True:
             line = fin.readline()
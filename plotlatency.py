@@ -5,14 +5,8 @@
 import os
 import sys
 
-## Parse stats.txt for the specified key and return the associated value as float
-def getStatsForString(stats_file, key):
-    with open(stats_file, "rt") as f:
-        for line in f:
-            if key in line:
-                split = line.split()
-                return float(split[-1])
-    return 0.0
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "util"))
+from garnetstats import readStats
 
 if len(sys.argv) < 4:
     print("Usage: %s <simulation directory> " \
@@ -24,7 +18,7 @@ injrate = float(sys.argv[3])
 stats_file = os.path.join(outdir, "stats.txt")
 latest_latency_file = os.path.join(outdir, "../latest_latency.txt")
 
-latency = getStatsForString(stats_file, "system.ruby.network.average_packet_latency")
+latency = readStats(stats_file).get("system.ruby.network.average_packet_latency")
 
 if latency > -1:
     with open(latency_file, "a") as f:
@@ -2,30 +2,22 @@
 #
 # Usage: ./plotlatencythroughput.py <root directory containing multiple
 #                                    simulation output directories>
+#                                   [<results database>]
 
 # Gets injection rate (offered throughput), reception rate (sustained throughput)
 # and latency numbers for all <subdirectories>/stats.txt.
 #
-# Will output to <root directory>/<formatted string>-latencythroughput.txt"
+# Will output to <root directory>/<formatted string>-latencythroughput.txt",
+# or insert or replace the runs in the results database if one is given
+# (see util/garnetdb.py)
 
 import os, sys, re
-from ConfigParser import ConfigParser
+from multiprocessing import cpu_count
 
-## Parse stats.txt for the specified key and return the associated value as float
-def getStatsForString(stats_file, key):
-    with open(stats_file, "rt") as f:
-        for line in f:
-            if key in line:
-
-                # Remove comments
-                comment_pos = line.find("#")
-                if comment_pos > -1:
-                    line = line[0:comment_pos]
-
-                # Return last column as float
-                split = line.split()
-                return float(split[-1])
-    return 0.0
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "util"))
+from garnetconfig import readConfig
+from garnetstats import readStats
+from garnetdb import ResultsDB, findRuns
 
 if len(sys.argv) < 2:
     print("Usage: {0:s}".format(sys.argv[0]) + " <root directory containing "
@@ -34,6 +26,13 @@ if len(sys.argv) < 2:
 
 rootdir = sys.argv[1]
 
+if len(sys.argv) > 2:
+    # Insert or replace new and changed runs in the results database
+    db = ResultsDB(sys.argv[2])
+    db.ingestAll(findRuns([rootdir]), cpu_count())
+    db.close()
+    sys.exit(0)
+
 for subdir, dirs, files in os.walk(rootdir):
     dirs = sorted(dirs)
     for outdir in dirs:
@@ -41,9 +40,9 @@ for subdir, dirs, files in os.walk(rootdir):
         config_file = os.path.join(rootdir, outdir, "config.ini")
         if os.path.exists(stats_file):
 
-            # Initialize ConfigParser
-            config = ConfigParser()
-            if not config.read(config_file):
+            # Read config.ini in a single pass
+            config = readConfig(config_file)
+            if config is None:
                 continue
 
             # Count number of CPUs
@@ -67,24 +66,16 @@ for subdir, dirs, files in os.walk(rootdir):
             else:
                 continue
 
-            # Get number of cycles for SE/FE simulation
-            num_cycles = getStatsForString(stats_file, "system.cpu0.numCycles")
-            if num_cycles == 0.0:
-                num_cycles = getStatsForString(stats_file, "system.cpu00.numCycles")
-            if num_cycles == 0.0:
-                num_cycles = getStatsForString(stats_file, "system.cpu000.numCycles")
-            if num_cycles == 0.0:
-                num_cycles = getStatsForString(stats_file, "system.cpu000.numCycles")
+            # Read all statistics in a single pass
+            stats = readStats(stats_file)
 
-            # Get number of cycles for Garnet_standalone simulation
-            if num_cycles == 0.0:
-                num_cycles = getStatsForString(stats_file, "sim_ticks")
+            # Get number of cycles for SE/FE or Garnet_standalone simulation
+            num_cycles = stats.getNumCycles()
             if num_cycles == 0.0:
                 continue
 
-            latency = getStatsForString(stats_file, "system.ruby.network.average_packet_latency")
-            recep_rate = getStatsForString(stats_file, "system.ruby.network.packets_injected::total")\
-                            / float(num_cpus) / num_cycles
+            latency = stats.get("system.ruby.network.average_packet_latency")
+            recep_rate = stats.getReceptionRate(num_cpus)
 
             # Create file name for results
             outfile = filter(lambda s: not (s[-7:]=="injrate"), outdir.split("-"))
@@ -94,4 +85,3 @@ for subdir, dirs, files in os.walk(rootdir):
 
             with open(outfile, "a") as f:
                 f.write("{0:f}   {1:f}   {2:f}\n".format(inj_rate, recep_rate, latency))
-
@@ -0,0 +1,84 @@
+#!/usr/bin/python2
+#
+# Usage: ./plottopology.py [--color=<router counter>] [--format=svg,png]
+#                          <simulation output directory>...
+#
+# Draws the topology.json layout, written by simulations started with
+# --topology-layout, to topology.svg and topology.png in each simulation
+# output directory. Routers are colored by their activity per cycle in
+# stats.txt, see ROUTER_COUNTERS in util/garnetactivity.py.
+#
+# Replaces tex2png for routine runs: no LaTeX is needed and large
+# topologies are drawn in full.
+
+import os
+import sys
+from optparse import OptionParser
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "util"))
+from garnetactivity import ROUTER_COUNTERS, RouterActivity
+from garnetconfig import NETWORK
+from garnettopology import readLayout, writePng, writeSvg
+from garnetstats import readLastDump
+
+## Return the activity per cycle of counter for every router in the last
+## dump of stats_file, or None if it is not available for all routers
+def readRouterValues(stats_file, counter, num_routers):
+    if not os.path.isfile(stats_file):
+        return None
+
+    stats = readLastDump(stats_file, [NETWORK + ".routers", "sim_ticks",
+                                      "system.cpu"])
+    activity = RouterActivity(stats)
+    num_cycles = stats.getNumCycles()
+    if len(activity) != num_routers or not num_cycles:
+        return None
+
+    return activity.rates(num_cycles)[counter]
+
+def main():
+    parser = OptionParser(usage="%prog [options] <simulation output "
+                                "directory>...")
+    parser.add_option("--color", default="buffer_reads",
+                      help="color routers by this activity counter: %s, or "
+                           "'none' (default: %%default)" %
+                           ", ".join(ROUTER_COUNTERS))
+    parser.add_option("--format", default="svg,png",
+                      help="comma-separated output formats (default: "
+                           "%default)")
+    (options, args) = parser.parse_args()
+
+    if not args:
+        parser.print_usage()
+        sys.exit(1)
+
+    if options.color != "none" and options.color not in ROUTER_COUNTERS:
+        parser.error("unknown router counter: %s" % options.color)
+
+    formats = [fmt.strip().lower() for fmt in options.format.split(",")]
+    for fmt in formats:
+        if fmt not in ("svg", "png"):
+            parser.error("unknown output format: %s" % fmt)
+
+    for outdir in args:
+        layout = readLayout(outdir)
+        if layout is None:
+            print("%s not found" % os.path.join(outdir, "topology.json"))
+            continue
+
+        router_values = None
+        if options.color != "none":
+            router_values = readRouterValues(
+                os.path.join(outdir, "stats.txt"), options.color, len(layout))
+
+        label = "%s/cycle" % options.color
+        for fmt in formats:
+            out_file = os.path.join(outdir, "topology." + fmt)
+            if fmt == "svg":
+                writeSvg(layout, out_file, router_values, label=label)
+            else:
+                writePng(layout, out_file, router_values)
+            print("Written topology diagram to %s" % out_file)
+
+if __name__ == "__main__":
+    main()
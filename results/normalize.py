@@ -1,7 +1,17 @@
 #!/usr/bin/python2
+#
+# Usage: ./normalize.py <cores> [<results database>]
+#
+# Without a results database (see util/garnetdb.py), the results are read
+# from the 'results' text file
+
+import os
 import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "util"))
+
 if len(sys.argv) < 1:
     sys.exit(0)
 
@@ -12,30 +22,43 @@ def norm(a):
             mini = e
     return a / mini
 
-cores = sys.argv[1]
+## Read the rows for cores from the 'results' text file
+def readResultsFile(cores):
+    found = False
+    idx = []
+    throughput = np.array([])
+    latency = np.array([])
+    with open("results", "rt") as f:
+        for line in f:
+            if len(line) >= 2:
+                if line[-2] == ':':
+                    if found:
+                        break
+                    if line[0:-2] == cores:
+                        found = True
 
-found = False
-idx = []
-throughput = np.array([])
-latency = np.array([])
-with open("results", "rt") as f:
-    for line in f:
-        if len(line) >= 2:
-            if line[-2] == ':':
                 if found:
-                    break
-                if line[0:-2] == cores:
-                    found = True
+                    split = line.split()
 
-            if found:
-                split = line.split()
+                    if len(split) == 3:
+                        throughput = np.append(throughput,[float(split[0])])
+                        latency = np.append(latency,[float(split[2])])
+                    elif len(split) == 2:
+                        idx.append(line.strip())
 
-                if len(split) == 3:
-                    throughput = np.append(throughput,[float(split[0])])
-                    latency = np.append(latency,[float(split[2])])
-                elif len(split) == 2:
-                    idx.append(line.strip())
+    return (idx, throughput, latency)
+
+cores = sys.argv[1]
 
+if len(sys.argv) > 2:
+    # Query the results database, see util/garnetdb.py
+    from garnetdb import ResultsDB, peakResults
+    res = peakResults(ResultsDB(sys.argv[2]), int(cores))
+    idx = list(res["label"])
+    throughput = res["injrate"]
+    latency = res["latency"]
+else:
+    (idx, throughput, latency) = readResultsFile(cores)
 
 print "Latencies:"
 for (i, e) in enumerate(norm(latency)):
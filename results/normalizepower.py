@@ -1,7 +1,17 @@
 #!/usr/bin/python2
+#
+# Usage: ./normalizepower.py <cores> [<results database>]
+#
+# Without a results database (see util/garnetdb.py), the results are read
+# from the 'resultspower' text file
+
+import os
 import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "util"))
+
 if len(sys.argv) < 1:
     sys.exit(0)
 
@@ -22,34 +32,50 @@ def mindex(a):
     return x
 
 
-cores = sys.argv[1]
+## Read the rows for cores from the 'resultspower' text file
+def readResultsFile(cores):
+    found = False
+    idx = []
+    dynamic = np.array([])
+    leakage = np.array([])
+    noc = np.array([])
+    die = np.array([])
+    with open("resultspower", "rt") as f:
+        for line in f:
+            if len(line) >= 2:
+                if line[-2] == ':':
+                    if found:
+                        break
+                    if line[0:-2] == cores:
+                        found = True
 
-found = False
-idx = []
-dynamic = np.array([])
-leakage = np.array([])
-total = np.array([])
-noc = np.array([])
-die = np.array([])
-with open("resultspower", "rt") as f:
-    for line in f:
-        if len(line) >= 2:
-            if line[-2] == ':':
                 if found:
-                    break
-                if line[0:-2] == cores:
-                    found = True
-
-            if found:
-                split = line.split()
-
-                if len(split) == 4:
-                    dynamic = np.append(dynamic,[float(split[0])])
-                    leakage = np.append(leakage,[float(split[1])])
-                    noc = np.append(noc,[float(split[2])])
-                    die = np.append(die,[float(split[3])])
-                elif len(split) == 2:
-                    idx.append(line.strip())
+                    split = line.split()
+
+                    if len(split) == 4:
+                        dynamic = np.append(dynamic,[float(split[0])])
+                        leakage = np.append(leakage,[float(split[1])])
+                        noc = np.append(noc,[float(split[2])])
+                        die = np.append(die,[float(split[3])])
+                    elif len(split) == 2:
+                        idx.append(line.strip())
+
+    return (idx, dynamic, leakage, noc, die)
+
+cores = sys.argv[1]
+
+if len(sys.argv) > 2:
+    # Query the results database, see util/garnetdb.py
+    from garnetdb import ResultsDB, peakResults
+    res = peakResults(ResultsDB(sys.argv[2]), int(cores))
+    idx = list(res["label"])
+    dynamic = res["dynamic_power"]
+    leakage = res["leakage_power"]
+    noc = res["router_area"] * 1e6
+    die = res["die_area"]
+else:
+    (idx, dynamic, leakage, noc, die) = readResultsFile(cores)
+
 total = dynamic+leakage
 mi = mindex(total)
 dynamic = dynamic / total[mi]
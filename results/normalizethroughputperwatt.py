@@ -1,7 +1,17 @@
 #!/usr/bin/python2
+#
+# Usage: ./normalizethroughputperwatt.py <cores> [<results database>]
+#
+# Without a results database (see util/garnetdb.py), the results are read
+# from the 'resultspower2' text file
+
+import os
 import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "util"))
+
 if len(sys.argv) < 1:
     sys.exit(0)
 
@@ -22,36 +32,50 @@ def mindex(a):
     return x
 
 
-cores = sys.argv[1]
+## Read the rows for cores from the 'resultspower2' text file
+def readResultsFile(cores):
+    found = False
+    idx = []
+    throughput = np.array([])
+    dynamic = np.array([])
+    leakage = np.array([])
+    area = np.array([])
+    with open("resultspower2", "rt") as f:
+        for line in f:
+            if len(line) >= 2:
+                if line[-2] == ':':
+                    if found:
+                        break
+                    if line[0:-2] == cores:
+                        found = True
 
-found = False
-idx = []
-throughput = np.array([])
-dynamic = np.array([])
-leakage = np.array([])
-power = np.array([])
-area = np.array([])
-throughput_per_watt = np.array([])
-watt_per_area = np.array([])
-with open("resultspower2", "rt") as f:
-    for line in f:
-        if len(line) >= 2:
-            if line[-2] == ':':
                 if found:
-                    break
-                if line[0:-2] == cores:
-                    found = True
-
-            if found:
-                split = line.split()
-
-                if len(split) == 4:
-                    throughput = np.append(throughput,[float(split[0])])
-                    dynamic = np.append(dynamic,[float(split[1])])
-                    leakage = np.append(leakage,[float(split[2])])
-                    area = np.append(area,[float(split[3])])
-                elif len(split) == 2:
-                    idx.append(line.strip())
+                    split = line.split()
+
+                    if len(split) == 4:
+                        throughput = np.append(throughput,[float(split[0])])
+                        dynamic = np.append(dynamic,[float(split[1])])
+                        leakage = np.append(leakage,[float(split[2])])
+                        area = np.append(area,[float(split[3])])
+                    elif len(split) == 2:
+                        idx.append(line.strip())
+
+    return (idx, throughput, dynamic, leakage, area)
+
+cores = sys.argv[1]
+
+if len(sys.argv) > 2:
+    # Query the results database, see util/garnetdb.py
+    from garnetdb import ResultsDB, peakResults
+    res = peakResults(ResultsDB(sys.argv[2]), int(cores))
+    idx = list(res["label"])
+    throughput = res["reception_rate"] * int(cores)
+    dynamic = res["dynamic_power"]
+    leakage = res["leakage_power"]
+    area = res["die_area"]
+else:
+    (idx, throughput, dynamic, leakage, area) = readResultsFile(cores)
+
 power = dynamic+leakage
 mi = mindex(power)
 leakage_frac = leakage / (dynamic + leakage)
@@ -45,9 +45,14 @@ import sys
 import re
 import string
 import inspect, traceback
+import cPickle as pickle
+import hashlib
+import tempfile
 # get type names
 from types import *
 
+from m5.util import makeDir
+from m5.util.code_formatter import code_manifest, generated_file, update_file
 from m5.util.grammar import Grammar
 
 debug=False
@@ -1453,10 +1458,13 @@ class LineTracker(object):
 #
 
 class ISAParser(Grammar):
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, cache_dir=None):
         super(ISAParser, self).__init__()
         self.output_dir = output_dir
 
+        # Generated files of previous parses, see _parse_isa_desc()
+        self.cache_dir = cache_dir
+
         self.filename = None # for output file watermarking/scaremongering
 
         # variable to hold templates
@@ -1470,6 +1478,10 @@ class ISAParser(Grammar):
         self.files = {}
         self.splits = {}
 
+        # All files written, see write_top_level_files()
+        self.manifest = code_manifest()
+        self.outputs = {}
+
         # isa_name / namespace identifier from namespace declaration.
         # before the namespace declaration, None.
         self.isa_name = None
@@ -1633,6 +1645,9 @@ class ISAParser(Grammar):
     const int MaxInstDestRegs = %(maxInstDestRegs)d;
     const int MaxMiscDestRegs = %(maxMiscDestRegs)d;\n}\n''' % self)
 
+        self.manifest.write(os.path.join(self.output_dir,
+                                         'isa_parser.manifest'))
+
     scaremonger_template ='''// DO NOT EDIT
 // This file was automatically generated from an ISA description:
 //   %(filename)s
@@ -2521,17 +2536,18 @@ StaticInstPtr
             return s
 
     def open(self, name, bare=False):
-        '''Open the output file for writing and include scary warning.'''
+        '''Open the output file for writing and include scary warning.
+        The file is only replaced when closed with different contents.'''
         filename = os.path.join(self.output_dir, name)
-        f = open(filename, 'w')
-        if f:
-            if not bare:
-                f.write(ISAParser.scaremonger_template % self)
+        f = generated_file(filename, self.manifest)
+        self.outputs[name] = f
+        if not bare:
+            f.write(ISAParser.scaremonger_template % self)
         return f
 
     def update(self, file, contents):
-        '''Update the output file only.  Scons should handle the case when
-        the new contents are unchanged using its built-in hash feature.'''
+        '''Update the output file only if the new contents differ, such
+        that unchanged files keep their timestamps.'''
         f = self.open(file)
         f.write(contents)
         f.close()
@@ -2596,14 +2612,83 @@ StaticInstPtr
         # do this up front.
         isa_desc = self.read_and_flatten(isa_desc_file)
 
+        # An unchanged ISA description generates the same files as before
+        if self.cache_dir is not None:
+            cache_file = self.cacheFile(isa_desc_file, isa_desc)
+            if self.writeCachedFiles(cache_file):
+                ISAParser.AlreadyGenerated[isa_desc_file] = None
+                return
+
         # Initialize lineno tracker
         self.lex.lineno = LineTracker(isa_desc_file)
 
         # Parse.
         self.parse_string(isa_desc)
 
+        if self.cache_dir is not None:
+            self.saveCachedFiles(cache_file)
+
         ISAParser.AlreadyGenerated[isa_desc_file] = None
 
+    def cacheFile(self, isa_desc_file, isa_desc):
+        '''Return the cache file of an ISA description, named after a
+        hash of its flattened text and of the Python code its parse runs:
+        this parser, the micro assembler and the modules in the ISA
+        description's directory, such as the x86 microcode.'''
+        parser_dir = os.path.dirname(os.path.abspath(__file__))
+        sources = [os.path.join(parser_dir, 'isa_parser.py'),
+                   os.path.join(parser_dir, 'micro_asm.py')]
+        for root, dirs, files in os.walk(os.path.dirname(isa_desc_file)):
+            dirs.sort()
+            sources.extend(os.path.join(root, f) for f in sorted(files)
+                           if f.endswith('.py'))
+
+        h = hashlib.sha1()
+        for source in sources:
+            with open(source, 'rb') as f:
+                h.update(f.read())
+        h.update(self.filename + '\0')
+        h.update(isa_desc)
+
+        prefix = self.filename.replace('/', '_')
+        return os.path.join(self.cache_dir,
+                            '%s-%s.pkl' % (prefix, h.hexdigest()))
+
+    def writeCachedFiles(self, cache_file):
+        '''Write the generated files stored in cache_file, if any.
+        Returns True if they were written.'''
+        try:
+            with open(cache_file, 'rb') as f:
+                outputs = pickle.load(f)
+        except Exception:
+            # Missing or truncated cache files are generated again
+            return False
+
+        for name in sorted(outputs):
+            update_file(os.path.join(self.output_dir, name), outputs[name],
+                        self.manifest)
+        self.manifest.write(os.path.join(self.output_dir,
+                                         'isa_parser.manifest'))
+        return True
+
+    def saveCachedFiles(self, cache_file):
+        '''Store the generated files in cache_file, replacing those of
+        previous versions of the same ISA description'''
+        outputs = dict((name, f.getvalue())
+                       for (name, f) in self.outputs.iteritems())
+
+        makeDir(self.cache_dir)
+        (fd, tmp_file) = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(outputs, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_file, cache_file)
+
+        prefix = os.path.basename(cache_file).rsplit('-', 1)[0] + '-'
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(prefix) and path != cache_file:
+                os.remove(path)
+
     def parse_isa_desc(self, *args, **kwargs):
         try:
             self._parse_isa_desc(*args, **kwargs)
@@ -408,24 +408,43 @@ GarnetNetwork::collateStats()
     RubySystem *rs = params()->ruby_system;
     double time_delta = double(curCycle() - rs->getStartCycle());
 
+    // The link counters hold the activity since the last reset and this
+    // runs on every dump, so the statistics are assigned, not accumulated
+    double ext_in_link_utilization = 0;
+    double ext_out_link_utilization = 0;
+    double int_link_utilization = 0;
+    double average_link_utilization = 0;
+    vector<double> average_vc_load(m_average_vc_load.size(), 0);
+
     for (int i = 0; i < m_networklinks.size(); i++) {
         link_type type = m_networklinks[i]->getType();
         int activity = m_networklinks[i]->getLinkUtilization();
 
         if (type == EXT_IN_)
-            m_total_ext_in_link_utilization += activity;
+            ext_in_link_utilization += activity;
         else if (type == EXT_OUT_)
-            m_total_ext_out_link_utilization += activity;
+            ext_out_link_utilization += activity;
         else if (type == INT_)
-            m_total_int_link_utilization += activity;
+            int_link_utilization += activity;
 
-        m_average_link_utilization +=
+        average_link_utilization +=
             (double(activity) / time_delta);
 
         vector<unsigned int> vc_load = m_networklinks[i]->getVcLoad();
         for (int j = 0; j < vc_load.size(); j++) {
-            m_average_vc_load[j] += ((double)vc_load[j] / time_delta);
+            average_vc_load[j] += ((double)vc_load[j] / time_delta);
         }
+
+        // Per-link utilization
+        m_networklinks[i]->collateStats();
+    }
+
+    m_total_ext_in_link_utilization = ext_in_link_utilization;
+    m_total_ext_out_link_utilization = ext_out_link_utilization;
+    m_total_int_link_utilization = int_link_utilization;
+    m_average_link_utilization = average_link_utilization;
+    for (int j = 0; j < average_vc_load.size(); j++) {
+        m_average_vc_load[j] = average_vc_load[j];
     }
 
     // Ask the routers to collate their statistics
@@ -75,6 +75,23 @@ NetworkLink::wakeup()
     }
 }
 
+void
+NetworkLink::regStats()
+{
+    ClockedObject::regStats();
+
+    m_link_utilization
+        .name(name() + ".link_utilization")
+        .flags(Stats::nozero)
+    ;
+}
+
+void
+NetworkLink::collateStats()
+{
+    m_link_utilization = m_link_utilized;
+}
+
 void
 NetworkLink::resetStats()
 {
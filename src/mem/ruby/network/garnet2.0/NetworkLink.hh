@@ -37,6 +37,7 @@
 #include <iostream>
 #include <vector>
 
+#include "base/statistics.hh"
 #include "mem/ruby/common/Consumer.hh"
 #include "mem/ruby/network/garnet2.0/CommonTypes.hh"
 #include "mem/ruby/network/garnet2.0/flitBuffer.hh"
@@ -71,6 +72,8 @@ class NetworkLink : public ClockedObject, public Consumer
     inline flit* consumeLink()    { return linkBuffer->getTopFlit(); }
 
     uint32_t functionalWrite(Packet *);
+    void regStats();
+    void collateStats();
     void resetStats();
 
   private:
@@ -85,6 +88,9 @@ class NetworkLink : public ClockedObject, public Consumer
     // Statistical variables
     unsigned int m_link_utilized;
     std::vector<unsigned int> m_vc_load;
+
+    // Flits sent over this link, per link in stats.txt
+    Stats::Scalar m_link_utilization;
 };
 
 #endif // __MEM_RUBY_NETWORK_GARNET2_0_NETWORKLINK_HH__
@@ -235,13 +235,19 @@ Router::regStats()
 void
 Router::collateStats()
 {
+    // The buffer counters hold the activity since the last reset and this
+    // runs on every dump, so the statistics are assigned, not accumulated
+    double buffer_reads = 0;
+    double buffer_writes = 0;
     for (int j = 0; j < m_virtual_networks; j++) {
         for (int i = 0; i < m_input_unit.size(); i++) {
-            m_buffer_reads += m_input_unit[i]->get_buf_read_activity(j);
-            m_buffer_writes += m_input_unit[i]->get_buf_write_activity(j);
+            buffer_reads += m_input_unit[i]->get_buf_read_activity(j);
+            buffer_writes += m_input_unit[i]->get_buf_write_activity(j);
         }
     }
 
+    m_buffer_reads = buffer_reads;
+    m_buffer_writes = buffer_writes;
     m_sw_input_arbiter_activity = m_sw_alloc->get_input_arbiter_activity();
     m_sw_output_arbiter_activity = m_sw_alloc->get_output_arbiter_activity();
     m_crossbar_activity = m_switch->get_crossbar_activity();
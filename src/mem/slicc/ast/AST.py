@@ -35,6 +35,11 @@ class AST(PairContainer):
         if pairs:
             self.pairs.update(getattr(pairs, "pairs", pairs))
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # ASTs loaded from the parse cache warn as their new parser does
+        self.location.no_warning = not self.slicc.verbose
+
     @property
     def symtab(self):
         return self.slicc.symtab
@@ -28,25 +28,59 @@
 # Authors: Nathan Binkert
 #          Lena Olson
 
+import cPickle as pickle
+import hashlib
 import os.path
 import re
 import sys
+import tempfile
 
-from m5.util import code_formatter
+from m5.util import code_formatter, makeDir
+from m5.util.code_formatter import code_manifest
 from m5.util.grammar import Grammar, ParseError
 
 import slicc.ast as ast
 import slicc.util as util
 from slicc.symbols import SymbolTable
 
+# Hash of the SLICC sources, which define the pickled ASTs
+_version = None
+
+def sliccVersion():
+    global _version
+    if _version is None:
+        h = hashlib.sha1()
+        slicc_dir = os.path.dirname(os.path.abspath(__file__))
+        for root, dirs, files in sorted(os.walk(slicc_dir)):
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    with open(os.path.join(root, name), 'rb') as f:
+                        h.update(f.read())
+        _version = h.hexdigest()
+    return _version
+
 class SLICC(Grammar):
-    def __init__(self, filename, base_dir, verbose=False, traceback=False, **kwargs):
+    def __init__(self, filename, base_dir, verbose=False, traceback=False,
+                 cache_dir=None, **kwargs):
         self.protocol = None
         self.traceback = traceback
         self.verbose = verbose
         self.symtab = SymbolTable(self)
         self.base_dir = base_dir
 
+        # Files written by all code formatters, see writeCodeFiles()
+        self.manifest = code_manifest()
+
+        # Parsed files and the PLY parse tables are cached in cache_dir,
+        # see parse_file()
+        self.cache_dir = cache_dir
+        self.digests = {}
+        self.includes = []
+        if cache_dir is not None:
+            makeDir(cache_dir)
+            self.setupParserFactory(debug=0,
+                picklefile=os.path.join(cache_dir, 'parsetab.pkl'))
+
         try:
             self.decl_list = self.parse_file(filename, **kwargs)
         except ParseError, e:
@@ -54,11 +88,86 @@ class SLICC(Grammar):
                 sys.exit(str(e))
             raise
 
+    def fileDigest(self, filename):
+        '''Hash of the contents and path of a file, and of everything else
+        its parse depends on'''
+        digest = self.digests.get(filename)
+        if digest is None:
+            h = hashlib.sha1(sliccVersion())
+            h.update(os.path.abspath(filename) + '\0')
+            h.update(os.path.abspath(self.base_dir) + '\0')
+            with open(filename, 'rb') as f:
+                h.update(f.read())
+            digest = self.digests[filename] = h.hexdigest()
+        return digest
+
+    def parse_file(self, filename, **kwargs):
+        '''Parse a .sm or .slicc file, or load its declarations from the
+        cache if neither the file nor any file it includes changed since
+        it was parsed. The cached ASTs refer to this SLICC object.'''
+        if self.cache_dir is None:
+            return super(SLICC, self).parse_file(filename, **kwargs)
+
+        digest = self.fileDigest(filename)
+        cache_file = os.path.join(self.cache_dir, digest + '.pkl')
+
+        entry = self.loadParse(cache_file)
+        if entry is not None and \
+           all(self.fileDigest(f) == d for (f, d) in entry[0]):
+            (includes, protocol, decl_list) = entry
+            if protocol is not None:
+                if self.protocol:
+                    raise ParseError("Protocol can only be set once! "
+                                     "Error in %s\n" % filename)
+                self.protocol = protocol
+        else:
+            previous_protocol = self.protocol
+            self.includes.append([])
+            try:
+                decl_list = super(SLICC, self).parse_file(filename, **kwargs)
+            finally:
+                includes = self.includes.pop()
+
+            protocol = None
+            if self.protocol != previous_protocol:
+                protocol = self.protocol
+            self.saveParse(cache_file, (includes, protocol, decl_list))
+
+        # Files included by an included file are included as well
+        if self.includes:
+            self.includes[-1].append((filename, digest))
+            self.includes[-1].extend(includes)
+        return decl_list
+
+    def loadParse(self, cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                unpickler = pickle.Unpickler(f)
+                unpickler.persistent_load = lambda pid: self
+                return unpickler.load()
+        except Exception:
+            # Missing, truncated or stale cache files are parsed again
+            return None
+
+    def saveParse(self, cache_file, entry):
+        (fd, tmp_file) = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+                pickler.persistent_id = \
+                    lambda obj: 'slicc' if obj is self else None
+                pickler.dump(entry)
+            os.rename(tmp_file, cache_file)
+        except Exception:
+            # Files whose ASTs cannot be pickled are always parsed
+            os.remove(tmp_file)
+
     def currentLocation(self):
         return util.Location(self.current_source, self.current_line,
                              no_warning=not self.verbose)
 
     def codeFormatter(self, *args, **kwargs):
+        kwargs.setdefault('manifest', self.manifest)
         code = code_formatter(*args, **kwargs)
         code['protocol'] = self.protocol
         return code
@@ -66,8 +175,10 @@ class SLICC(Grammar):
     def process(self):
         self.decl_list.generate()
 
-    def writeCodeFiles(self, code_path, includes):
-        self.symtab.writeCodeFiles(code_path, includes)
+    def writeCodeFiles(self, code_path, includes, jobs=1):
+        # Files whose code did not change are left untouched
+        self.symtab.writeCodeFiles(code_path, includes, jobs)
+        self.manifest.write(os.path.join(code_path, "slicc.manifest"))
 
     def writeHTMLFiles(self, html_path):
         self.symtab.writeHTMLFiles(html_path)
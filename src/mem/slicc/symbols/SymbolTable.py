@@ -25,13 +25,28 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from multiprocessing import Pool
+
 from m5.util import makeDir
+from m5.util.code_formatter import code_manifest
 
 from slicc.generate import html
 from slicc.symbols.StateMachine import StateMachine
 from slicc.symbols.Type import Type
 from slicc.util import Location
 
+# Symbol table being written by the worker processes of
+# SymbolTable.writeCodeFiles, which inherit it when forked
+_writing = None
+
+def _writeSymbolCodeFiles(index):
+    '''Write the code of one symbol in a worker process and return what
+    it wrote, as recorded by the manifest'''
+    symtab, path, includes = _writing
+    symtab.slicc.manifest = code_manifest()
+    symtab.sym_vec[index].writeCodeFiles(path, includes)
+    return symtab.slicc.manifest.files
+
 class SymbolTable(object):
     def __init__(self, slicc):
         self.slicc = slicc
@@ -122,7 +137,7 @@ class SymbolTable(object):
             if isinstance(symbol, type):
                 yield symbol
 
-    def writeCodeFiles(self, path, includes):
+    def writeCodeFiles(self, path, includes, jobs=1):
         makeDir(path)
 
         code = self.codeFormatter()
@@ -137,8 +152,36 @@ class SymbolTable(object):
 
         code.write(path, "Types.hh")
 
-        for symbol in self.sym_vec:
-            symbol.writeCodeFiles(path, includes)
+        jobs = min(jobs, len(self.sym_vec))
+        if jobs <= 1:
+            for symbol in self.sym_vec:
+                symbol.writeCodeFiles(path, includes)
+            return
+
+        # Symbols are independent once the symbol table is resolved, so
+        # their code is written in parallel. State machines take longest
+        # and are started first.
+        order = sorted(range(len(self.sym_vec)), key=lambda i:
+                       not isinstance(self.sym_vec[i], StateMachine))
+
+        global _writing
+        _writing = (self, path, includes)
+        pool = Pool(jobs)
+        try:
+            written = pool.map(_writeSymbolCodeFiles, order, chunksize=1)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            _writing = None
+
+        # Record the written files in symbol order, as if written here
+        written = dict(zip(order, written))
+        manifest = self.slicc.manifest
+        for i in range(len(self.sym_vec)):
+            manifest.files.update(written[i])
 
     def writeHTMLFiles(self, path):
         makeDir(path)
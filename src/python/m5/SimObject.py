@@ -45,6 +45,7 @@
 
 from __future__ import print_function
 
+import json
 import sys
 from types import FunctionType, MethodType, ModuleType
 from functools import wraps
@@ -922,6 +923,28 @@ class ParamInfo(object):
     if not "created" in self.__dict__:
       self.__dict__[name] = value
 
+# Sorted parameter and port names, per SimObject class
+_sorted_names_cache = {}
+
+def _sorted_names(cls):
+    names = _sorted_names_cache.get(cls)
+    if names is None:
+        names = (sorted(cls._params.keys()), sorted(cls._ports.keys()))
+        _sorted_names_cache[cls] = names
+    return names
+
+# Return value as indented JSON text, starting at column indent
+def _json_value(value, indent=0):
+    text = json.dumps(value, indent=4, separators=(',', ': '))
+    if indent:
+        text = text.replace('\n', '\n' + ' ' * indent)
+    return text
+
+# Incremented whenever a SimObject is attached to or detached from a
+# parent.  Descendant lists and paths frozen by freezeDescendants() are
+# only used while this is unchanged.
+_hierarchy_version = 0
+
 # The SimObject class is the root of the special hierarchy.  Most of
 # the code in this class deals with the configuration hierarchy itself
 # (parent/child node relationships).
@@ -1044,6 +1067,12 @@ class SimObject(object):
         self._ccParams = None
         self._instantiated = False # really "cloned"
 
+        # descendants and path recorded by freezeDescendants()
+        self._frozen_version = -1
+        self._frozen_objs = None
+        self._frozen_range = None
+        self._path = None
+
         # Clone children specified at class level.  No need for a
         # multidict here since we will be cloning everything.
         # Do children before parameter values so that children that
@@ -1190,13 +1219,17 @@ class SimObject(object):
 
     # Also implemented by SimObjectVector
     def clear_parent(self, old_parent):
+        global _hierarchy_version
         assert self._parent is old_parent
         self._parent = None
+        _hierarchy_version += 1
 
     # Also implemented by SimObjectVector
     def set_parent(self, parent, name):
+        global _hierarchy_version
         self._parent = parent
         self._name = name
+        _hierarchy_version += 1
 
     # Return parent object of this SimObject, not implemented by
     # SimObjectVector because the elements in a SimObjectVector may not share
@@ -1252,6 +1285,9 @@ class SimObject(object):
                 self.add_child(key, val)
 
     def path(self):
+        if self._frozen_version == _hierarchy_version:
+            return self._path
+
         if not self._parent:
             return '<orphan %s>' % self.__class__
         elif isinstance(self._parent, MetaSimObject):
@@ -1351,67 +1387,104 @@ class SimObject(object):
                 port.unproxy(self)
 
     def print_ini(self, ini_file):
-        print('[' + self.path() + ']', file=ini_file)    # .ini section header
+        path = self.path()
+        instanceDict[path] = self
 
-        instanceDict[self.path()] = self
+        lines = ['[' + path + ']']    # .ini section header
 
         if hasattr(self, 'type'):
-            print('type=%s' % self.type, file=ini_file)
+            lines.append('type=%s' % self.type)
 
-        if len(self._children.keys()):
-            print('children=%s' %
-                  ' '.join(self._children[n].get_name()
-                           for n in sorted(self._children.keys())),
-                  file=ini_file)
+        if self._children:
+            lines.append('children=%s' %
+                         ' '.join(self._children[n].get_name()
+                                  for n in sorted(self._children.keys())))
 
-        for param in sorted(self._params.keys()):
-            value = self._values.get(param)
+        (param_names, port_names) = _sorted_names(self.__class__)
+
+        values = self._values
+        for param in param_names:
+            value = values.get(param)
             if value != None:
-                print('%s=%s' % (param, self._values[param].ini_str()),
-                      file=ini_file)
+                lines.append('%s=%s' % (param, value.ini_str()))
 
-        for port_name in sorted(self._ports.keys()):
-            port = self._port_refs.get(port_name, None)
+        port_refs = self._port_refs
+        for port_name in port_names:
+            port = port_refs.get(port_name, None)
             if port != None:
-                print('%s=%s' % (port_name, port.ini_str()), file=ini_file)
+                lines.append('%s=%s' % (port_name, port.ini_str()))
 
-        print(file=ini_file)        # blank line between objects
+        lines.append('\n')         # blank line between objects
+        ini_file.write('\n'.join(lines))
 
-    # generate a tree of dictionaries expressing all the parameters in the
-    # instantiated system for use by scripts that want to do power, thermal
-    # visualization, and other similar tasks
-    def get_config_as_dict(self):
-        d = attrdict()
+    # Return the entries of get_config_as_dict() in order.  Children
+    # and ports are returned as objects, whose own entries still have
+    # to be expanded.
+    def _config_entries(self):
+        d = orderdict()
         if hasattr(self, 'type'):
-            d.type = self.type
+            d['type'] = self.type
         if hasattr(self, 'cxx_class'):
-            d.cxx_class = self.cxx_class
+            d['cxx_class'] = self.cxx_class
         # Add the name and path of this object to be able to link to
         # the stats
-        d.name = self.get_name()
-        d.path = self.path()
+        d['name'] = self.get_name()
+        d['path'] = self.path()
+
+        (param_names, port_names) = _sorted_names(self.__class__)
 
-        for param in sorted(self._params.keys()):
+        for param in param_names:
             value = self._values.get(param)
             if value != None:
                 d[param] = value.config_value()
 
         for n in sorted(self._children.keys()):
-            child = self._children[n]
             # Use the name of the attribute (and not get_name()) as
             # the key in the JSON dictionary to capture the hierarchy
             # in the Python code that assembled this system
-            d[n] = child.get_config_as_dict()
+            d[n] = self._children[n]
 
-        for port_name in sorted(self._ports.keys()):
+        for port_name in port_names:
             port = self._port_refs.get(port_name, None)
             if port != None:
                 # Represent each port with a dictionary containing the
                 # prominent attributes
-                d[port_name] = port.get_config_as_dict()
+                d[port_name] = port
 
         return d
 
+    # generate a tree of dictionaries expressing all the parameters in the
+    # instantiated system for use by scripts that want to do power, thermal
+    # visualization, and other similar tasks
+    def get_config_as_dict(self):
+        d = attrdict()
+        for (key, value) in self._config_entries().iteritems():
+            if hasattr(value, 'get_config_as_dict'):
+                value = value.get_config_as_dict()
+            d[key] = value
+        return d
+
+    # Write get_config_as_dict() as JSON by calling write() with chunks
+    # of text, without building the dictionaries of the whole subtree
+    def write_config_json(self, write, indent=0):
+        entries = self._config_entries()
+        if not entries:
+            write('{}')
+            return
+
+        pad = '\n' + ' ' * (indent + 4)
+        sep = '{'
+        for (key, value) in entries.iteritems():
+            write(sep + pad + json.dumps(key) + ': ')
+            if hasattr(value, 'write_config_json'):
+                value.write_config_json(write, indent + 4)
+            else:
+                if hasattr(value, 'get_config_as_dict'):
+                    value = value.get_config_as_dict()
+                write(_json_value(value, indent + 4))
+            sep = ','
+        write('\n' + ' ' * indent + '}')
+
     def getCCParams(self):
         if self._ccParams:
             return self._ccParams
@@ -1477,6 +1550,12 @@ class SimObject(object):
         return self._ccObject
 
     def descendants(self):
+        if self._frozen_version == _hierarchy_version:
+            (start, end) = self._frozen_range
+            return iter(self._frozen_objs[start:end])
+        return self._walk_descendants()
+
+    def _walk_descendants(self):
         yield self
         # The order of the dict is implementation dependent, so sort
         # it based on the key (name) to ensure the order is the same
@@ -1485,6 +1564,30 @@ class SimObject(object):
             for obj in child.descendants():
                 yield obj
 
+    # Record the list of descendants and the path of every object in
+    # this subtree, so that the descendants() walks and path() calls
+    # made while instantiating the configuration do not recompute them.
+    # The recorded values are ignored once the hierarchy changes.
+    def freezeDescendants(self):
+        self._freeze([])
+
+    def _freeze(self, objs):
+        start = len(objs)
+        objs.append(self)
+
+        # The parent is frozen before its children, so this is not
+        # recursive
+        self._path = self.path()
+        self._frozen_version = _hierarchy_version
+
+        for (name, child) in sorted(self._children.iteritems()):
+            # iterating over a SimObject yields the object itself
+            for obj in child:
+                obj._freeze(objs)
+
+        self._frozen_objs = objs
+        self._frozen_range = (start, len(objs))
+
     # Call C++ to create C++ object corresponding to this object
     def createCCObject(self):
         self.getCCParams()
@@ -109,9 +109,11 @@ def parse_options():
     # Configuration Options
     group("Configuration Options")
     option("--dump-config", metavar="FILE", default="config.ini",
-        help="Dump configuration output file [Default: %default]")
+        help="Dump configuration output file, gzip compressed if FILE "
+             "ends in .gz [Default: %default]")
     option("--json-config", metavar="FILE", default="config.json",
-        help="Create JSON output of the configuration [Default: %default]")
+        help="Create JSON output of the configuration, gzip compressed if "
+             "FILE ends in .gz [Default: %default]")
     option("--dot-config", metavar="FILE", default="config.dot",
         help="Create DOT & pdf outputs of the configuration [Default: %default]")
     option("--dot-dvfs-config", metavar="FILE", default=None,
@@ -293,6 +293,19 @@ class SimObjectVector(VectorParamValue):
             a.append(v.get_config_as_dict())
         return a
 
+    def write_config_json(self, write, indent=0):
+        if not self:
+            write('[]')
+            return
+
+        pad = '\n' + ' ' * (indent + 4)
+        sep = '['
+        for v in self:
+            write(sep + pad)
+            v.write_config_json(write, indent + 4)
+            sep = ','
+        write('\n' + ' ' * indent + ']')
+
     # If we are replacing an item in the vector, make sure to set the
     # parent reference of the new SimObject to be the same as the parent
     # of the SimObject being replaced. Useful to have if we created
@@ -43,6 +43,8 @@
 from __future__ import print_function
 
 import atexit
+import gzip
+import io
 import os
 import sys
 
@@ -71,6 +73,14 @@ _memory_modes = {
 
 _drain_manager = _m5.drain.DrainManager.instance()
 
+# Open a configuration output file for buffered writing.  Files whose name
+# ends in .gz are gzip compressed.
+def _open_config_file(outdir, name):
+    path = os.path.join(outdir, name)
+    if name.endswith('.gz'):
+        return io.BufferedWriter(gzip.open(path, 'wb'), 1 << 20)
+    return open(path, 'w', 1 << 20)
+
 # The final hook to generate .ini files.  Called from the user script
 # once the config is built.
 def instantiate(ckpt_dir=None):
@@ -88,25 +98,27 @@ def instantiate(ckpt_dir=None):
     # hierarchy so we catch them with future descendants() walks
     for obj in root.descendants(): obj.adoptOrphanParams()
 
+    # The hierarchy is final now; record the descendants and paths once
+    # instead of recomputing them in every pass below
+    root.freezeDescendants()
+
     # Unproxy in sorted order for determinism
     for obj in root.descendants(): obj.unproxyParams()
 
     if options.dump_config:
-        ini_file = file(os.path.join(options.outdir, options.dump_config), 'w')
+        ini_file = _open_config_file(options.outdir, options.dump_config)
         # Print ini sections in sorted order for easier diffing
         for obj in sorted(root.descendants(), key=lambda o: o.path()):
             obj.print_ini(ini_file)
         ini_file.close()
 
     if options.json_config:
-        try:
-            import json
-            json_file = file(os.path.join(options.outdir, options.json_config), 'w')
-            d = root.get_config_as_dict()
-            json.dump(d, json_file, indent=4)
-            json_file.close()
-        except ImportError:
-            pass
+        # Streamed object by object instead of building the dictionaries
+        # of get_config_as_dict() for the whole system first
+        json_file = _open_config_file(options.outdir, options.json_config)
+        root.write_config_json(json_file.write)
+        json_file.write('\n')
+        json_file.close()
 
     do_dot(root, options.outdir, options.dot_config)
 
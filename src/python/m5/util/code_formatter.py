@@ -27,10 +27,96 @@
 from __future__ import print_function
 
 import __builtin__
+import hashlib
 import inspect
 import os
 import re
 import string
+import tempfile
+
+# mkstemp creates files readable only by their owner
+_umask = os.umask(0)
+os.umask(_umask)
+
+def update_file(path, data, manifest=None):
+    '''Write data to the file at path, unless the file already holds
+    exactly data. Unchanged generated files keep their timestamps, so
+    switching between build variants that generate the same code does not
+    rebuild everything that includes it. Returns True if the file was
+    written.'''
+    changed = True
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, 'rb') as f:
+                changed = f.read() != data
+    except (IOError, OSError):
+        pass
+
+    if changed:
+        # Replace the file atomically, such that an interrupted build
+        # never leaves a truncated file with a new timestamp behind
+        (fd, tmp) = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                     prefix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0666 & ~_umask)
+        os.rename(tmp, path)
+
+    if manifest is not None:
+        manifest.add(path, data, changed)
+    return changed
+
+class code_manifest(object):
+    '''Records the files written with update_file, with a hash of their
+    contents and whether they changed'''
+    def __init__(self):
+        self.files = {}
+
+    def add(self, path, data, changed):
+        self.files[os.path.abspath(path)] = \
+            (hashlib.sha1(data).hexdigest(), changed)
+
+    def changed(self):
+        return sorted(p for (p, (d, c)) in self.files.iteritems() if c)
+
+    def write(self, path):
+        '''Write one "<sha1> <changed|unchanged> <file>" line per file,
+        with file names relative to the manifest'''
+        base = os.path.dirname(os.path.abspath(path))
+        lines = []
+        for name in sorted(self.files):
+            digest, changed = self.files[name]
+            lines.append('%s %s %s\n' % (digest,
+                         'changed' if changed else 'unchanged',
+                         os.path.relpath(name, base)))
+        update_file(path, ''.join(lines))
+
+class generated_file(object):
+    '''A write-only file object that keeps its contents in memory and
+    writes them with update_file when closed'''
+    def __init__(self, path, manifest=None):
+        self.name = path
+        self.manifest = manifest
+        self.closed = False
+        self._data = []
+
+    def write(self, data):
+        assert not self.closed
+        self._data.append(data)
+
+    def getvalue(self):
+        return ''.join(self._data)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            update_file(self.name, self.getvalue(), self.manifest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 class lookup(object):
     def __init__(self, formatter, frame, *args, **kwargs):
@@ -120,6 +206,7 @@ class code_formatter(object):
     globals = True
     locals = True
     fix_newlines = True
+    manifest = None
     def __init__(self, *args, **kwargs):
         self._data = []
         self._dict = {}
@@ -127,6 +214,7 @@ class code_formatter(object):
         self._indent_spaces = 4
         self.globals = kwargs.pop('globals', type(self).globals)
         self.locals = kwargs.pop('locals', type(self).locals)
+        self.manifest = kwargs.pop('manifest', type(self).manifest)
         self._fix_newlines = \
                 kwargs.pop('fix_newlines', type(self).fix_newlines)
 
@@ -154,10 +242,10 @@ class code_formatter(object):
         self._data = []
 
     def write(self, *args):
-        f = file(os.path.join(*args), "w")
-        for data in self._data:
-            f.write(data)
-        f.close()
+        '''Write the code to os.path.join(*args) if it differs from the
+        file's current contents. Returns True if the file was written.'''
+        return update_file(os.path.join(*args), ''.join(self._data),
+                           self.manifest)
 
     def __str__(self):
         data = string.join(self._data, '')
@@ -202,54 +290,64 @@ class code_formatter(object):
 
             initial_newline = False
 
-    def __call__(self, *args, **kwargs):
-        if not args:
-            self._data.append('\n')
-            return
-
-        format = args[0]
-        args = args[1:]
-
-        frame = inspect.currentframe().f_back
+    # Segment kinds of a compiled format string
+    _literal, _lone, _ident, _pos, _eval, _invalid = range(6)
+
+    # Compiled format strings, shared by all formatters
+    _templates = {}
+    _max_templates = 10000
+
+    @classmethod
+    def _compile(cls, format):
+        '''Split a format string into a list of (kind, value) segments,
+        once per distinct format string. Literal text, including escaped
+        delimiters, is merged into single segments and ${{}} expressions
+        are compiled to code objects.'''
+        template = cls._templates.get(format)
+        if template is not None:
+            return template
+
+        segments = []
+        def literal(text):
+            if segments and segments[-1][0] == cls._literal:
+                segments[-1] = (cls._literal, segments[-1][1] + text)
+            elif text:
+                segments.append((cls._literal, text))
+
+        end = 0
+        for match in code_formatter.pattern.finditer(format):
+            literal(format[end:match.start()])
+            end = match.end()
 
-        l = lookup(self, frame, *args, **kwargs)
-        def convert(match):
-            ident = match.group('lone')
             # check for a lone identifier
+            ident = match.group('lone')
             if ident:
-                indent = match.group('indent') # must be spaces
-                lone = '%s' % (l[ident], )
-
-                def indent_lines(gen):
-                    for line in gen:
-                        yield indent
-                        yield line
-                return ''.join(indent_lines(lone.splitlines(True)))
+                segments.append((cls._lone, (match.group('indent'), ident)))
+                continue
 
             # check for an identifier, braced or not
             ident = match.group('ident') or match.group('b_ident')
             if ident is not None:
-                return '%s' % (l[ident], )
+                segments.append((cls._ident, ident))
+                continue
 
             # check for a positional parameter, braced or not
             pos = match.group('pos') or match.group('b_pos')
             if pos is not None:
-                pos = int(pos)
-                if pos > len(args):
-                    raise ValueError \
-                        ('Positional parameter #%d not found in pattern' % pos,
-                         code_formatter.pattern)
-                return '%s' % (args[int(pos)], )
+                segments.append((cls._pos, int(pos)))
+                continue
 
             # check for a double braced expression
             eval_expr = match.group('eval')
             if eval_expr is not None:
-                result = eval(eval_expr, {}, l)
-                return '%s' % (result, )
+                segments.append((cls._eval, compile(eval_expr, '<string>',
+                                                    'eval')))
+                continue
 
             # check for an escaped delimiter
             if match.group('escaped') is not None:
-                return '$'
+                literal('$')
+                continue
 
             # At this point, we have to match invalid
             if match.group('invalid') is None:
@@ -258,21 +356,64 @@ class code_formatter(object):
                                  code_formatter.pattern)
 
             i = match.start('invalid')
-            if i == 0:
-                colno = 1
-                lineno = 1
-            else:
+            if i != 0:
                 lines = format[:i].splitlines(True)
                 colno = i - reduce(lambda x,y: x+y, (len(z) for z in lines))
                 lineno = len(lines)
 
-                raise ValueError('Invalid format string: line %d, col %d' %
-                                 (lineno, colno))
+                # Raised when the segment is reached, like other errors
+                segments.append((cls._invalid,
+                                 'Invalid format string: line %d, col %d' %
+                                 (lineno, colno)))
+        literal(format[end:])
+
+        if len(cls._templates) >= cls._max_templates:
+            cls._templates.clear()
+        cls._templates[format] = segments
+        return segments
+
+    def __call__(self, *args, **kwargs):
+        if not args:
+            self._data.append('\n')
+            return
+
+        format = args[0]
+        args = args[1:]
+
+        segments = self._compile(format)
+        if len(segments) == 1 and segments[0][0] == self._literal:
+            self._append(segments[0][1])
+            return
+
+        frame = inspect.currentframe().f_back
+
+        l = lookup(self, frame, *args, **kwargs)
+        result = []
+        for kind, value in segments:
+            if kind == self._literal:
+                result.append(value)
+            elif kind == self._ident:
+                result.append('%s' % (l[value], ))
+            elif kind == self._lone:
+                indent, ident = value # indent must be spaces
+                lone = '%s' % (l[ident], )
+                result.extend(indent + line
+                              for line in lone.splitlines(True))
+            elif kind == self._pos:
+                if value > len(args):
+                    raise ValueError \
+                        ('Positional parameter #%d not found in pattern' %
+                         value, code_formatter.pattern)
+                result.append('%s' % (args[value], ))
+            elif kind == self._eval:
+                result.append('%s' % (eval(value, {}, l), ))
+            else:
+                raise ValueError(value)
 
-        d = code_formatter.pattern.sub(convert, format)
-        self._append(d)
+        self._append(''.join(result))
 
-__all__ = [ "code_formatter" ]
+__all__ = [ "code_formatter", "code_manifest", "generated_file",
+            "update_file" ]
 
 if __name__ == '__main__':
     from code_formatter import code_formatter
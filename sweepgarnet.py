@@ -0,0 +1,649 @@
+#!/usr/bin/python2
+#
+# Script for running sweeps of GarnetStandalone simulations with rungarnet
+#
+# Every combination of the given parameter values is simulated on a pool of
+# worker threads, each running one rungarnet process at a time. Finished
+# simulations are post-processed (grepnetworkstats.py, plotlatency.py,
+# plottopology.py, exportactivity.py, optionally DSENT and ingestion into a
+# results database, see util/garnetdb.py) by separate workers while the
+# next simulations are running.
+#
+# The sweep can be interrupted and restarted: finished simulations and
+# post-processing stages are recorded in 'sweep_stages.txt' in each output
+# directory, and points whose simulation finished are not simulated again.
+# A stats.txt alone does not mark a point as done, since simulations with
+# --convergence-cycles dump statistics after every interval.
+#
+# Injection rate sweeps are stopped at the saturation point of the network:
+# once a point's average packet latency exceeds a multiple of the zero-load
+# latency (the latency at the lowest injection rate), or its reception rate
+# stops growing with the injection rate, the higher injection rates of that
+# configuration are skipped. With --bisect, additional points are simulated
+# to narrow down the injection rate at which the network saturates.
+#
+# Example: 3 topologies x 50 injection rates on all cores
+#   ./sweepgarnet.py --num-cpus=64 --mesh-rows=8 \
+#       --topology=Mesh_XY,Ring,FlattenedButterfly --injrate=0.01:0.5:0.01
+
+from __future__ import print_function
+
+import copy
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import cpu_count
+from optparse import OptionParser
+from Queue import Queue, Empty
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "util"))
+from garnetstats import StatsFile, statsComplete
+from garnetdb import ResultsDB
+
+GEM5_DIR = os.path.dirname(os.path.abspath(__file__))
+DSENT_SCRIPT = os.path.join(GEM5_DIR, "util", "on-chip-network-power-area-2.0.py")
+
+STAGES_FILE = "sweep_stages.txt"
+
+# Stage recorded once rungarnet finished a simulation
+SIMULATE_STAGE = "simulate"
+LOG_FILE = "rungarnet.log"
+
+class SweepPoint(object):
+    """ A single rungarnet configuration """
+
+    def __init__(self, num_cpus, mesh_rows, concentration_factor, topology,
+                 injrate, synthetic, sim_cycles):
+        self.num_cpus = num_cpus
+        self.mesh_rows = mesh_rows
+        self.concentration_factor = concentration_factor
+        self.topology = topology
+        self.injrate = injrate
+        self.synthetic = synthetic
+        self.sim_cycles = sim_cycles
+
+    def args(self):
+        """ Positional arguments of rungarnet """
+        return [str(self.num_cpus), str(self.mesh_rows),
+                str(self.concentration_factor), self.topology, self.injrate,
+                self.synthetic, str(self.sim_cycles)]
+
+    def seriesName(self):
+        """ Name shared by all injection rates of this configuration,
+            following rungarnet's output dir naming """
+        num_cols = self.num_cpus / self.mesh_rows / self.concentration_factor
+        if self.concentration_factor > 1:
+            concentration = "%dcpus_per_router-" % self.concentration_factor
+        else:
+            concentration = ""
+        return "%s-%dcore-%dx%d-%s%s" % (self.topology, self.num_cpus,
+                                         self.mesh_rows, num_cols,
+                                         concentration, self.synthetic)
+
+    def outdir(self):
+        return os.path.join("m5out", "%s-%sinjrate-%dcycles" % \
+                            (self.seriesName(), self.injrate, self.sim_cycles))
+
+    def latencyFile(self):
+        return os.path.join("m5out", "%s-%dcycles-latency.txt" % \
+                            (self.seriesName(), self.sim_cycles))
+
+    def __str__(self):
+        return self.outdir()
+
+class Series(object):
+    """ Injection rate sweep of a single configuration, used to stop the
+        sweep when the network saturates """
+
+    def __init__(self, name, options):
+        self.name = name
+        self.latency_factor = options.saturation_latency
+        self.min_slope = options.saturation_slope
+        self.bisect_steps = options.bisect
+
+        # injection rate -> SweepPoint of the grid
+        self.points = {}
+
+        # injection rate -> (latency, reception rate), None for failed runs
+        self.results = {}
+
+        # Highest unsaturated and lowest saturated injection rate
+        self.knee = None
+        self.reason = ""
+
+        # Grid points above this injection rate are not simulated
+        self.stop_rate = None
+        self.bisected = False
+
+    def add(self, point):
+        self.points[float(point.injrate)] = point
+
+    def cancelled(self, point):
+        return self.stop_rate is not None and \
+            float(point.injrate) > self.stop_rate
+
+    def zeroLoadLatency(self):
+        """ Return the latency at the lowest injection rate at which packets
+            were received, or None if there is none """
+        for rate in sorted(self.results):
+            result = self.results[rate]
+            if result is not None and result[0] > 0 and result[1] > 0:
+                return result[0]
+        return None
+
+    def saturated(self, prev_rate, rate):
+        """ Return the reason why the network is saturated at 'rate',
+            compared to 'prev_rate', or None if it is not """
+        zero_load_latency = self.zeroLoadLatency()
+        (prev_latency, prev_throughput) = self.results[prev_rate]
+        (latency, throughput) = self.results[rate]
+
+        # The latency criterion needs a zero-load latency to compare with
+        if self.latency_factor > 0 and zero_load_latency is not None and \
+                latency > self.latency_factor * zero_load_latency:
+            return "latency %.1f > %g x zero-load latency %.1f" % \
+                (latency, self.latency_factor, zero_load_latency)
+
+        if self.min_slope > 0 and \
+                throughput - prev_throughput < \
+                self.min_slope * (rate - prev_rate):
+            return "reception rate %.4f -> %.4f" % (prev_throughput, throughput)
+
+        return None
+
+    def update(self, point, result):
+        """ Record the result of point, and return the list of points to
+            simulate for bisecting the saturation point """
+        rate = float(point.injrate)
+        self.results[rate] = result
+        if result is None:
+            return []
+
+        if self.knee is not None:
+            if not self.knee[0] < rate < self.knee[1]:
+                return []
+
+            # Result of a bisection point
+            if self.saturated(self.knee[0], rate):
+                self.knee[1] = rate
+            else:
+                self.knee[0] = rate
+
+            points = self.bisect(point)
+            self.bisected = not points
+            return points
+
+        # Only decide on a contiguous range of results from the lowest rate
+        rates = sorted(self.points)
+        for (i, r) in enumerate(rates):
+            if self.results.get(r) is None:
+                return []
+            if i == 0:
+                continue
+
+            reason = self.saturated(rates[i - 1], r)
+            if reason:
+                self.knee = [rates[i - 1], r]
+                self.reason = reason
+                self.stop_rate = r
+                return self.bisect(point)
+
+        return []
+
+    def bisect(self, point):
+        if self.bisect_steps <= 0:
+            return []
+        self.bisect_steps -= 1
+
+        injrate = formatRate((self.knee[0] + self.knee[1]) / 2)
+        if float(injrate) in self.knee:
+            return []
+
+        mid_point = copy.copy(point)
+        mid_point.injrate = injrate
+        return [mid_point]
+
+## Parse a comma separated list of values, where each value may be a
+## range 'start:stop:step' (inclusive)
+def parseList(s, convert):
+    values = []
+    for item in s.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if ":" in item:
+            (start, stop, step) = [float(x) for x in item.split(":")]
+            n = int(round((stop - start) / step))
+            for i in range(n + 1):
+                values.append(convert(start + i * step))
+        else:
+            values.append(convert(item))
+    return values
+
+## Format an injection rate as passed to rungarnet and used in output dirs
+def formatRate(x):
+    return "{0:g}".format(round(float(x), 6))
+
+## Build the list of sweep points, injection rate varying fastest
+def makeGrid(options):
+    grid = itertools.product(parseList(options.topology, str),
+                             parseList(options.num_cpus, int),
+                             parseList(options.mesh_rows, int),
+                             parseList(options.concentration_factor, int),
+                             parseList(options.synthetic, str),
+                             parseList(options.sim_cycles, int),
+                             parseList(options.injrate, formatRate))
+
+    return [SweepPoint(num_cpus, mesh_rows, concentration_factor, topology,
+                       injrate, synthetic, sim_cycles)
+            for (topology, num_cpus, mesh_rows, concentration_factor,
+                 synthetic, sim_cycles, injrate) in grid]
+
+## Return the available memory in MB, or None if unknown
+def availableMemory():
+    try:
+        with open("/proc/meminfo") as f:
+            meminfo = dict((l.split(":")[0], l.split()[1]) for l in f)
+    except (IOError, IndexError):
+        return None
+
+    for key in ("MemAvailable", "MemFree"):
+        if key in meminfo:
+            return int(meminfo[key]) / 1024
+    return None
+
+## Number of concurrent simulations that fit in the cores and memory
+def defaultJobs(mem_per_job):
+    jobs = cpu_count()
+    mem = availableMemory()
+    if mem is not None and mem_per_job > 0:
+        jobs = min(jobs, mem / mem_per_job)
+    return max(1, jobs)
+
+## Return (average packet latency, reception rate as in
+## plotlatencythroughput.py)
+## of a finished simulation
+def readResults(point):
+    stats = StatsFile(os.path.join(point.outdir(), "stats.txt"))
+    latency = stats.get("system.ruby.network.average_packet_latency")
+    return (latency, stats.getReceptionRate(point.num_cpus))
+
+def readStages(outdir):
+    stages_file = os.path.join(outdir, STAGES_FILE)
+    if not os.path.isfile(stages_file):
+        return set()
+    with open(stages_file) as f:
+        return set(l.strip() for l in f)
+
+def writeStage(outdir, stage):
+    with open(os.path.join(outdir, STAGES_FILE), "a") as f:
+        f.write(stage + "\n")
+
+## Return True if the simulation of point ran to completion in an earlier
+## sweep, i.e. rungarnet exited successfully
+def simulated(point):
+    return SIMULATE_STAGE in readStages(point.outdir())
+
+class Sweep(object):
+    """ Simulation and post-processing worker pools """
+
+    def __init__(self, points, options):
+        self.options = options
+        self.sim_queue = Queue()
+        self.post_queue = Queue()
+        self.lock = threading.Lock()
+        self.dsent_lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self.db = ResultsDB(options.db) if options.db else None
+        self.stopping = threading.Event()
+        self.procs = {}
+
+        self.num_sims = 0
+        self.num_done = 0
+        self.num_failed = 0
+        self.num_skipped = 0
+        self.num_cancelled = 0
+        self.num_running = 0
+
+        self.series = {}
+        for point in points:
+            self.seriesOf(point).add(point)
+
+        # Interleave the configurations, so that the injection rates of
+        # each configuration are simulated in increasing order
+        index = dict((p, i) for (i, p) in enumerate(points))
+        position = {}
+        for series in self.series.values():
+            for (i, rate) in enumerate(sorted(series.points)):
+                position[series.points[rate]] = i
+        points = sorted(points, key=lambda p: (position[p], index[p]))
+
+        # Results of points that were simulated by an earlier sweep
+        pending = []
+        for point in points:
+            if simulated(point):
+                self.num_skipped += 1
+                self.post_queue.put(point)
+                pending.extend(self.record(point, readResults(point)))
+            else:
+                pending.append(point)
+
+        for point in pending:
+            self.queue(point)
+
+    def seriesOf(self, point):
+        key = (point.seriesName(), point.sim_cycles)
+        if key not in self.series:
+            name = "%s-%dcycles" % key
+            self.series[key] = Series(name, self.options)
+        return self.series[key]
+
+    def record(self, point, result):
+        """ Pass the result of point to its series, and return new points
+            to simulate. Must be called with self.lock held or before the
+            workers are started """
+        series = self.seriesOf(point)
+        saturated = series.knee is not None
+        bisected = series.bisected
+        new_points = series.update(point, result)
+
+        if not saturated and series.knee is not None:
+            print("%s: saturated at injection rate %g (%s)" % \
+                  (series.name, series.stop_rate, series.reason))
+            self.cancel(series)
+        elif saturated and series.bisected and not bisected:
+            print("%s: saturation between injection rates %g and %g" % \
+                  (series.name, series.knee[0], series.knee[1]))
+
+        # Bisection points may be complete from an earlier sweep
+        points = []
+        for new_point in new_points:
+            if simulated(new_point):
+                self.num_skipped += 1
+                self.post_queue.put(new_point)
+                points.extend(self.record(new_point,
+                                          readResults(new_point)))
+            else:
+                points.append(new_point)
+        return points
+
+    def queue(self, point):
+        if self.options.early_stop and self.seriesOf(point).cancelled(point):
+            self.num_cancelled += 1
+            return
+        self.sim_queue.put(point)
+        self.num_sims += 1
+
+    def cancel(self, series):
+        """ Stop simulations of series above its saturation point. Queued
+            points are dropped by the workers """
+        if not self.options.early_stop:
+            return
+        for (proc, point) in self.procs.items():
+            if point is not None and series.cancelled(point) and \
+                    self.seriesOf(point) is series:
+                try:
+                    os.killpg(proc.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+    def log(self, msg):
+        with self.lock:
+            print(msg)
+            sys.stdout.flush()
+
+    def call(self, cmd, log_file, env=None, point=None):
+        """ Run cmd in its own process group, so that it can be killed
+            together with its children on interrupt """
+        with open(log_file, "a") as log:
+            proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                                    env=env, preexec_fn=os.setsid)
+            with self.lock:
+                self.procs[proc] = point
+            try:
+                return proc.wait()
+            finally:
+                with self.lock:
+                    del self.procs[proc]
+
+    def simulate(self, point):
+        outdir = point.outdir()
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir)
+
+        # Stages of an earlier, incomplete run are invalid
+        stages_file = os.path.join(outdir, STAGES_FILE)
+        if os.path.isfile(stages_file):
+            os.remove(stages_file)
+
+        env = dict(os.environ)
+        env["GARNET_OUTDIR"] = outdir
+        env["GARNET_POSTPROCESS"] = "0"
+
+        start = time.time()
+        exitcode = self.call(["./rungarnet"] + point.args(),
+                             os.path.join(outdir, LOG_FILE), env, point)
+
+        ok = exitcode == 0 and statsComplete(os.path.join(outdir, "stats.txt"))
+        if ok:
+            writeStage(outdir, SIMULATE_STAGE)
+        with self.lock:
+            if not ok and self.options.early_stop and \
+                    self.seriesOf(point).cancelled(point):
+                # Killed after its series saturated
+                self.num_sims -= 1
+                self.num_cancelled += 1
+                return False
+
+            self.num_done += 1
+            if not ok:
+                self.num_failed += 1
+            progress = "[%d/%d]" % (self.num_done, self.num_sims)
+
+        if ok:
+            self.log("%s %s (%.0fs)" % (progress, outdir, time.time() - start))
+        else:
+            self.log("%s %s FAILED, see %s" % \
+                     (progress, outdir, os.path.join(outdir, LOG_FILE)))
+        return ok
+
+    def postProcess(self, point):
+        outdir = point.outdir()
+        done = readStages(outdir)
+        log_file = os.path.join(outdir, LOG_FILE)
+
+        stages = [("grepnetworkstats",
+                   ["python", "grepnetworkstats.py", outdir], None),
+                  ("plotlatency",
+                   ["python", "plotlatency.py", outdir, point.latencyFile(),
+                    point.injrate], None),
+                  ("plottopology", ["python", "plottopology.py", outdir], None),
+                  ("exportactivity", ["python", "exportactivity.py", outdir],
+                   None)]
+        if self.options.dsent:
+            stages.append(("dsent",
+                           ["python", DSENT_SCRIPT, "--jobs=1", outdir],
+                           os.path.join(outdir, "dsent_out.txt")))
+        if self.db is not None:
+            stages.append(("ingest", None, None))
+
+        for (stage, cmd, out_file) in stages:
+            if stage in done or self.stopping.is_set():
+                continue
+
+            if stage == "ingest":
+                with self.db_lock:
+                    exitcode = 0 if self.db.ingest(outdir) else 1
+            elif stage == "dsent":
+                # The DSENT module is (re)built on first use, serialize
+                # DSENT runs to avoid concurrent builds
+                with self.dsent_lock:
+                    if os.path.isfile(out_file):
+                        os.remove(out_file)
+                    exitcode = self.call(cmd, out_file)
+            else:
+                exitcode = self.call(cmd, out_file or log_file)
+
+            if exitcode != 0:
+                if not self.stopping.is_set():
+                    self.log("%s: %s failed" % (outdir, stage))
+                return
+            writeStage(outdir, stage)
+
+    def simWorker(self):
+        while not self.stopping.is_set():
+            try:
+                point = self.sim_queue.get(timeout=0.5)
+            except Empty:
+                # Running simulations may still add bisection points
+                with self.lock:
+                    if self.num_running == 0:
+                        return
+                continue
+
+            with self.lock:
+                if self.options.early_stop and \
+                        self.seriesOf(point).cancelled(point):
+                    self.num_sims -= 1
+                    self.num_cancelled += 1
+                    continue
+                self.num_running += 1
+
+            ok = self.simulate(point)
+            if self.stopping.is_set():
+                break
+
+            result = readResults(point) if ok else None
+            with self.lock:
+                self.num_running -= 1
+                for new_point in self.record(point, result):
+                    self.queue(new_point)
+                sys.stdout.flush()
+
+            if ok:
+                self.post_queue.put(point)
+
+    def postWorker(self, sim_threads):
+        while not self.stopping.is_set():
+            try:
+                point = self.post_queue.get(timeout=0.5)
+            except Empty:
+                if not any(t.is_alive() for t in sim_threads):
+                    return
+                continue
+            self.postProcess(point)
+
+    def run(self, jobs, post_jobs):
+        self.log("Simulating %d points, %d already complete, " \
+                 "%d simulation and %d post-processing workers" % \
+                 (self.num_sims, self.num_skipped, jobs, post_jobs))
+
+        sim_threads = [threading.Thread(target=self.simWorker)
+                       for i in range(jobs)]
+        post_threads = [threading.Thread(target=self.postWorker,
+                                         args=(sim_threads,))
+                        for i in range(post_jobs)]
+        threads = sim_threads + post_threads
+        for t in threads:
+            t.daemon = True
+            t.start()
+
+        try:
+            # Join with a timeout to keep the main thread interruptible
+            while any(t.is_alive() for t in threads):
+                for t in threads:
+                    t.join(0.5)
+        except KeyboardInterrupt:
+            self.log("Interrupted, stopping running simulations")
+            self.stop()
+            for t in threads:
+                t.join()
+
+        if self.db is not None:
+            self.db.close()
+
+        self.log("%d simulated, %d failed, %d skipped, " \
+                 "%d past saturation" % \
+                 (self.num_done - self.num_failed, self.num_failed,
+                  self.num_skipped, self.num_cancelled))
+        return self.num_failed == 0 and not self.stopping.is_set()
+
+    def stop(self):
+        self.stopping.set()
+        with self.lock:
+            procs = list(self.procs.keys())
+        for proc in procs:
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+def main():
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option("--num-cpus", default="64",
+                      help="number of cpu's")
+    parser.add_option("--mesh-rows", default="8",
+                      help="number of rows in the topology structure")
+    parser.add_option("--concentration-factor", default="1",
+                      help="number of cpu's per router")
+    parser.add_option("--topology", default="Mesh_XY",
+                      help="name of the .py-file in configs/topologies/")
+    parser.add_option("--injrate", default="0.02:0.5:0.02",
+                      help="traffic injection rate in packets/node/cycle")
+    parser.add_option("--synthetic", default="uniform_random",
+                      help="synthetic traffic type")
+    parser.add_option("--sim-cycles", default="20000",
+                      help="total number of cycles to simulate")
+    parser.add_option("-j", "--jobs", type="int", default=0,
+                      help="number of concurrent simulations " \
+                           "(default: limited by cores and --mem-per-job)")
+    parser.add_option("--mem-per-job", type="int", default=1024,
+                      help="memory in MB reserved per simulation " \
+                           "[default: %default]")
+    parser.add_option("--post-jobs", type="int", default=0,
+                      help="number of post-processing workers " \
+                           "(default: jobs / 4)")
+    parser.add_option("--dsent", action="store_true", default=False,
+                      help="calculate power and area with DSENT")
+    parser.add_option("--db", default=None,
+                      help="insert the results into this results database")
+    parser.add_option("--saturation-latency", type="float", default=3.0,
+                      help="stop a sweep when the latency exceeds this " \
+                           "multiple of the zero-load latency, 0 disables " \
+                           "[default: %default]")
+    parser.add_option("--saturation-slope", type="float", default=0.5,
+                      help="stop a sweep when the reception rate grows by " \
+                           "less than this fraction of the injection rate " \
+                           "step, 0 disables [default: %default]")
+    parser.add_option("--bisect", type="int", default=0,
+                      help="number of extra points simulated to narrow " \
+                           "down the saturation point [default: %default]")
+    parser.add_option("--no-early-stop", dest="early_stop",
+                      action="store_false", default=True,
+                      help="simulate all points, only report saturation")
+    parser.add_option("-n", "--dry-run", action="store_true", default=False,
+                      help="only list the points that would be simulated")
+    parser.epilog = "Parameters take a comma separated list of values; " \
+                    "numeric values may be given as start:stop:step ranges."
+    (options, args) = parser.parse_args()
+
+    os.chdir(GEM5_DIR)
+    points = makeGrid(options)
+
+    if options.dry_run:
+        for point in points:
+            print("%s %s" % ("done" if simulated(point) else "todo", point))
+        return
+
+    jobs = options.jobs or defaultJobs(options.mem_per_job)
+    post_jobs = options.post_jobs or max(1, jobs / 4)
+
+    if not Sweep(points, options).run(jobs, post_jobs):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# Checks of the results database util/garnetdb.py
+#
+# Ingests sample simulation directories of a 1x2 mesh into a temporary
+# SQLite file.
+#
+# Usage: python2 -m unittest discover -s tests/garnet
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(os.path.join(ROOT, "util"))
+from garnetdb import DSENT_RECORD_FILE, ResultsDB, findRuns, peakResults
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CONFIG = """\
+[system]
+children=cpu0 cpu1 cpu2 cpu3 ruby
+
+[system.cpu0]
+type=GarnetSyntheticTraffic
+inj_rate=%(injrate)s
+traffic_type=uniform_random
+sim_cycles=4000
+
+[system.ruby.clk_domain]
+type=SrcClockDomain
+clock=2
+
+[system.ruby.network]
+type=GarnetNetwork
+topology=Mesh_XY
+num_rows=1
+concentration_factor=2
+routing_algorithm=1
+vcs_per_vnet=4
+buffers_per_data_vc=4
+buffers_per_ctrl_vc=1
+ni_flit_size=16
+number_of_virtual_networks=3
+routers=system.ruby.network.routers0 system.ruby.network.routers1
+int_links=system.ruby.network.int_links0 system.ruby.network.int_links1
+ext_links=
+
+[system.ruby.network.routers0]
+type=GarnetRouter
+clk_domain=system.ruby.clk_domain
+
+[system.ruby.network.routers1]
+type=GarnetRouter
+clk_domain=system.ruby.clk_domain
+
+[system.ruby.network.int_links0]
+type=GarnetIntLink
+src_node=system.ruby.network.routers0
+dst_node=system.ruby.network.routers1
+latency=1
+
+[system.ruby.network.int_links0.network_link]
+type=NetworkLink
+clk_domain=system.ruby.clk_domain
+
+[system.ruby.network.int_links1]
+type=GarnetIntLink
+src_node=system.ruby.network.routers1
+dst_node=system.ruby.network.routers0
+latency=1
+
+[system.ruby.network.int_links1.network_link]
+type=NetworkLink
+clk_domain=system.ruby.clk_domain
+"""
+
+STATS = """
+---------- Begin Simulation Statistics ----------
+sim_ticks                                        8000                       # Number of ticks simulated
+system.ruby.clk_domain.clock                        2                       # Clock period in ticks
+system.ruby.network.packets_received     |  %(vnet0)10d     66.67%%     66.67%% |  %(vnet1)10d     33.33%%    100.00%% |           0      0.00%%    100.00%% # number of packets received
+system.ruby.network.packets_received::total  %(total)10d                       # number of packets received
+system.ruby.network.packets_injected::total  %(total)10d                       # number of packets injected
+system.ruby.network.average_packet_latency  %(latency)10f                       # average packet latency
+system.ruby.network.routers0.buffer_reads          420                       # Number of buffer reads
+
+---------- End Simulation Statistics   ----------
+"""
+
+class ResultsDBTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmpdir, "runs")
+        self.db = ResultsDB(os.path.join(self.tmpdir, "results.db"))
+
+        # Reception rates of 0.0009375 and 0.00125 packets/node/tick
+        self.low = self.makeRun("low", 0.01, 20, 10, 12.5, 1.5)
+        self.high = self.makeRun("high", 0.1, 20, 20, 30.0, 2.5)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def makeRun(self, name, injrate, vnet0, vnet1, latency, dynamic_power):
+        outdir = os.path.join(self.root, name)
+        os.makedirs(outdir)
+        with open(os.path.join(outdir, "config.ini"), "w") as f:
+            f.write(CONFIG % {"injrate": injrate})
+        with open(os.path.join(outdir, "stats.txt"), "w") as f:
+            f.write(STATS % {"vnet0": vnet0, "vnet1": vnet1,
+                             "total": vnet0 + vnet1, "latency": latency})
+        with open(os.path.join(outdir, DSENT_RECORD_FILE), "w") as f:
+            json.dump({"total/Dynamic power": dynamic_power,
+                       "total/Leakage power": 0.5}, f)
+        return outdir
+
+    def ingest(self, force=False):
+        return self.db.ingestAll(findRuns([self.root]), 1, force)
+
+    def runId(self, outdir):
+        return self.db.runId(os.path.abspath(outdir))
+
+    def test_runs(self):
+        self.assertEqual(self.ingest(), 2)
+        row = self.db.query("SELECT topology, num_rows, num_cpus, "
+                            "num_routers, synthetic, injrate, sim_cycles "
+                            "FROM runs WHERE run_id = ?",
+                            (self.runId(self.high),))
+        self.assertEqual(row, [("Mesh_XY", 1, 4, 2, "uniform_random", 0.1,
+                                4000)])
+
+    def test_params(self):
+        self.ingest()
+        params = dict(self.db.query("SELECT name, value FROM params "
+                                    "WHERE run_id = ?",
+                                    (self.runId(self.low),)))
+        self.assertEqual(params["system.ruby.network.vcs_per_vnet"], "4")
+        self.assertEqual(params["cpu.inj_rate"], "0.01")
+        # References to children are not parameters
+        self.assertFalse("system.ruby.network.routers" in params)
+
+    def test_stats(self):
+        self.ingest()
+        stats = dict(self.db.query("SELECT name, value FROM stats "
+                                   "WHERE run_id = ?",
+                                   (self.runId(self.low),)))
+        network = "system.ruby.network."
+        self.assertEqual(stats[network + "average_packet_latency"], 12.5)
+        self.assertEqual(stats[network + "packets_received::total"], 30)
+        self.assertEqual(stats[network + "packets_received::0"], 20)
+        self.assertEqual(stats[network + "packets_received::1"], 10)
+        self.assertEqual(stats[network + "routers0.buffer_reads"], 420)
+        self.assertEqual(stats["num_cycles"], 4000)
+        self.assertAlmostEqual(stats["reception_rate"], 30 / 4.0 / 8000)
+
+        # Only network statistics are stored
+        self.assertFalse("sim_ticks" in stats)
+
+    def test_results_view(self):
+        self.ingest()
+        row = self.db.query("SELECT latency, reception_rate, dynamic_power, "
+                            "leakage_power FROM results WHERE run_id = ?",
+                            (self.runId(self.high),))
+        self.assertEqual(len(row), 1)
+        (latency, reception_rate, dynamic_power, leakage_power) = row[0]
+        self.assertEqual(latency, 30.0)
+        self.assertAlmostEqual(reception_rate, 40 / 4.0 / 8000)
+        self.assertEqual(dynamic_power, 2.5)
+        self.assertEqual(leakage_power, 0.5)
+
+    def test_unchanged_runs_are_skipped(self):
+        self.assertEqual(self.ingest(), 2)
+        self.assertEqual(self.ingest(), 0)
+
+        # A changed run is ingested again and replaces its rows
+        stats_file = os.path.join(self.low, "stats.txt")
+        with open(stats_file, "w") as f:
+            f.write(STATS % {"vnet0": 40, "vnet1": 0, "total": 40,
+                             "latency": 14.0})
+        mtime = os.path.getmtime(stats_file) + 10
+        os.utime(stats_file, (mtime, mtime))
+        self.assertEqual(self.ingest(), 1)
+
+        run_id = self.runId(self.low)
+        self.assertEqual(self.db.query("SELECT COUNT(*) FROM runs"), [(2,)])
+        self.assertEqual(self.db.query("SELECT value FROM stats WHERE "
+                                       "run_id = ? AND name = ?",
+                                       (run_id, "system.ruby.network."
+                                        "average_packet_latency")),
+                         [(14.0,)])
+
+        self.assertEqual(self.ingest(force=True), 2)
+
+    def test_prune(self):
+        self.ingest()
+        shutil.rmtree(self.low)
+        self.assertEqual(self.db.prune(), 1)
+        self.assertEqual(self.db.query("SELECT outdir FROM runs"),
+                         [(os.path.abspath(self.high),)])
+        self.assertEqual(self.db.query("SELECT COUNT(*) FROM stats "
+                                       "WHERE run_id NOT IN "
+                                       "(SELECT run_id FROM runs)"), [(0,)])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_peak_results(self):
+        self.ingest()
+        peak = peakResults(self.db, 4)
+        self.assertEqual(list(peak["label"]), ["Mesh_XY 1x2"])
+        self.assertAlmostEqual(peak["reception_rate"][0], 40 / 4.0 / 8000)
+        self.assertEqual(peak["injrate"][0], 0.1)
+        self.assertEqual(peak["latency"][0], 30.0)
+        self.assertEqual(peak["dynamic_power"][0], 2.5)
+
+        self.assertEqual(len(peakResults(self.db, 16)["label"]), 0)
+
+if __name__ == "__main__":
+    unittest.main()
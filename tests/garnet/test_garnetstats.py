@@ -0,0 +1,203 @@
+# Checks of the stats.txt reader util/garnetstats.py
+#
+# Parses the rubytest reference output of tests/quick and Garnet network
+# statistics in the format of src/base/stats/text.cc.
+#
+# Usage: python2 -m unittest discover -s tests/garnet
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(os.path.join(ROOT, "util"))
+from garnetstats import StatsFile, readLastDump, readNewDumps, readStats, \
+    statsComplete
+
+REF_STATS = os.path.join(ROOT, "tests", "quick", "se", "60.rubytest", "ref",
+                         "null", "none", "rubytest-ruby", "stats.txt")
+
+BEGIN = "\n---------- Begin Simulation Statistics ----------\n"
+END = "\n---------- End Simulation Statistics   ----------\n"
+
+# Garnet network statistics of 3 vnets: packets_received has the pdf,
+# total, nozero and oneline flags, packet_network_latency only oneline
+GARNET_STATS = """\
+sim_ticks                                        8000                       # Number of ticks simulated
+system.ruby.clk_domain.clock                        2                       # Clock period in ticks
+system.ruby.network.packets_received     |         100     66.67%     66.67% |          50     33.33%    100.00% |           0      0.00%    100.00% # number of packets received
+system.ruby.network.packets_received::total          150                       # number of packets received
+system.ruby.network.packets_injected     |         110     68.75%     68.75% |          50     31.25%    100.00% |           0      0.00%    100.00% # number of packets injected
+system.ruby.network.packets_injected::total          160                       # number of packets injected
+system.ruby.network.packet_network_latency |        1500                       |         900                       |           0                       # packet network latency
+system.ruby.network.average_packet_latency    16.000000                       # average packet latency
+system.ruby.network.routers00.buffer_reads          420                       # Number of buffer reads
+"""
+
+# The same statistics of a single vnet: vectors of size 1 are printed as
+# scalars
+SINGLE_VNET_STATS = """\
+system.ruby.network.packets_received              150                       # number of packets received
+system.ruby.network.packets_received::total          150                       # number of packets received
+system.ruby.network.packet_network_latency         2400                       # packet network latency
+"""
+
+def dump(stats):
+    return BEGIN + stats + END
+
+class StatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, text, name="stats.txt", mode="w"):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, mode) as f:
+            f.write(text)
+        return path
+
+class ReferenceStatsTest(unittest.TestCase):
+    """ The rubytest reference output of tests/quick """
+
+    def setUp(self):
+        self.stats = StatsFile(REF_STATS)
+
+    def test_single_dump(self):
+        self.assertEqual(len(self.stats), 1)
+
+    def test_scalars(self):
+        self.assertEqual(self.stats.get("sim_ticks"), 39431)
+        self.assertEqual(self.stats.get("system.ruby.clk_domain.clock"), 1)
+        self.assertEqual(self.stats.get("no.such.stat"), 0.0)
+        self.assertEqual(self.stats.get("no.such.stat", None), None)
+
+    def test_vector_with_subnames(self):
+        self.assertEqual(self.stats.get("system.mem_ctrls.bytes_read::total"),
+                         60224)
+        # The total is not an element
+        self.assertEqual(self.stats.getVector("system.mem_ctrls.bytes_read"),
+                         [60224])
+
+    def test_oneline_histogram(self):
+        buckets = self.stats.getVector("system.ruby.delayHist")
+        self.assertEqual(len(buckets), 10)
+        self.assertEqual(buckets[0], 1808)
+        self.assertEqual(sum(buckets), 1878)
+
+        dist = self.stats.getDistribution("system.ruby.delayHist")
+        self.assertEqual(dist["samples"], 1878)
+        self.assertEqual(dist["total"], 1878)
+        self.assertAlmostEqual(dist["mean"], 0.221512)
+
+    def test_num_cycles(self):
+        # No CPU cycles, so the simulated ticks
+        self.assertEqual(self.stats.getNumCycles(), 39431)
+
+    def test_cache(self):
+        self.assertTrue(readStats(REF_STATS) is readStats(REF_STATS))
+
+    def test_complete(self):
+        self.assertTrue(statsComplete(REF_STATS))
+
+class GarnetStatsTest(StatsTestCase):
+
+    def test_oneline_vector_with_total(self):
+        stats = StatsFile(self.write(dump(GARNET_STATS)))
+        network = "system.ruby.network."
+        self.assertEqual(stats.getVector(network + "packets_received"),
+                         [100, 50, 0])
+        self.assertEqual(stats.get(network + "packets_received::total"),
+                         150)
+        self.assertEqual(stats.getVector(network + "packet_network_latency"),
+                         [1500, 900, 0])
+        self.assertEqual(stats.get(network + "packet_network_latency::total",
+                                   None), None)
+        self.assertEqual(stats.get(network + "average_packet_latency"), 16)
+
+    def test_size_one_vector(self):
+        stats = StatsFile(self.write(dump(SINGLE_VNET_STATS)))
+        network = "system.ruby.network."
+        self.assertEqual(stats.getVector(network + "packets_received"), [150])
+        self.assertEqual(stats.getVector(network + "packet_network_latency"),
+                         [2400])
+
+    def test_reception_rate(self):
+        stats = StatsFile(self.write(dump(GARNET_STATS)))
+        # 160 injected packets over 4 nodes and 8000 ticks, as plotted by
+        # plotlatencythroughput.py
+        self.assertEqual(stats.getNetworkCycles(), 4000)
+        self.assertAlmostEqual(stats.getReceptionRate(4), 160 / 4.0 / 8000)
+        self.assertEqual(stats.getReceptionRate(0), 0.0)
+
+class MultipleDumpsTest(StatsTestCase):
+
+    def setUp(self):
+        StatsTestCase.setUp(self)
+        self.second = GARNET_STATS.replace("buffer_reads          420",
+                                           "buffer_reads          840")
+        self.path = self.write(dump(GARNET_STATS) + dump(self.second))
+
+    def test_dumps(self):
+        stats = StatsFile(self.path)
+        name = "system.ruby.network.routers00.buffer_reads"
+        self.assertEqual(len(stats), 2)
+        self.assertEqual(stats.get(name), 840)
+        self.assertEqual(stats.get(name, dump=0), 420)
+
+    def test_last_dump_prefixes(self):
+        last = readLastDump(self.path, ("system.ruby.network.routers",
+                                        "sim_ticks"))
+        self.assertEqual(sorted(last.keys()),
+                         ["sim_ticks",
+                          "system.ruby.network.routers00.buffer_reads"])
+        self.assertEqual(last.get("system.ruby.network.routers00."
+                                  "buffer_reads"), 840)
+
+        last = readLastDump(self.path)
+        self.assertEqual(last.getVector("system.ruby.network."
+                                        "packets_received"), [100, 50, 0])
+
+    def test_last_dump_unfinished(self):
+        # A dump that is still being written is skipped
+        third = GARNET_STATS.replace("buffer_reads          420",
+                                     "buffer_reads          999")
+        self.write(BEGIN + third, mode="a")
+        last = readLastDump(self.path)
+        self.assertEqual(last.get("system.ruby.network.routers00."
+                                  "buffer_reads"), 840)
+        self.assertFalse(statsComplete(self.path))
+
+    def test_new_dumps(self):
+        path = self.write(dump(GARNET_STATS))
+        (dumps, offset) = readNewDumps(path)
+        self.assertEqual(len(dumps), 1)
+        self.assertEqual(offset, os.path.getsize(path))
+
+        # Nothing new
+        self.assertEqual(readNewDumps(path, offset), ([], offset))
+
+        # A partially flushed dump is left for the next call
+        text = dump(self.second)
+        split = text.index("buffer_reads")
+        self.write(text[:split], mode="a")
+        self.assertEqual(readNewDumps(path, offset), ([], offset))
+
+        self.write(text[split:], mode="a")
+        (dumps, offset) = readNewDumps(path, offset)
+        self.assertEqual(len(dumps), 1)
+        self.assertEqual(dumps[0].get("system.ruby.network.routers00."
+                                      "buffer_reads"), 840)
+        self.assertEqual(offset, os.path.getsize(path))
+
+    def test_missing_file(self):
+        path = os.path.join(self.tmpdir, "missing.txt")
+        self.assertEqual(readNewDumps(path, 10), ([], 10))
+        self.assertFalse(statsComplete(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# Checks of configs/example/garnet_synth_traffic.py against a gem5 build
+#
+# The statistics of a run that dumps after every --convergence-cycles
+# interval must match those of a run of the same length that dumps once.
+# Skipped unless the gem5 binary in $GEM5 (default build/NULL/gem5.debug)
+# exists.
+#
+# Usage: python2 -m unittest discover -s tests/garnet
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.append(os.path.join(ROOT, "util"))
+from garnetstats import StatsFile
+
+GEM5 = os.environ.get("GEM5", os.path.join(ROOT, "build", "NULL",
+                                           "gem5.debug"))
+CONFIG = os.path.join(ROOT, "configs", "example", "garnet_synth_traffic.py")
+
+SIM_CYCLES = 4000
+
+# Options of a small mesh that sees traffic on all links
+NETWORK_OPTIONS = ["--network=garnet2.0", "--num-cpus=16", "--num-dirs=16",
+                   "--topology=Mesh_XY", "--mesh-rows=4",
+                   "--synthetic=uniform_random", "--injectionrate=0.1",
+                   "--sim-cycles=%d" % SIM_CYCLES]
+
+@unittest.skipUnless(os.path.isfile(GEM5), "no gem5 binary at " + GEM5)
+class IntervalDumpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_gem5(self, name, options):
+        outdir = os.path.join(self.tmpdir, name)
+        env = dict(os.environ, GEM5SIMTYPE="GarnetStandalone")
+        with open(os.devnull, "w") as devnull:
+            subprocess.check_call([GEM5, "-d", outdir, CONFIG] +
+                                  NETWORK_OPTIONS + options,
+                                  cwd=ROOT, env=env, stdout=devnull,
+                                  stderr=devnull)
+        return StatsFile(os.path.join(outdir, "stats.txt"))
+
+    def test_interval_dumps_match_single_dump(self):
+        single = self.run_gem5("single", [])
+        # Never converges, so it dumps every interval until --sim-cycles
+        intervals = self.run_gem5("intervals",
+                                  ["--convergence-cycles=%d" %
+                                   (SIM_CYCLES / 8),
+                                   "--convergence-min-intervals=1000"])
+        self.assertGreater(len(intervals), 2)
+
+        network = "system.ruby.network."
+        routers = sorted(k for k in single.dump().keys()
+                         if k.endswith(".buffer_reads"))
+        self.assertTrue(routers)
+        for name in routers + [network + "int_link_utilization",
+                               network + "ext_in_link_utilization",
+                               network + "packets_received::total"]:
+            self.assertEqual(single.get(name), intervals.get(name), name)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+# Per-router and per-link activity of a Garnet network as NumPy arrays
+#
+# The activity counters of all routers are read from a stats.txt dump once
+# into arrays indexed by router id, such that injection rates, totals,
+# maxima and averages per class of routers are computed on whole arrays
+# instead of router by router. Likewise, the flits sent over every link
+# (the link_utilization statistic of each NetworkLink) are read into arrays
+# in the order of the links of a NetworkTopology.
+
+import csv
+import re
+
+import numpy as np
+
+from garnetconfig import NETWORK
+
+# Router statistics used by the DSENT router model
+ROUTER_COUNTERS = ("buffer_reads", "buffer_writes", "crossbar_activity",
+                   "sw_input_arbiter_activity", "sw_output_arbiter_activity")
+
+# DSENT router injection rate parameter -> router statistic
+INJECTION_RATES = (("BufRdInjectionRate", "buffer_reads"),
+                   ("BufWrInjectionRate", "buffer_writes"),
+                   ("XbarInjectionRate", "crossbar_activity"),
+                   ("SAInjectionRate", "sw_output_arbiter_activity"))
+
+# Statistic of every NetworkLink: the number of flits sent over it
+LINK_COUNTER = "link_utilization"
+
+ROUTER_STAT = re.compile(r"^%s\.routers(\d+)\.buffer_reads$" %
+                         re.escape(NETWORK))
+
+## Return the names of the routers in a stats dump, ordered by router id
+def findRouters(stats):
+    routers = []
+    for key in stats.keys():
+        m = ROUTER_STAT.match(key)
+        if m:
+            routers.append((int(m.group(1)), key[:-len(".buffer_reads")]))
+    return [name for (router_id, name) in sorted(routers)]
+
+## Return the mean of values per class label, as (labels, means)
+def classMeans(values, classes):
+    (labels, inverse) = np.unique(np.asarray(classes), return_inverse=True)
+    sums = np.bincount(inverse, weights=np.asarray(values, dtype=float))
+    return (labels, sums / np.bincount(inverse))
+
+class RouterActivity(object):
+    """ Activity counters of all routers in a StatsDump or StatsFile, as
+        arrays indexed by router id """
+
+    def __init__(self, stats, routers=None):
+        if routers is None:
+            routers = findRouters(stats)
+        self.routers = routers
+
+        # counter -> array of per-router values
+        self.counters = {}
+        for counter in ROUTER_COUNTERS:
+            self.counters[counter] = np.array(
+                [stats.get("%s.%s" % (router, counter)) for router in routers],
+                dtype=float)
+
+    def __len__(self):
+        return len(self.routers)
+
+    def __getitem__(self, counter):
+        return self.counters[counter]
+
+    def rates(self, num_cycles):
+        """ Return a dict of counter -> array of activity per cycle """
+        return dict((counter, values / float(num_cycles))
+                    for (counter, values) in self.counters.items())
+
+    def injectionRates(self, num_cycles, int_ports, ext_ports):
+        """ Return a dict of DSENT router parameter -> array of injection
+            rates (flits per cycle per port), given the number of int_link
+            and ext_link ports of every router """
+        int_ports = np.asarray(int_ports, dtype=float)
+        ext_ports = np.asarray(ext_ports, dtype=float)
+        return dict((param, ext_ports * self.counters[counter]
+                            / float(num_cycles) / int_ports)
+                    for (param, counter) in INJECTION_RATES)
+
+    def summary(self, num_cycles, classes=None):
+        """ Return a dict of "router_activity/<counter>/<total|mean|max>"
+            -> activity per cycle. If classes holds a label per router,
+            such as its number of ports, the mean per class is added as
+            "router_activity/<counter>/mean_<label>" """
+        results = {}
+        for (counter, rates) in self.rates(num_cycles).items():
+            if not len(rates):
+                continue
+
+            prefix = "router_activity/%s/" % counter
+            results[prefix + "total"] = float(rates.sum())
+            results[prefix + "mean"] = float(rates.mean())
+            results[prefix + "max"] = float(rates.max())
+
+            if classes is not None:
+                for (label, mean) in zip(*classMeans(rates, classes)):
+                    results[prefix + "mean_%s" % label] = float(mean)
+
+        return results
+
+class LinkActivity(object):
+    """ Flits sent over every link of a NetworkTopology in a StatsDump or
+        StatsFile, as arrays in the order of topology.int_links and
+        topology.ext_links """
+
+    def __init__(self, stats, topology):
+        self.topology = topology
+
+        self.int_flits = np.array(
+            [stats.get("%s.network_link.%s" % (link, LINK_COUNTER))
+             for link in topology.int_links], dtype=float)
+
+        # ext_links hold an In link (NI to router) and an Out link (router
+        # to NI)
+        self.ext_in_flits = np.array(
+            [stats.get("%s.network_links0.%s" % (link, LINK_COUNTER))
+             for link in topology.ext_links], dtype=float)
+        self.ext_out_flits = np.array(
+            [stats.get("%s.network_links1.%s" % (link, LINK_COUNTER))
+             for link in topology.ext_links], dtype=float)
+
+    def hasStats(self):
+        """ Return True if the dump holds any per-link statistics, i.e. it
+            was written by a gem5 binary that records them """
+        return bool(self.int_flits.any() or self.ext_in_flits.any() or
+                    self.ext_out_flits.any())
+
+    def pairUtilization(self, num_cycles):
+        """ Return a dict of (min router id, max router id) -> utilization
+            (flits per cycle) of the busiest direction between the routers
+            of every int_link """
+        topology = self.topology
+        pairs = {}
+        rates = (self.int_flits / float(num_cycles)).tolist()
+        for (src, dst, rate) in zip(topology.int_link_src,
+                                    topology.int_link_dst, rates):
+            if src is None or dst is None:
+                continue
+            pair = (src, dst) if src < dst else (dst, src)
+            pairs[pair] = max(rate, pairs.get(pair, 0.0))
+        return pairs
+
+## Return the rows of per-link activity, one per unidirectional link:
+## (link_id, name, type, src router, dst router, src_outport, dst_inport,
+## latency, flits, flits per cycle). Endpoints that are not routers are -1
+def linkRows(links, num_cycles):
+    topology = links.topology
+    rows = []
+    for (i, link) in enumerate(topology.int_links):
+        src = topology.int_link_src[i]
+        dst = topology.int_link_dst[i]
+        rows.append((topology.int_link_ids[i], link, "int",
+                     -1 if src is None else src, -1 if dst is None else dst,
+                     topology.int_link_outports[i],
+                     topology.int_link_inports[i],
+                     topology.int_link_latency[i], links.int_flits[i]))
+
+    for (i, link) in enumerate(topology.ext_links):
+        router = topology.ext_link_router[i]
+        router = -1 if router is None else router
+        rows.append((topology.ext_link_ids[i], link + ".network_links0",
+                     "ext_in", -1, router, "Local", "Local", None,
+                     links.ext_in_flits[i]))
+        rows.append((topology.ext_link_ids[i], link + ".network_links1",
+                     "ext_out", router, -1, "Local", "Local", None,
+                     links.ext_out_flits[i]))
+
+    return [row + (row[-1] / float(num_cycles),) for row in rows]
+
+LINK_COLUMNS = ("link_id", "name", "type", "src_router", "dst_router",
+                "src_outport", "dst_inport", "latency", "flits",
+                "utilization")
+
+## Write per-link activity to csv_file, one row per unidirectional link
+def writeLinkCsv(csv_file, links, num_cycles):
+    with open(csv_file, "wb") as f:
+        writer = csv.writer(f)
+        writer.writerow(LINK_COLUMNS)
+        for row in linkRows(links, num_cycles):
+            writer.writerow(["" if v is None else v for v in row])
+
+## Write per-router activity per cycle to csv_file, one row per router.
+## positions optionally holds the (x, y) layout position of every router
+def writeRouterCsv(csv_file, routers, topology, num_cycles, positions=None):
+    rates = routers.rates(num_cycles)
+    with open(csv_file, "wb") as f:
+        writer = csv.writer(f)
+        writer.writerow(("router_id", "name", "x", "y", "int_ports",
+                         "ext_ports") + ROUTER_COUNTERS)
+        for (r, name) in enumerate(routers.routers):
+            (x, y) = positions[r] if positions is not None else ("", "")
+            writer.writerow([r, name, x, y, topology.int_ports[r],
+                             topology.ext_ports[r]] +
+                            [rates[counter][r] for counter in ROUTER_COUNTERS])
+
+## Write router and link activity as NumPy arrays to npz_file. Link arrays
+## are prefixed with 'int_link_' and 'ext_link_', router arrays with
+## 'router_'
+def writeNpz(npz_file, routers, links, num_cycles):
+    topology = links.topology
+    none = lambda ids: np.array([-1 if i is None else i for i in ids])
+
+    arrays = {"num_cycles": np.array(num_cycles, dtype=float),
+              "int_link_id": np.array(topology.int_link_ids),
+              "int_link_src": none(topology.int_link_src),
+              "int_link_dst": none(topology.int_link_dst),
+              "int_link_outport": np.array(topology.int_link_outports),
+              "int_link_inport": np.array(topology.int_link_inports),
+              "int_link_flits": links.int_flits,
+              "ext_link_id": np.array(topology.ext_link_ids),
+              "ext_link_router": none(topology.ext_link_router),
+              "ext_link_in_flits": links.ext_in_flits,
+              "ext_link_out_flits": links.ext_out_flits,
+              "router_int_ports": np.array(topology.int_ports),
+              "router_ext_ports": np.array(topology.ext_ports)}
+    for counter in ROUTER_COUNTERS:
+        arrays["router_" + counter] = routers[counter]
+
+    np.savez_compressed(npz_file, **arrays)
@@ -0,0 +1,223 @@
+# Single-pass reader for gem5 config.ini and config.json files
+#
+# The configuration is read once into a dict of sections, which can be
+# queried like a (read-only) ConfigParser. NetworkTopology indexes the
+# routers and links of a Garnet network in one pass over its links, such
+# that port counts, link endpoints and clock frequencies are available as
+# lists instead of being looked up per router and link.
+
+import gzip
+import json
+import os
+
+NETWORK = "system.ruby.network"
+
+class GarnetConfig(object):
+    """ Sections of a gem5 configuration, with the lookup methods of
+        ConfigParser that the Garnet scripts use. Like ConfigParser,
+        option names are case-insensitive """
+
+    def __init__(self, sections=None):
+        # section -> {option: value string}
+        self.sections_dict = sections or {}
+
+    def sections(self):
+        return self.sections_dict.keys()
+
+    def has_section(self, section):
+        return section in self.sections_dict
+
+    def has_option(self, section, option):
+        return option.lower() in self.sections_dict.get(section, ())
+
+    def get(self, section, option):
+        return self.sections_dict[section][option.lower()]
+
+    def getdefault(self, section, option, default):
+        """ Return option in section, or default if it is not set """
+        return self.sections_dict[section].get(option.lower(), default)
+
+    def getint(self, section, option):
+        return int(self.get(section, option))
+
+    def getfloat(self, section, option):
+        return float(self.get(section, option))
+
+    def items(self, section):
+        return self.sections_dict[section].items()
+
+## Open a plain or gzip compressed configuration file
+def openConfig(config_file):
+    if config_file.endswith(".gz"):
+        return gzip.open(config_file, "rb")
+    return open(config_file, "rt")
+
+## Parse the lines of a config.ini file into a dict of sections
+def parseIni(lines):
+    sections = {}
+    options = None
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+
+        if line[0] == "[" and line[-1] == "]":
+            options = sections.setdefault(line[1:-1], {})
+        elif options is not None:
+            (option, sep, value) = line.partition("=")
+            if sep:
+                options[option.strip().lower()] = value.strip()
+
+    return sections
+
+## Convert a config.json parameter value to its config.ini string
+def iniValue(value):
+    if isinstance(value, list):
+        return " ".join(iniValue(v) for v in value)
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return str(value)
+
+## Add the SimObject dict d of a config.json file and its descendants to
+## sections. Children are added as the config.ini 'children' option
+def flattenJson(d, sections):
+    options = {}
+    children = []
+    for (key, value) in d.iteritems():
+        # Children that are also parameters, such as the network's
+        # int_links, keep the parameter value: their paths
+        if isinstance(value, dict) and "path" in value:
+            children.append(value)
+            options[key.lower()] = iniValue(value["path"])
+        elif isinstance(value, list) and value and \
+                all(isinstance(v, dict) and "path" in v for v in value):
+            children.extend(value)
+            options[key.lower()] = " ".join(iniValue(v["path"])
+                                            for v in value)
+        elif isinstance(value, dict):
+            # Port
+            continue
+        elif key not in ("name", "path"):
+            options[key.lower()] = iniValue(value)
+
+    if children:
+        options["children"] = " ".join(iniValue(c["name"]) for c in children)
+    sections[iniValue(d["path"])] = options
+
+    for child in children:
+        flattenJson(child, sections)
+
+## Read config.ini or config.json (optionally gzip compressed) in a single
+## pass. Returns None if config_file does not exist
+def readConfig(config_file):
+    if not os.path.isfile(config_file):
+        return None
+
+    with openConfig(config_file) as f:
+        if config_file.endswith((".json", ".json.gz")):
+            sections = {}
+            flattenJson(json.load(f), sections)
+        else:
+            sections = parseIni(f)
+
+    return GarnetConfig(sections)
+
+class NetworkTopology(object):
+    """ Routers and links of the Garnet network in a GarnetConfig, indexed
+        by router. Routers are numbered in the order of the network's
+        'routers' option """
+
+    def __init__(self, config, network=NETWORK):
+        self.config = config
+        self.clocks = {}
+
+        self.routers = config.get(network, "routers").split()
+        self.int_links = config.get(network, "int_links").split()
+        self.ext_links = config.get(network, "ext_links").split()
+
+        router_index = dict((r, i) for (i, r) in enumerate(self.routers))
+        self.router_index = router_index
+        nrouters = len(self.routers)
+
+        # Router indices of the endpoints of each int_link (None if the
+        # endpoint is not a router of this network), its latency, link id
+        # and the port directions it connects
+        self.int_link_src = []
+        self.int_link_dst = []
+        self.int_link_latency = []
+        self.int_link_ids = []
+        self.int_link_outports = []
+        self.int_link_inports = []
+
+        # Router index and link id of each ext_link
+        self.ext_link_router = []
+        self.ext_link_ids = []
+
+        # Number of ports to int_links and ext_links per router
+        self.int_ports = [0] * nrouters
+        self.ext_ports = [0] * nrouters
+
+        for link in self.int_links:
+            src = router_index.get(config.get(link, "src_node"))
+            dst = router_index.get(config.get(link, "dst_node"))
+            self.int_link_src.append(src)
+            self.int_link_dst.append(dst)
+            self.int_link_latency.append(config.getint(link, "latency"))
+            self.int_link_ids.append(int(config.getdefault(link, "link_id",
+                                                           -1)))
+            self.int_link_outports.append(config.getdefault(link,
+                                                            "src_outport", ""))
+            self.int_link_inports.append(config.getdefault(link, "dst_inport",
+                                                           ""))
+
+            # int_links are defined unidirectionally
+            if src is not None:
+                self.int_ports[src] += 1
+            if dst is not None:
+                self.int_ports[dst] += 1
+
+        for link in self.ext_links:
+            router = router_index.get(config.get(link, "int_node"))
+            self.ext_link_router.append(router)
+            self.ext_link_ids.append(int(config.getdefault(link, "link_id",
+                                                           -1)))
+
+            # ext_links are defined bidirectionally
+            if router is not None:
+                self.ext_ports[router] += 2
+
+        # Clock frequencies in Hz
+        self.router_clocks = [self.getClock(r) for r in self.routers]
+        self.int_link_clocks = [self.getClock(l + ".network_link")
+                                for l in self.int_links]
+        self.ext_link_clocks = [(self.getClock(l + ".network_links0"),
+                                 self.getClock(l + ".network_links1"))
+                                for l in self.ext_links]
+
+    ## Return the clock frequency of obj in Hz, following its clock domain
+    def getClock(self, obj):
+        clock = self.clocks.get(obj)
+        if clock is not None:
+            return clock
+
+        config = self.config
+        obj_type = config.get(obj, "type")
+        if obj_type == "SrcClockDomain":
+            clock = config.getint(obj, "clock")
+            if clock > 10:
+                # Clock defined in to num_ticks (=1e12) / frequency
+                clock = int((1000.0 / clock) * 1e9)
+            else:
+                # Clock defined in GHz
+                clock = int(clock * 1e9)
+        elif obj_type == "DerivedClockDomain":
+            source = config.get(obj, "clk_domain")
+            divider = config.getint(obj, "clk_divider")
+            clock = self.getClock(source) / divider
+        else:
+            clock = self.getClock(config.get(obj, "clk_domain"))
+
+        self.clocks[obj] = clock
+        return clock
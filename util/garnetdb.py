@@ -0,0 +1,445 @@
+# SQLite database of Garnet simulation results
+#
+# Every simulation output directory is a run, identified by its path. The
+# 'runs' table holds the parameters of a run as columns, taken from its
+# config.ini. The 'params', 'stats' and 'power' tables hold the remaining
+# network and traffic parameters, the network, router and link statistics
+# from stats.txt and the DSENT results from dsent_power.json, or else
+# dsent_out.txt, as (run_id, name, value) rows. Elements of one-line
+# vectors are stored as name::i rows.
+# The 'results' view joins the most used statistics and DSENT results to
+# the run parameters, one row per run.
+#
+# Ingesting a directory again replaces its rows, so scripts can ingest
+# whatever directories they see without creating duplicates. Batch
+# ingestion reads the directories in parallel and skips directories whose
+# files have not changed since they were last ingested.
+#
+# Usage: python util/garnetdb.py [-j jobs] <database> <root directory>...
+
+import json
+import os
+import re
+import sqlite3
+import sys
+from multiprocessing import Pool, cpu_count
+from optparse import OptionParser
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from garnetconfig import NetworkTopology, readConfig
+from garnetstats import readLastDump
+
+NETWORK = "system.ruby.network"
+
+# runs column -> (config.ini section, option, type); "cpu" is the section
+# of the first traffic generator or CPU
+RUN_PARAMS = (
+    ("topology", NETWORK, "topology", str),
+    ("num_rows", NETWORK, "num_rows", int),
+    ("concentration_factor", NETWORK, "concentration_factor", int),
+    ("routing_algorithm", NETWORK, "routing_algorithm", int),
+    ("vcs_per_vnet", NETWORK, "vcs_per_vnet", int),
+    ("buffers_per_data_vc", NETWORK, "buffers_per_data_vc", int),
+    ("buffers_per_ctrl_vc", NETWORK, "buffers_per_ctrl_vc", int),
+    ("ni_flit_size", NETWORK, "ni_flit_size", int),
+    ("synthetic", "cpu", "traffic_type", str),
+    ("injrate", "cpu", "inj_rate", float),
+    ("sim_cycles", "cpu", "sim_cycles", int),
+)
+
+# Sections whose options are stored in the params table
+PARAM_SECTIONS = (NETWORK, "cpu")
+
+# Statistics read from stats.txt: all of the network, routers and links,
+# and those needed for the number of simulated cycles
+STATS_PREFIXES = (NETWORK + ".", "sim_ticks", "system.ruby.clk_domain.clock",
+                  "system.cpu0.numCycles", "system.cpu00.numCycles",
+                  "system.cpu000.numCycles", "system.cpu0000.numCycles")
+
+# Power and area totals written by util/on-chip-network-power-area-2.0.py,
+# named as in the power table
+DSENT_RECORD_FILE = "dsent_power.json"
+
+# Files of a simulation directory that are ingested
+RUN_FILES = ("stats.txt", "config.ini", "dsent_out.txt", DSENT_RECORD_FILE)
+
+# Headings of dsent_out.txt -> prefix of the names in the power table
+DSENT_SECTIONS = (
+    (re.compile(r"Sum totals for all \d+ routers:"), "routers"),
+    (re.compile(r"Total power for all int_links:"), "int_links"),
+    (re.compile(r"Total power for all ext_links:"), "ext_links"),
+    (re.compile(r"Total power for all links:"), "links"),
+    (re.compile(r"Sum power for all routers \+ links:"), "total"),
+    (re.compile(r"Die area model scaled"), "die"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    outdir TEXT UNIQUE NOT NULL,
+    num_cpus INTEGER,
+    num_routers INTEGER,
+    %s,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    name TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS power (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS stats_name ON stats (name, run_id);
+CREATE INDEX IF NOT EXISTS power_name ON power (name, run_id);
+CREATE VIEW IF NOT EXISTS results AS
+SELECT runs.*,
+    (SELECT value FROM stats WHERE stats.run_id = runs.run_id AND
+        name = '%s.average_packet_latency') AS latency,
+    (SELECT value FROM stats WHERE stats.run_id = runs.run_id AND
+        name = 'reception_rate') AS reception_rate,
+    (SELECT value FROM power WHERE power.run_id = runs.run_id AND
+        name = 'total/Dynamic power') AS dynamic_power,
+    (SELECT value FROM power WHERE power.run_id = runs.run_id AND
+        name = 'total/Leakage power') AS leakage_power,
+    (SELECT value FROM power WHERE power.run_id = runs.run_id AND
+        name = 'routers/Area/Total') AS router_area,
+    (SELECT value FROM power WHERE power.run_id = runs.run_id AND
+        name = 'die/Total CPU die area') AS die_area
+FROM runs;
+""" % (",\n    ".join("%s %s" % (column, {str: "TEXT", int: "INTEGER",
+                                          float: "REAL"}[t])
+                      for (column, section, option, t) in RUN_PARAMS),
+       NETWORK)
+
+## Return the config.ini section of the first traffic generator or CPU
+def getCpuSection(config):
+    for cpu in ("cpu0", "cpu00", "cpu000", "cpu0000"):
+        if config.has_section("system." + cpu):
+            return "system." + cpu
+    return None
+
+## Parse the summary sections of dsent_out.txt into a dict of
+## "section/name" -> float
+def readDSENTOutput(dsent_file):
+    results = {}
+    section = None
+
+    with open(dsent_file, "rt") as f:
+        for line in f:
+            if not line.strip():
+                continue
+
+            if not line[0].isspace() and line.rstrip().endswith(":"):
+                # Unknown headings, e.g. of single routers and links,
+                # end the current section
+                section = None
+                for (pattern, name) in DSENT_SECTIONS:
+                    if pattern.match(line):
+                        section = name
+                continue
+            elif not line[0].isspace() and section != "routers":
+                # Only the router totals are not indented
+                section = None
+
+            if section is None or ":" not in line:
+                continue
+
+            (name, value) = line.rsplit(":", 1)
+            try:
+                value = float(value.split()[0])
+            except (ValueError, IndexError):
+                continue
+            results["%s/%s" % (section, name.strip())] = value
+
+    return results
+
+## Return the modification time of a run, i.e. of its newest result file
+def runMtime(outdir):
+    mtime = 0.0
+    for name in RUN_FILES:
+        path = os.path.join(outdir, name)
+        if os.path.isfile(path):
+            mtime = max(mtime, os.path.getmtime(path))
+    return mtime
+
+## Return the simulation directories below each of roots, i.e. the
+## directories holding a stats.txt
+def findRuns(roots):
+    outdirs = []
+    for root in roots:
+        for (dirpath, dirs, files) in os.walk(root):
+            if "stats.txt" in files:
+                outdirs.append(os.path.abspath(dirpath))
+                # Simulation directories are not nested
+                del dirs[:]
+            else:
+                dirs.sort()
+    return outdirs
+
+## Read the parameters, statistics and DSENT results of simulation
+## directory outdir into a dict of dicts, one per table. Returns None if
+## outdir holds no simulation results
+def readRun(outdir):
+    outdir = os.path.abspath(outdir)
+    stats_file = os.path.join(outdir, "stats.txt")
+    config_file = os.path.join(outdir, "config.ini")
+    dsent_file = os.path.join(outdir, "dsent_out.txt")
+    record_file = os.path.join(outdir, DSENT_RECORD_FILE)
+
+    config = readConfig(config_file)
+    if not os.path.isfile(stats_file) or config is None:
+        return None
+
+    cpu_section = getCpuSection(config)
+    children = config.get("system", "children")
+    num_cpus = len(re.findall("cpu[0-9]+[0-9]*", children))
+    num_routers = 0
+    if config.has_option(NETWORK, "routers"):
+        num_routers = len(config.get(NETWORK, "routers").split())
+
+    columns = {"outdir": outdir,
+               "num_cpus": num_cpus,
+               "num_routers": num_routers,
+               "mtime": runMtime(outdir)}
+    for (column, section, option, t) in RUN_PARAMS:
+        if section == "cpu":
+            section = cpu_section
+        if section and config.has_option(section, option):
+            columns[column] = t(config.get(section, option))
+        else:
+            columns[column] = None
+
+    params = {}
+    for section in PARAM_SECTIONS:
+        name = section
+        if section == "cpu":
+            (section, name) = (cpu_section, "cpu")
+        if section is None:
+            continue
+        for (option, value) in config.items(section):
+            # Skip references to the children, e.g. routers and links
+            if value.startswith(section + ".") or option == "children":
+                continue
+            params["%s.%s" % (name, option)] = value
+
+    # All network, router and link statistics of the last dump. Elements
+    # of one-line vectors, e.g. the per-vnet packet counts and latencies,
+    # are named name::i as gem5 names vector elements without subnames
+    dump = readLastDump(stats_file, STATS_PREFIXES)
+    stats = dict((name, value) for (name, value) in dump.scalars.iteritems()
+                 if name.startswith(NETWORK + "."))
+    for (name, values) in dump.vectors.iteritems():
+        if name.startswith(NETWORK + "."):
+            for (i, value) in enumerate(values):
+                stats["%s::%d" % (name, i)] = value
+
+    num_cycles = dump.getNetworkCycles()
+    stats["num_cycles"] = num_cycles
+    if num_cycles > 0 and num_cpus > 0:
+        stats["reception_rate"] = dump.getReceptionRate(num_cpus)
+
+    # Total, mean and maximum activity of the routers, and their mean per
+    # number of int_link ports (corner, edge and center routers of a mesh)
+    if num_cycles > 0 and num_routers > 0:
+        try:
+            from garnetactivity import RouterActivity
+        except ImportError:
+            # NumPy is not installed
+            RouterActivity = None
+
+        if RouterActivity is not None:
+            topology = NetworkTopology(config)
+            activity = RouterActivity(dump, topology.routers)
+            stats.update(activity.summary(num_cycles, topology.int_ports))
+
+    power = {}
+    if os.path.isfile(record_file):
+        with open(record_file, "rt") as f:
+            power = json.load(f)
+    elif os.path.isfile(dsent_file):
+        # Output of DSENT runs predating the record
+        power = readDSENTOutput(dsent_file)
+
+    return {"runs": columns, "params": params, "stats": stats,
+            "power": power}
+
+## readRun for worker processes; returns (outdir, run, error)
+def readRunSafe(outdir):
+    try:
+        return (outdir, readRun(outdir), None)
+    except Exception as e:
+        return (outdir, None, "%s: %s" % (type(e).__name__, e))
+
+class ResultsDB(object):
+    """ Connection to a results database """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, timeout=60,
+                                    check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    def runId(self, outdir):
+        row = self.conn.execute("SELECT run_id FROM runs WHERE outdir = ?",
+                                (outdir,)).fetchone()
+        return row[0] if row else None
+
+    def store(self, run):
+        """ Insert or replace a run as returned by readRun """
+        columns = run["runs"]
+        outdir = columns["outdir"]
+
+        self.conn.execute("INSERT OR IGNORE INTO runs (outdir) VALUES (?)",
+                          (outdir,))
+        run_id = self.runId(outdir)
+        names = sorted(columns)
+        self.conn.execute("UPDATE runs SET %s WHERE run_id = ?" % \
+                          ", ".join("%s = ?" % n for n in names),
+                          [columns[n] for n in names] + [run_id])
+
+        for table in ("params", "stats", "power"):
+            self.conn.execute("DELETE FROM %s WHERE run_id = ?" % table,
+                              (run_id,))
+            self.conn.executemany("INSERT INTO %s VALUES (?, ?, ?)" % table,
+                                  ((run_id, n, v) for (n, v) in
+                                   run[table].iteritems()))
+
+    def ingest(self, outdir, commit=True):
+        """ Insert or replace the parameters, statistics and DSENT results
+            of simulation directory outdir. Returns False if outdir holds
+            no simulation results """
+        run = readRun(outdir)
+        if run is None:
+            return False
+
+        self.store(run)
+        if commit:
+            self.conn.commit()
+        return True
+
+    def ingestAll(self, outdirs, jobs=1, force=False):
+        """ Ingest the simulation directories that are new or have changed
+            since they were last ingested, reading them with a pool of jobs
+            worker processes. Returns the number of ingested directories """
+        ingested = dict(self.conn.execute("SELECT outdir, mtime FROM runs"))
+        todo = [os.path.abspath(d) for d in outdirs]
+        if not force:
+            todo = [d for d in todo if ingested.get(d) != runMtime(d)]
+        if not todo:
+            return 0
+
+        pool = None
+        if jobs > 1 and len(todo) > 1:
+            pool = Pool(min(jobs, len(todo)))
+            results = pool.imap_unordered(readRunSafe, todo, chunksize=8)
+        else:
+            results = (readRunSafe(d) for d in todo)
+
+        count = 0
+        try:
+            for (outdir, run, error) in results:
+                if error is not None:
+                    print("%s: %s" % (outdir, error))
+                elif run is None:
+                    print("%s: no simulation results" % outdir)
+                else:
+                    self.store(run)
+                    count += 1
+                    if count % 100 == 0:
+                        self.conn.commit()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            self.conn.commit()
+
+        return count
+
+    def prune(self):
+        """ Remove runs whose simulation directory no longer exists """
+        removed = [run_id for (run_id, outdir) in
+                   self.conn.execute("SELECT run_id, outdir FROM runs")
+                   if not os.path.isfile(os.path.join(outdir, "stats.txt"))]
+        for table in ("params", "stats", "power", "runs"):
+            self.conn.executemany("DELETE FROM %s WHERE run_id = ?" % table,
+                                  ((run_id,) for run_id in removed))
+        self.conn.commit()
+        return len(removed)
+
+    def query(self, sql, args=()):
+        """ Return the rows of a query as a list of tuples """
+        return self.conn.execute(sql, args).fetchall()
+
+    def columns(self, sql, args=()):
+        """ Return the result of a query as a dict of column name -> numpy
+            array, for vectorized processing """
+        import numpy as np
+
+        cursor = self.conn.execute(sql, args)
+        names = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+        return dict((name, np.array([row[i] for row in rows]))
+                    for (i, name) in enumerate(names))
+
+## Return the results of the run with the highest reception rate of every
+## network configuration with num_cpus cpu's, as columns. The 'label'
+## column names the configuration, e.g. "Mesh_XY 4x4"
+def peakResults(db, num_cpus):
+    return db.columns(
+        "SELECT topology || ' ' || num_rows || 'x' || "
+        "    (num_routers / num_rows) AS label, "
+        "    MAX(reception_rate) AS reception_rate, injrate, latency, "
+        "    dynamic_power, leakage_power, router_area, die_area "
+        "FROM results WHERE num_cpus = ? AND num_rows > 0 "
+        "GROUP BY topology, num_rows, concentration_factor, synthetic "
+        "ORDER BY label", (num_cpus,))
+
+def main():
+    parser = OptionParser(usage="%prog [options] <database> "
+                                "<simulation or root directory>...",
+                          description="Ingest all simulation directories "
+                                      "below the given directories that are "
+                                      "new or have changed since the last "
+                                      "run.")
+    parser.add_option("-j", "--jobs", type="int", default=0,
+                      help="number of worker processes reading simulation "
+                           "directories; 0 uses all cores [default: %default]")
+    parser.add_option("-f", "--force", action="store_true", default=False,
+                      help="ingest all directories, also unchanged ones")
+    parser.add_option("--prune", action="store_true", default=False,
+                      help="remove runs whose directory no longer exists")
+    (options, args) = parser.parse_args()
+
+    if len(args) < 1:
+        parser.print_help()
+        sys.exit(2)
+
+    db = ResultsDB(args[0])
+    if options.prune:
+        print("Removed %d runs" % db.prune())
+
+    outdirs = findRuns(args[1:])
+    count = db.ingestAll(outdirs, options.jobs or cpu_count(), options.force)
+    print("Ingested %d of %d simulation directories" % (count, len(outdirs)))
+    db.close()
+
+if __name__ == "__main__":
+    main()
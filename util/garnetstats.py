@@ -0,0 +1,264 @@
+# Single-pass reader for gem5 stats.txt files
+#
+# stats.txt is parsed once into an index of scalars, vectors and
+# distributions per dump block ("Begin/End Simulation Statistics").
+# Scripts that need many keys from the same file should use readStats()
+# instead of rescanning the file for every key.
+
+import os
+
+BEGIN_MARKER = "Begin Simulation Statistics"
+END_MARKER = "End Simulation Statistics"
+
+# Sub-names of a distribution summary, as printed by gem5's text output
+DIST_SUBNAMES = ("samples", "mean", "gmean", "stdev", "min_value",
+                 "max_value", "bucket_size", "min_bucket", "max_bucket",
+                 "underflows", "overflows", "total")
+
+## Convert a stats.txt value column to float
+def parseValue(s):
+    try:
+        return float(s)
+    except ValueError:
+        if s.endswith("%"):
+            return float(s[:-1]) / 100.0
+        raise
+
+class StatsDump(object):
+    """ Statistics of a single Begin/End block in stats.txt """
+
+    def __init__(self):
+        # "name" or "name::subname" -> float
+        self.scalars = {}
+
+        # "name" -> list of floats, for vectors and histograms that are
+        # printed on one line
+        self.vectors = {}
+
+        # "name" -> list of (subname, float), in order of appearance
+        self.subnames = {}
+
+    def addLine(self, line):
+        # Remove comments
+        comment_pos = line.find("#")
+        if comment_pos > -1:
+            line = line[0:comment_pos]
+
+        split = line.split()
+        if len(split) < 2:
+            return
+
+        name = split[0]
+
+        if "|" in line:
+            # One-line vector or histogram: name | value pdf cdf | ...
+            values = []
+            for column in line.split("|")[1:]:
+                column = column.split()
+                if column:
+                    values.append(parseValue(column[0]))
+            self.vectors[name] = values
+            return
+
+        # Scalar or single vector/distribution element: name value [pdf cdf]
+        try:
+            value = parseValue(split[1])
+        except ValueError:
+            return
+
+        self.scalars[name] = value
+
+        if "::" in name:
+            (base, subname) = name.split("::", 1)
+            self.subnames.setdefault(base, []).append((subname, value))
+
+    def get(self, key, default=0.0):
+        return self.scalars.get(key, default)
+
+    def getVector(self, key):
+        """ Return the elements of vector 'key' as a list, excluding the
+            'total' element of multi-line vectors """
+        if key in self.vectors:
+            return self.vectors[key]
+
+        elements = [v for (s, v) in self.subnames.get(key, [])
+                    if s not in DIST_SUBNAMES]
+        if not elements and key in self.scalars:
+            # Vectors of size 1 are printed as a scalar
+            return [self.scalars[key]]
+        return elements
+
+    def getDistribution(self, key):
+        """ Return a dict with the summary values (samples, mean, stdev,
+            ...) and the list of (bucket, count) of distribution 'key' """
+        dist = {"buckets": []}
+        for (subname, value) in self.subnames.get(key, []):
+            if subname in DIST_SUBNAMES:
+                dist[subname] = value
+            else:
+                dist["buckets"].append((subname, value))
+        return dist
+
+    def keys(self):
+        return self.scalars.keys()
+
+    def getNumCycles(self):
+        """ Return the number of simulated cycles for SE/FS simulations, or
+            sim_ticks for Garnet_standalone simulations """
+        for cpu in ("cpu0", "cpu00", "cpu000", "cpu0000"):
+            num_cycles = self.get("system.%s.numCycles" % cpu)
+            if num_cycles != 0.0:
+                return num_cycles
+        return self.get("sim_ticks")
+
+    def getNetworkCycles(self):
+        """ Return getNumCycles() in cycles of the Ruby clock """
+        clock = self.get("system.ruby.clk_domain.clock", 1.0) or 1.0
+        return self.getNumCycles() / clock
+
+    def getReceptionRate(self, num_cpus):
+        """ Return the reception rate (sustained throughput) as plotted by
+            plotlatencythroughput.py: packets_injected::total per node per
+            getNumCycles(), or 0.0 if no cycles were simulated """
+        num_cycles = self.getNumCycles()
+        if num_cycles <= 0 or num_cpus <= 0:
+            return 0.0
+        return self.get("system.ruby.network.packets_injected::total") / \
+               float(num_cpus) / num_cycles
+
+## Parse lines of stats.txt into a list of StatsDump
+def parseDumps(lines):
+    dumps = []
+    dump = None
+    for line in lines:
+        if not line.strip():
+            continue
+
+        if line.startswith("-"):
+            if BEGIN_MARKER in line:
+                dump = StatsDump()
+                dumps.append(dump)
+            elif END_MARKER in line:
+                dump = None
+            continue
+
+        if dump is None:
+            # Statistics outside of a Begin/End block
+            dump = StatsDump()
+            dumps.append(dump)
+
+        dump.addLine(line)
+
+    return dumps
+
+## Return the dump blocks that were completed in stats_file after byte
+## offset, and the offset to continue from. Used to follow stats.txt
+## while a simulation is running
+def readNewDumps(stats_file, offset=0):
+    if not os.path.isfile(stats_file):
+        return ([], offset)
+
+    with open(stats_file, "rt") as f:
+        f.seek(offset)
+        data = f.read()
+
+    # Leave an unfinished dump for the next call
+    end = data.rfind(END_MARKER)
+    if end < 0:
+        return ([], offset)
+    end = data.find("\n", end) + 1 or len(data)
+
+    return (parseDumps(data[:end].splitlines()), offset + end)
+
+## Return the last dump block of stats_file, reading the file in a single
+## streaming pass without keeping earlier dumps. If prefixes is given, only
+## statistics whose name starts with one of the prefixes are kept
+def readLastDump(stats_file, prefixes=None):
+    if prefixes is not None:
+        prefixes = tuple(prefixes)
+
+    last = StatsDump()
+    dump = None
+    with open(stats_file, "rt") as f:
+        for line in f:
+            if line.startswith("-"):
+                if BEGIN_MARKER in line:
+                    dump = StatsDump()
+                elif END_MARKER in line and dump is not None:
+                    last = dump
+                    dump = None
+                continue
+
+            if dump is None or (prefixes and not line.startswith(prefixes)):
+                continue
+
+            dump.addLine(line)
+
+    return last
+
+class StatsFile(object):
+    """ Indexed contents of a stats.txt file. Lookups default to the last
+        dump block, i.e. the statistics of the final measurement window """
+
+    def __init__(self, stats_file):
+        self.filename = stats_file
+
+        with open(stats_file, "rt") as f:
+            self.dumps = parseDumps(f)
+
+    def __len__(self):
+        return len(self.dumps)
+
+    def dump(self, index=-1):
+        if not self.dumps:
+            return StatsDump()
+        return self.dumps[index]
+
+    def get(self, key, default=0.0, dump=-1):
+        return self.dump(dump).get(key, default)
+
+    def getVector(self, key, dump=-1):
+        return self.dump(dump).getVector(key)
+
+    def getDistribution(self, key, dump=-1):
+        return self.dump(dump).getDistribution(key)
+
+    def getNumCycles(self, dump=-1):
+        return self.dump(dump).getNumCycles()
+
+    def getNetworkCycles(self, dump=-1):
+        return self.dump(dump).getNetworkCycles()
+
+    def getReceptionRate(self, num_cpus, dump=-1):
+        return self.dump(dump).getReceptionRate(num_cpus)
+
+## Return True if stats_file exists and its last dump block was closed.
+## Simulations that dump periodically also leave closed dumps behind when
+## they are killed, so this does not mean the simulation finished
+def statsComplete(stats_file):
+    if not os.path.isfile(stats_file):
+        return False
+
+    with open(stats_file, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        tail = f.read().decode("ascii", "replace")
+
+    lines = tail.strip().splitlines()
+    return bool(lines) and END_MARKER in lines[-1]
+
+# Parsed stats.txt files, keyed by path
+_stats_cache = {}
+
+## Return the StatsFile for stats_file, parsing it at most once per process
+def readStats(stats_file):
+    path = os.path.abspath(stats_file)
+    mtime = os.path.getmtime(path)
+
+    cached = _stats_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, StatsFile(path))
+        _stats_cache[path] = cached
+
+    return cached[1]
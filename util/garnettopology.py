@@ -0,0 +1,377 @@
+# Native renderer for Garnet topology layouts
+#
+# Topologies started with --topology-layout write the position of every
+# router and their links to topology.json in the output directory (see
+# LinkTopology.writeLayout() in configs/topologies/BaseTopology.py).
+# The layout is drawn straight to SVG or PNG, without LaTeX. Routers and
+# links can be colored by a value per router or per link, such as router
+# activity or link utilization.
+#
+# Links of the same color are drawn as a single SVG path and the PNG is
+# rasterized with NumPy, such that fully connected topologies with
+# hundreds of thousands of links are drawn in about a second.
+
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+LAYOUT_FILE = "topology.json"
+
+# Number of colors values are quantized to
+NUM_COLORS = 16
+
+# Color map from low to high values: green, yellow, red
+COLOR_STOPS = np.array([[26, 150, 65], [255, 255, 191], [215, 25, 28]],
+                       dtype=float)
+
+ROUTER_FILL = (191, 239, 191)
+LINK_STROKE = (0, 0, 0)
+
+# Router radius and bend of links between routers on the same row or
+# column that are not adjacent, in units of the router spacing
+ROUTER_RADIUS = 0.3
+LINK_BEND = 0.3
+
+# Pixels per router spacing in SVG coordinates
+SVG_UNIT = 100
+
+# Maximum size of the PNG in pixels, and the maximum number of points
+# sampled along all links
+PNG_SIZE = 1600
+PNG_SAMPLES = 2000000
+
+## Return an array of NUM_COLORS RGB colors from low to high
+def colorMap(num_colors=NUM_COLORS):
+    x = np.linspace(0.0, len(COLOR_STOPS) - 1, num_colors)
+    colors = np.empty((num_colors, 3))
+    for c in xrange(3):
+        colors[:, c] = np.interp(x, np.arange(len(COLOR_STOPS)),
+                                 COLOR_STOPS[:, c])
+    return colors.round().astype(np.uint8)
+
+## Return the color index of each value, from 0 (minimum) to
+## num_colors - 1 (maximum)
+def quantize(values, num_colors=NUM_COLORS):
+    values = np.asarray(values, dtype=float)
+    (vmin, vmax) = (values.min(), values.max())
+    if vmax <= vmin:
+        return np.zeros(len(values), dtype=int)
+    return ((values - vmin) / (vmax - vmin) * (num_colors - 1)).round() \
+           .astype(int)
+
+## Return the "#rrggbb" notation of an RGB color
+def hexColor(rgb):
+    return "#%02x%02x%02x" % tuple(rgb)
+
+class TopologyLayout(object):
+    """ Router positions and links of a topology.json layout """
+
+    def __init__(self, topology, routers, src, dst, weight):
+        self.topology = topology
+
+        # (x, y) per router, in units of the router spacing, with y up
+        self.positions = np.array(routers, dtype=float).reshape(-1, 2)
+
+        # (src_id, dst_id, weight) per bidirectional link
+        self.links = np.column_stack((np.array(src, dtype=int),
+                                      np.array(dst, dtype=int),
+                                      np.array(weight, dtype=int)))
+
+        self.origin = self.positions.min(axis=0) if len(self.positions) \
+                      else np.zeros(2)
+        self.size = self.positions.max(axis=0) - self.origin \
+                    if len(self.positions) else np.zeros(2)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def linkPairs(self):
+        """ Return the (min router id, max router id) of every link """
+        return [(min(s, d), max(s, d)) for (s, d, w) in self.links.tolist()]
+
+    def bulge(self):
+        """ Return how far bent links reach beyond the routers they
+            connect, in units of the router spacing """
+        delta = np.abs(self.positions[self.links[:, 1]] -
+                       self.positions[self.links[:, 0]])
+        bent = ((delta[:, 1] == 0) & (delta[:, 0] > 1.5)) | \
+               ((delta[:, 0] == 0) & (delta[:, 1] > 1.5))
+        if not bent.any():
+            return 0.0
+        return LINK_BEND / 2.0 * delta[bent].max()
+
+    def curves(self, unit, margin):
+        """ Return the start, control and end points of all links as
+            quadratic Bezier curves in image coordinates (y down). Links
+            between routers on the same row or column that are not
+            adjacent bend away from the center of the layout """
+        src = self.transform(self.positions[self.links[:, 0]], unit, margin)
+        dst = self.transform(self.positions[self.links[:, 1]], unit, margin)
+        ctrl = (src + dst) / 2.0
+        center = self.transform(self.origin + self.size / 2.0, unit, margin)
+
+        delta = np.abs(dst - src)
+        for (axis, other) in ((0, 1), (1, 0)):
+            bent = (delta[:, other] == 0) & (delta[:, axis] > unit * 1.5)
+            side = np.where(ctrl[bent, other] < center[other], -1.0, 1.0)
+            ctrl[bent, other] += side * LINK_BEND * delta[bent, axis]
+
+        return (src, ctrl, dst)
+
+    def transform(self, points, unit, margin):
+        """ Convert layout positions to image coordinates (y down) """
+        points = np.asarray(points, dtype=float)
+        x = margin + (points[..., 0] - self.origin[0]) * unit
+        y = margin + (self.origin[1] + self.size[1] - points[..., 1]) * unit
+        return np.stack((x, y), axis=-1)
+
+    def imageSize(self, unit, margin):
+        return (int(np.ceil(self.size[0] * unit + 2 * margin)),
+                int(np.ceil(self.size[1] * unit + 2 * margin)))
+
+## Read the layout file or the topology.json in a simulation output
+## directory. Returns None if there is none
+def readLayout(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, LAYOUT_FILE)
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "rt") as f:
+        layout = json.load(f)
+
+    links = layout["links"]
+    return TopologyLayout(layout["topology"], layout["routers"],
+                          links["src"], links["dst"], links["weight"])
+
+## Return SVG path data for segments with integer coordinates, one
+## segment per row of points, where every coordinate is preceded by the
+## corresponding command or separator in prefixes
+def pathData(points, prefixes):
+    if not len(points):
+        return ""
+
+    # Convert every distinct coordinate to a string only once
+    low = points.min()
+    strings = np.array([str(i) for i in xrange(low, points.max() + 1)],
+                       dtype=object)
+
+    tokens = np.empty((len(points), 2 * len(prefixes)), dtype=object)
+    tokens[:, 0::2] = prefixes
+    tokens[:, 1::2] = strings[points - low]
+    return "".join(tokens.ravel().tolist())
+
+## Return the opacity of links, lowered for dense topologies such that
+## the density of links remains visible
+def linkOpacity(layout):
+    if not len(layout.links):
+        return 1.0
+    return min(1.0, max(0.05, 4.0 * len(layout) / len(layout.links)))
+
+## Write layout as SVG to svg_file. router_values and link_values
+## optionally hold a value per router and per link (in the order of
+## layout.links) to color them by, described by label in the legend
+def writeSvg(layout, svg_file, router_values=None, link_values=None,
+             label=None):
+    unit = SVG_UNIT
+    radius = ROUTER_RADIUS * unit
+    margin = radius + (0.6 + layout.bulge()) * unit
+    (width, height) = layout.imageSize(unit, margin)
+    colors = colorMap()
+    legend = router_values is not None or link_values is not None
+    if legend:
+        height += unit
+
+    out = ['<?xml version="1.0" encoding="UTF-8"?>',
+           '<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" '
+           'viewBox="0 0 %d %d" font-family="sans-serif">' %
+           (width, height, width, height),
+           '<rect width="100%" height="100%" fill="#ffffff"/>']
+
+    # Links, one path per color and line width. Links with weight 1 are
+    # drawn thicker, as in the Tikz code of the topologies
+    if len(layout.links):
+        (src, ctrl, dst) = layout.curves(unit, margin)
+        curved = np.any(np.abs(ctrl - (src + dst) / 2.0) > 0.5, axis=1)
+        points = np.hstack((src, ctrl, dst)).round().astype(int)
+
+        thick = (layout.links[:, 2] == 1).astype(int)
+        if link_values is not None:
+            groups = quantize(link_values) * 2 + thick
+        else:
+            groups = thick
+
+        opacity = linkOpacity(layout)
+        for group in np.unique(groups).tolist():
+            in_group = groups == group
+
+            straight = points[in_group & ~curved][:, [0, 1, 4, 5]]
+            bent = points[in_group & curved]
+            path = pathData(straight, ("M", " ", "L", " ")) + \
+                   pathData(bent, ("M", " ", "Q", " ", " ", " "))
+
+            if link_values is not None:
+                stroke = hexColor(colors[group / 2])
+            else:
+                stroke = hexColor(LINK_STROKE)
+            out.append('<path fill="none" stroke="%s" stroke-width="%g" '
+                       'stroke-opacity="%g" d="%s"/>' %
+                       (stroke, unit * (0.06 if group % 2 else 0.02),
+                        opacity, path))
+
+    # Routers with their id
+    centers = layout.transform(layout.positions, unit, margin).round() \
+                    .astype(int).tolist()
+    if router_values is not None:
+        fills = [hexColor(colors[i]) for i in quantize(router_values)]
+    else:
+        fills = [hexColor(ROUTER_FILL)] * len(layout)
+
+    out.append('<g stroke="#000000" stroke-width="%g" font-size="%d" '
+               'font-weight="bold" text-anchor="middle" '
+               'dominant-baseline="central">' % (unit * 0.02, radius * 0.8))
+    for (r, (x, y)) in enumerate(centers):
+        out.append('<circle cx="%d" cy="%d" r="%d" fill="%s"/>'
+                   '<text x="%d" y="%d" stroke="none">%d</text>' %
+                   (x, y, radius, fills[r], x, y, r))
+    out.append('</g>')
+
+    if legend:
+        out.extend(svgLegend(link_values if link_values is not None
+                             else router_values, label, unit, height))
+
+    out.append('</svg>')
+
+    with open(svg_file, "w") as f:
+        f.write("\n".join(out))
+        f.write("\n")
+
+## Return the SVG elements of a color bar from the minimum to the maximum
+## of values at the bottom of the image
+def svgLegend(values, label, unit, height):
+    values = np.asarray(values, dtype=float)
+    colors = colorMap()
+    step = unit * 0.3
+    (x, y) = (unit * 0.6, height - unit * 0.8)
+
+    out = ['<g font-size="%d">' % (unit * 0.25)]
+    for (i, rgb) in enumerate(colors):
+        out.append('<rect x="%g" y="%g" width="%g" height="%g" fill="%s"/>' %
+                   (x + i * step, y, step, step, hexColor(rgb)))
+    out.append('<text x="%g" y="%g" text-anchor="end" '
+               'dominant-baseline="central">%g</text>' %
+               (x - unit * 0.1, y + step / 2.0, values.min()))
+    out.append('<text x="%g" y="%g" dominant-baseline="central">%g %s</text>'
+               % (x + len(colors) * step + unit * 0.1, y + step / 2.0,
+                  values.max(), label or ""))
+    out.append('</g>')
+    return out
+
+## Return the pixel offsets (dy, dx) of a disc and of its outline
+def discOffsets(radius):
+    r = int(np.ceil(radius))
+    (dy, dx) = np.mgrid[-r:r + 1, -r:r + 1]
+    dist = np.hypot(dy, dx).ravel()
+    (dy, dx) = (dy.ravel(), dx.ravel())
+    inside = dist <= radius
+    outline = inside & (dist > radius - max(1.0, radius * 0.12))
+    return ((dy[inside], dx[inside]), (dy[outline], dx[outline]))
+
+## Write layout as PNG to png_file, with routers and links colored as in
+## writeSvg(). Router ids are not drawn
+def writePng(layout, png_file, router_values=None, link_values=None):
+    bulge = layout.bulge()
+    extent = max(layout.size.max(), 1.0) + 2 * (ROUTER_RADIUS + bulge) + 1.0
+    unit = max(4.0, min(64.0, PNG_SIZE / extent))
+    radius = ROUTER_RADIUS * unit
+    margin = radius + (0.5 + bulge) * unit
+    (width, height) = layout.imageSize(unit, margin)
+    colors = colorMap().astype(float)
+
+    image = np.empty((height * width, 3))
+    image[:] = 255.0
+
+    if len(layout.links):
+        (src, ctrl, dst) = layout.curves(unit, margin)
+
+        # Sample points along every link, at most one per pixel and at most
+        # PNG_SAMPLES in total
+        lengths = np.hypot(*(ctrl - src).T) + np.hypot(*(dst - ctrl).T)
+        spacing = max(1.0, lengths.sum() / PNG_SAMPLES)
+        counts = np.maximum(2, np.ceil(lengths / spacing)).astype(int)
+        link_ids = np.repeat(np.arange(len(counts)), counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        t = (np.arange(len(link_ids)) - starts) / \
+            (counts[link_ids] - 1.0)
+        t = t[:, np.newaxis]
+        points = (1 - t) ** 2 * src[link_ids] + 2 * (1 - t) * t * \
+                 ctrl[link_ids] + t ** 2 * dst[link_ids]
+
+        points = points.astype(int)
+        pixels = points[:, 1] * width + points[:, 0]
+        if len(layout.links) <= 4 * len(layout):
+            # Sparse topologies get 2 pixel wide lines
+            pixels = np.concatenate((pixels, pixels + 1, pixels + width))
+            link_ids = np.tile(link_ids, 3)
+        pixels = np.clip(pixels, 0, width * height - 1)
+
+        # Opacity of a pixel grows with the number of links crossing it,
+        # up to the density of the busiest pixels
+        density = np.bincount(pixels, minlength=width * height)
+        drawn = density > 0
+        busy = np.percentile(density[drawn], 95)
+        alpha = np.minimum(1.0, np.log1p(density[drawn]) / np.log1p(busy))
+        alpha = (0.35 + 0.65 * alpha)[:, np.newaxis]
+
+        if link_values is not None:
+            # Mean color index of the links crossing a pixel
+            index = quantize(link_values).astype(float)
+            total = np.bincount(pixels, weights=index[link_ids],
+                                minlength=width * height)
+            stroke = colors[(total[drawn] / density[drawn]).round()
+                            .astype(int)]
+        else:
+            stroke = np.array(LINK_STROKE, dtype=float)
+
+        image[drawn] = (1 - alpha) * image[drawn] + alpha * stroke
+
+    # Routers
+    centers = layout.transform(layout.positions, unit, margin).astype(int)
+    if router_values is not None:
+        fills = colors[quantize(router_values)]
+    else:
+        fills = np.tile(np.array(ROUTER_FILL, dtype=float), (len(layout), 1))
+
+    ((dy, dx), (oy, ox)) = discOffsets(radius)
+    for (offsets_y, offsets_x, color) in ((dy, dx, fills), (oy, ox, None)):
+        y = centers[:, 1][:, np.newaxis] + offsets_y
+        x = centers[:, 0][:, np.newaxis] + offsets_x
+        pixels = np.clip(y * width + x, 0, width * height - 1)
+        if color is None:
+            image[pixels.ravel()] = 0.0
+        else:
+            image[pixels.ravel()] = np.repeat(color, pixels.shape[1], axis=0)
+
+    writePngImage(png_file, image.reshape(height, width, 3).astype(np.uint8))
+
+## Write an RGB image array of shape (height, width, 3) as PNG
+def writePngImage(png_file, image):
+    (height, width) = image.shape[:2]
+
+    # Every scanline starts with filter type 0 (none)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + \
+               struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(png_file, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height,
+                                           8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
@@ -29,10 +29,20 @@
 # Modified by David Smelt for Garnet2.0
 
 
-import string, sys, subprocess, os, re
-from ConfigParser import ConfigParser
+import string, sys, subprocess, os, re, tempfile, hashlib, glob, json
+import traceback
+import cPickle as pickle
 from collections import Counter
 from math import sqrt
+from multiprocessing import Pool, cpu_count
+from optparse import OptionParser
+
+import numpy as np
+
+from garnetactivity import INJECTION_RATES, LinkActivity, RouterActivity
+from garnetconfig import NetworkTopology, readConfig
+from garnetdb import DSENT_RECORD_FILE
+from garnetstats import readStats
 
 # Compile DSENT to generate the Python module and then import it.
 # This script assumes it is executed from the gem5 root.
@@ -46,10 +56,12 @@ if not os.path.exists(build_dir):
     os.makedirs(build_dir)
 os.chdir(build_dir)
 
-error = call(['cmake', '../../../%s' % src_dir])
-if error:
-    print("Failed to run cmake")
-    exit(-1)
+# The generated Makefile reruns cmake itself when CMakeLists.txt changes
+if not os.path.isfile("Makefile"):
+    error = call(['cmake', '../../../%s' % src_dir])
+    if error:
+        print("Failed to run cmake")
+        exit(-1)
 
 error = call(['make'])
 if error:
@@ -61,6 +73,9 @@ os.chdir("../../../")
 sys.path.append("build/ext/dsent")
 import dsent
 
+# DSENT results cache, shared by all simulation output directories
+DEFAULT_CACHE_FILE = os.path.join(build_dir, "results_cache.pkl")
+
 ## Return assumed cpu core area based on limited existing die size models
 def getCoreAreaForCoreCount(num_cpus):
     scale_die_size = True
@@ -123,8 +138,8 @@ def getCoreAreaForCoreCount(num_cpus):
 # Parse gem5 config.ini file for the configuration parameters related to
 # the on-chip network.
 def parseConfig(config_file):
-    config = ConfigParser()
-    if not config.read(config_file):
+    config = readConfig(config_file)
+    if config is None:
         print("ERROR: config file '", config_file, "' not found")
         sys.exit(1)
 
@@ -154,31 +169,13 @@ def parseConfig(config_file):
     num_cpus = len(re.findall("cpu[0-9]+[0-9]*", children))
     assert(num_cpus > 0)
 
-    routers = config.get("system.ruby.network", "routers").split()
-    int_links = config.get("system.ruby.network", "int_links").split()
-    ext_links = config.get("system.ruby.network", "ext_links").split()
+    # Index routers, links and their clocks in a single pass
+    topology = NetworkTopology(config)
 
-    return (config, number_of_virtual_networks, vcs_per_vnet,
+    return (topology, number_of_virtual_networks, vcs_per_vnet,
             buffers_per_data_vc, buffers_per_control_vc, ni_flit_size_bits,
-            num_cpus, routers, int_links, ext_links)
-
-## For the given object return clock as int 
-def getClock(obj, config):
-    if config.get(obj, "type") == "SrcClockDomain":
-        clock = config.getint(obj, "clock")
-        if clock > 10:
-            # Clock defined in to num_ticks (=1e12) / frequency
-            return int((1000.0 / config.getint(obj, "clock")) * 1e9)
-        # Clock defined in GHz
-        return int(config.getint(obj, "clock") * 1e9)
-
-    if config.get(obj, "type") == "DerivedClockDomain":
-        source = config.get(obj, "clk_domain")
-        divider = config.getint(obj, "clk_divider")
-        return getClock(source, config)  / divider
-
-    source = config.get(obj, "clk_domain")
-    return getClock(source, config)
+            num_cpus, topology.routers, topology.int_links,
+            topology.ext_links)
 
 ## Return the key index of known result strings to order known result strings
 ## for more intuitive printing
@@ -194,130 +191,368 @@ def getResultKey(s):
             return i
     return -1
 
-## Overwrite a parameter in router/link config file
-def setConfigParameter(config_file, string, new_val):
-    try:
-        new_string = string + (" " * max(1, 40 - len(string)))
-        new_string += "= {0}".format(new_val)
-        command = ["sed", "-i", "s/{0}.*=.*/{1}/".format(string, new_string),
-                   config_file]
-
-        proc = subprocess.Popen(command)
-        proc.communicate()
-    except OSError:
-        pass
-
-## Compute the power consumed by the given int_links
-def computeIntLinkPower(num_cycles, int_wire_length, wire_delay_scale, int_links, stats_file,
-                        config, link_config_file, num_links=1e9):
-    results = []
-    injrate = getStatsForString(stats_file, "system.ruby.network.int_link_utilization")\
-                                / float(num_cycles) / len(int_links)
-
-    assert(injrate > 0.0)
-
-    for (i, link) in enumerate(int_links):
-        if i + 1 > num_links:
-            break
-
-        frequency = getClock(link + ".network_link", config)
-        
-        # Multiply wire length by 'latency' for FlattenedButterfly, which is
-        # set to the factored distance between routers
-        router_distance = config.getint(link, "latency")
-        wire_length = router_distance * int_wire_length
+## A single DSENT evaluation of a router or link model
+class DSENTTask(object):
+    def __init__(self, model, config_file, params, frequency, header,
+                 footer=None):
+        # "router" or "link"
+        self.model = model
+        self.config_file = config_file
+
+        # List of (parameter, value) overriding those in config_file
+        self.params = params
+        self.frequency = frequency
+        self.header = header
+        self.footer = footer
+
+## Run DSENT for a single router or link and return its outputs as dict
+def evaluateTask(task):
+    # The config file is only read once per process; parameters are
+    # overridden in memory
+    overrides = dict((param, "{0}".format(value))
+                     for (param, value) in task.params)
+    dsent.initialize(task.config_file, overrides)
+
+    if task.model == "router":
+        dsent_out = dsent.computeRouterPowerAndArea(task.frequency)
+    else:
+        dsent_out = dsent.computeLinkPower(task.frequency)
+
+    dsent.finalize()
+    return dict(dsent_out)
+
+## Run evaluateTask and return the text printed by DSENT along with the
+## outputs, such that it can be cached and printed in task order
+def evaluateTaskCaptured(task):
+    sys.stdout.flush()
+    with tempfile.TemporaryFile() as tmp:
+        saved_stdout = os.dup(1)
+        os.dup2(tmp.fileno(), 1)
+        try:
+            result = evaluateTask(task)
+            sys.stdout.flush()
+        finally:
+            os.dup2(saved_stdout, 1)
+            os.close(saved_stdout)
+
+        tmp.seek(0)
+        return (tmp.read(), result)
+
+# Config parameters naming the technology model files DSENT reads
+TECH_MODEL_PARAMS = ("ElectricalTechModelFilename", "PhotonicTechModelFilename")
+
+## Return the sha1 of the contents of file path
+def fileHash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+## Return the technology model files a DSENT config file refers to, as
+## {parameter: file name}
+def readTechModelFiles(config_file):
+    files = {}
+    with open(config_file, "rt") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            if "=" not in line:
+                continue
+            (param, value) = line.split("=", 1)
+            if param.strip() in TECH_MODEL_PARAMS:
+                files[param.strip()] = value.strip()
+    return files
+
+## Cache of DSENT outputs, keyed by the exact model inputs: the base config
+## file contents, the technology model files it refers to, the overridden
+## parameters, the frequency and the built DSENT module
+class DSENTCache(object):
+    def __init__(self, cache_file=None, rate_digits=None):
+        # Persistent cache file shared by all simulation output directories
+        self.cache_file = cache_file
+
+        # Optionally round injection rates to this many significant digits,
+        # such that nearly identical routers and links share one evaluation
+        self.rate_digits = rate_digits
+
+        self.results = {}
+        self.new_results = {}
+        # File name -> sha1 of its contents, for the config and
+        # technology model files
+        self.file_hashes = {}
+        self.tech_model_files = {}
+        self.module_hash = fileHash(dsent.__file__)
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_file is not None and os.path.exists(self.cache_file):
+            self.results = self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, "rb") as f:
+                return pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError):
+            print("WARNING: ignoring unreadable DSENT cache file %s" % self.cache_file)
+            return {}
+
+    def save(self):
+        if self.cache_file is None or not self.new_results:
+            return
+
+        # Merge with results saved by concurrent runs in the meantime
+        results = {}
+        if os.path.exists(self.cache_file):
+            results = self.load()
+        results.update(self.new_results)
+
+        cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        (fd, tmp_file) = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(results, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_file, self.cache_file)
+
+        self.results = results
+        self.new_results = {}
+
+    def quantize(self, task):
+        if self.rate_digits is None:
+            return
+
+        task.params = [(param, float("%.*g" % (self.rate_digits, value)))
+                       if param.endswith("InjectionRate") else (param, value)
+                       for (param, value) in task.params]
+
+    def fileHash(self, path):
+        file_hash = self.file_hashes.get(path)
+        if file_hash is None:
+            file_hash = fileHash(path)
+            self.file_hashes[path] = file_hash
+        return file_hash
+
+    def key(self, task):
+        tech_models = self.tech_model_files.get(task.config_file)
+        if tech_models is None:
+            tech_models = readTechModelFiles(task.config_file)
+            self.tech_model_files[task.config_file] = tech_models
+
+        # Overridden technology model files are read instead
+        tech_models = dict(tech_models)
+        tech_models.update((param, str(value)) for (param, value)
+                           in task.params if param in TECH_MODEL_PARAMS)
+        tech_hashes = tuple(self.fileHash(tech_models[param])
+                            for param in sorted(tech_models))
+
+        return (task.model, self.fileHash(task.config_file), tech_hashes,
+                self.module_hash, tuple(task.params), int(task.frequency))
+
+    def get(self, key):
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+        return None
+
+    def put(self, key, value):
+        self.misses += 1
+        self.results[key] = value
+        self.new_results[key] = value
+
+## Evaluates DSENTTasks, in parallel if a worker pool is given, and looks up
+## or stores their outputs in an optional DSENTCache
+class DSENTEvaluator(object):
+    def __init__(self, pool=None, cache=None):
+        self.pool = pool
+        self.cache = cache
+
+    ## Return the outputs of the given DSENTTasks in task order
+    def evaluate(self, tasks):
+        if self.cache is None:
+            keys = range(len(tasks))
+            outputs = {}
+        else:
+            for task in tasks:
+                self.cache.quantize(task)
+            keys = [self.cache.key(task) for task in tasks]
+            outputs = dict((key, self.cache.get(key)) for key in set(keys))
+
+        # Evaluate each distinct uncached set of model inputs once
+        todo = []
+        for (key, task) in zip(keys, tasks):
+            if outputs.get(key) is None:
+                outputs[key] = True
+                todo.append((key, task))
+
+        if self.pool is None:
+            evaluated = map(evaluateTaskCaptured, [t for (k, t) in todo])
+        else:
+            evaluated = self.pool.map(evaluateTaskCaptured,
+                                      [t for (k, t) in todo], chunksize=4)
+
+        for ((key, task), output) in zip(todo, evaluated):
+            outputs[key] = output
+            if self.cache is not None:
+                self.cache.put(key, output)
+
+        results = []
+        for (key, task) in zip(keys, tasks):
+            (text, result) = outputs[key]
+            print(task.header)
+            sys.stdout.write(text)
+            results.append(result)
+            if task.footer is not None:
+                print(task.footer)
+
+        return results
+
+## Group links into bins of equal wire length, frequency and injection
+## rate bucket. Injection rates are divided into num_bins buckets of equal
+## width up to the highest rate; num_bins = 0 puts every link in its own
+## bin. DSENT link dynamic power is linear in the injection rate, so a bin
+## is evaluated at the mean rate of its links.
+## Returns a list of (link indices, mean injection rate), one per bin
+def binLinks(rates, wire_lengths, frequencies, num_bins):
+    rates = np.asarray(rates, dtype=float)
+    if num_bins <= 0 or not len(rates):
+        return [([i], rate) for (i, rate) in enumerate(rates.tolist())]
+
+    width = rates.max() / num_bins
+    if width > 0.0:
+        buckets = np.minimum((rates / width).astype(int), num_bins - 1)
+    else:
+        buckets = np.zeros(len(rates), dtype=int)
+
+    keys = np.column_stack((wire_lengths, frequencies, buckets))
+    (unique, inverse) = np.unique(keys, axis=0, return_inverse=True)
+    counts = np.bincount(inverse)
+    sums = np.bincount(inverse, weights=rates)
+
+    # Link indices per bin, in link order
+    order = np.argsort(inverse, kind="mergesort")
+    groups = np.split(order, np.cumsum(counts)[:-1])
+    return [(indices.tolist(), sums[b] / counts[b])
+            for (b, indices) in enumerate(groups)]
+
+## Compute the power consumed by the given int_links. Injection rates are
+## taken per link from activity (a LinkActivity) if given, or else the
+## network-wide average is used for every link. Returns a list of
+## (number of links, DSENT outputs per link), one per bin of links
+def computeIntLinkPower(num_cycles, int_wire_length, wire_delay_scale, int_links, stats,
+                        topology, link_config_file, num_links=1e9, evaluator=None,
+                        activity=None, link_bins=0):
+    num_links = int(min(len(int_links), num_links))
+
+    if activity is not None:
+        rates = activity.int_flits[:num_links] / float(num_cycles)
+    else:
+        injrate = stats.get("system.ruby.network.int_link_utilization")\
+                      / float(num_cycles) / len(int_links)
+
+        assert(injrate > 0.0)
+        rates = [injrate] * num_links
+
+    # Multiply wire length by 'latency' for FlattenedButterfly, which is
+    # set to the factored distance between routers
+    wire_lengths = [router_distance * int_wire_length for router_distance
+                    in topology.int_link_latency[:num_links]]
+    frequencies = topology.int_link_clocks[:num_links]
+
+    tasks = []
+    counts = []
+    for (indices, injrate) in binLinks(rates, wire_lengths, frequencies,
+                                       link_bins):
+        i = indices[0]
+        link = int_links[i]
+        wire_length = wire_lengths[i]
 
         # Calculate wire delay. wire_length is in meters and wire_delay_scale is in ns/mm
         # => multiply their product by 1e-6 to get the delay in seconds
         wire_delay = wire_length * wire_delay_scale * 1e-6
 
-        # Set injection rate, and wire length and wire delay in link config file
-        setConfigParameter(link_config_file, "InjectionRate", injrate)
-        setConfigParameter(link_config_file, "WireLength", wire_length)
-        setConfigParameter(link_config_file, "Delay", wire_delay)
-        
-        # Calculate and set delay in link config file
-
-        dsent.initialize(link_config_file)
-
+        footer = None
         if num_links == 1:
-            print("\nSingle int_link power:")
+            header = "\nSingle int_link power:"
+        elif link_bins <= 0:
+            header = "\n%s.network_link power: " % link
+            footer = "%s.network_link wire length: %f mm" % (link, wire_length * 1000)
         else:
-            print("\n%s.network_link power: " % link)
-
-        dsent_out = dsent.computeLinkPower(frequency)
-        results.append(dict(dsent_out))
-
-        print("%s.network_link wire length: %f mm" % (link, wire_length * 1000))
-
-        dsent.finalize()
-
-    return results
-
-## Compute the power consumed by the given ext_links
-def computeExtLinkPower(num_cycles, ext_wire_length, wire_delay_scale, ext_links, stats_file,
-                        config, link_config_file, num_links=1e9):
-    results = []
-    single_link_utilization = getStatsForString(stats_file, "system.ruby.network.ext_in_link_utilization")
-    single_link_utilization += getStatsForString(stats_file, "system.ruby.network.ext_out_link_utilization")
-    injrate = single_link_utilization / float(num_cycles) / (len(ext_links) * 2)
-
-    assert(injrate > 0.0)
+            header = "\n%d int_links of %f mm at injection rate %f, power " \
+                     "per link:" % (len(indices), wire_length * 1000, injrate)
 
-    i = 1
-    for link in ext_links:
-        if i > num_links:
-            break
-
-        frequency = getClock(link + ".network_links0", config)
-        delay = config.getint(link, "latency")
-
-        # Calculate wire delay. wire_length is in meters and wire_delay_scale is in ns/mm
-        # => multiply their product by 1e-6 to get the delay in seconds
-        wire_delay = ext_wire_length * wire_delay_scale * 1e-6
-    
         # Set injection rate, and wire length and wire delay in link config file
-        setConfigParameter(link_config_file, "InjectionRate", injrate)
-        setConfigParameter(link_config_file, "WireLength", ext_wire_length)
-        setConfigParameter(link_config_file, "Delay", wire_delay)
-
-        dsent.initialize(link_config_file)
-
+        tasks.append(DSENTTask("link", link_config_file,
+                               [("InjectionRate", injrate),
+                                ("WireLength", wire_length),
+                                ("Delay", wire_delay)],
+                               frequencies[i], header, footer))
+        counts.append(len(indices))
+
+    return zip(counts, (evaluator or DSENTEvaluator()).evaluate(tasks))
+
+## Compute the power consumed by the given ext_links, with injection rates
+## as in computeIntLinkPower()
+def computeExtLinkPower(num_cycles, ext_wire_length, wire_delay_scale, ext_links, stats,
+                        topology, link_config_file, num_links=1e9, evaluator=None,
+                        activity=None, link_bins=0):
+    # ext_links are defined bidirectionally
+    names = []
+    rates = []
+    frequencies = []
+    for (i, (link, clocks)) in enumerate(zip(ext_links, topology.ext_link_clocks)):
+        for (direction, frequency) in zip(("network_links0", "network_links1"),
+                                          clocks):
+            names.append("%s.%s" % (link, direction))
+            frequencies.append(frequency)
+            if activity is not None:
+                flits = activity.ext_in_flits[i] if direction == "network_links0" \
+                        else activity.ext_out_flits[i]
+                rates.append(flits / float(num_cycles))
+
+    num_links = int(min(len(names), num_links))
+    if activity is None:
+        single_link_utilization = stats.get("system.ruby.network.ext_in_link_utilization")
+        single_link_utilization += stats.get("system.ruby.network.ext_out_link_utilization")
+        injrate = single_link_utilization / float(num_cycles) / (len(ext_links) * 2)
+
+        assert(injrate > 0.0)
+        rates = [injrate] * num_links
+
+    # Calculate wire delay. wire_length is in meters and wire_delay_scale is in ns/mm
+    # => multiply their product by 1e-6 to get the delay in seconds
+    wire_delay = ext_wire_length * wire_delay_scale * 1e-6
+
+    tasks = []
+    counts = []
+    for (indices, injrate) in binLinks(rates[:num_links],
+                                       [ext_wire_length] * num_links,
+                                       frequencies[:num_links], link_bins):
+        i = indices[0]
+
+        footer = None
         if num_links == 1:
-            print("\nSingle ext_link power:")
+            header = "\nSingle ext_link power:"
+        elif link_bins <= 0:
+            header = "\n%s power: " % names[i]
+            footer = "%s wire length: %f mm" % (names[i], ext_wire_length * 1000)
         else:
-            print("\n%s.network_links0 power: " % link)
+            header = "\n%d ext_links of %f mm at injection rate %f, power " \
+                     "per link:" % (len(indices), ext_wire_length * 1000, injrate)
 
-        dsent_out = dsent.computeLinkPower(frequency)
-        results.append(dict(dsent_out))
-
-        print("%s.network_links0 wire length: %f mm" % (link, ext_wire_length * 1000))
-
-        dsent.finalize()
-        dsent.initialize(link_config_file)
-
-        i += 1
-        if i > num_links:
-            break
-
-        frequency = getClock(link + ".network_links1", config)
-        print("\n%s.network_links1 power: " % link)
-
-        dsent_out = dsent.computeLinkPower(frequency)
-        results.append(dict(dsent_out))
-
-        print("%s.network_links1 wire length: %f mm" % (link, ext_wire_length * 1000))
-
-        dsent.finalize()
-        i += 1
+        # Set injection rate, and wire length and wire delay in link config file
+        tasks.append(DSENTTask("link", link_config_file,
+                               [("InjectionRate", injrate),
+                                ("WireLength", ext_wire_length),
+                                ("Delay", wire_delay)],
+                               frequencies[i], header, footer))
+        counts.append(len(indices))
 
-    return results
+    return zip(counts, (evaluator or DSENTEvaluator()).evaluate(tasks))
 
-## Compute total link power consumption, assuming that each link has a power
-## model equal to single_link_power
+## Compute total link power consumption, weighting the power of each bin of
+## links by the number of links in it
 def computeTotalLinkPower(num_cycles, num_cpus, num_routers, int_wire_length,
                           ext_wire_length, int_links, ext_links,
-                          stats_file, config, link_config_file):
+                          stats, topology, link_config_file, evaluator=None,
+                          link_bins=0):
 
     # Set wire delay factor according to ITRS projections
     wire_delay_proj = "ITRS projected estimated wire delay for 14 nm CMOS: 1.0 ns/mm"
@@ -329,15 +564,25 @@ def computeTotalLinkPower(num_cycles, num_cpus, num_routers, int_wire_length,
 
     print("\nUsing " + wire_delay_proj)
 
+    # Use the measured injection rate of every link if stats.txt holds
+    # per-link statistics
+    activity = LinkActivity(stats, topology)
+    if not activity.hasStats():
+        print("\nNo per-link statistics, using the average injection rate "
+              "for all links")
+        activity = None
+
     # Compute the power consumed by for each int_link
     int_dsent_out = computeIntLinkPower(num_cycles, int_wire_length, wire_delay_scale,
-                                        int_links, stats_file, config,
-                                        link_config_file)
+                                        int_links, stats, topology,
+                                        link_config_file, evaluator=evaluator,
+                                        activity=activity, link_bins=link_bins)
 
     # Compute the power consumed by for each ext_link
     ext_dsent_out = computeExtLinkPower(num_cycles, ext_wire_length, wire_delay_scale,
-                                        ext_links, stats_file, config,
-                                        link_config_file)
+                                        ext_links, stats, topology,
+                                        link_config_file, evaluator=evaluator,
+                                        activity=activity, link_bins=link_bins)
 
     # int_links are defined unidirectionally, ext_links bidirectionally
     int_num_links = len(int_links)
@@ -349,21 +594,25 @@ def computeTotalLinkPower(num_cycles, num_cpus, num_routers, int_wire_length,
     ext_dynamic = 0.0
     ext_leakage = 0.0
 
-    # Calculate total int_link power consumption
+    # Calculate total int_link power consumption, weighted by the number
+    # of links per bin
     int_sum = Counter()
-    for d in int_dsent_out:
-        int_sum.update(d)
+    for (count, d) in int_dsent_out:
+        int_sum.update(dict((k, count * v) for (k, v) in d.iteritems()))
     int_sum = dict(int_sum)
 
     # Calculate total ext_link power consumption
     ext_sum = Counter()
-    for d in ext_dsent_out:
-        ext_sum.update(d)
+    for (count, d) in ext_dsent_out:
+        ext_sum.update(dict((k, count * v) for (k, v) in d.iteritems()))
     ext_sum = dict(ext_sum)
 
     print("\nTotal number of links: %d" % total_num_links)
     print("                       %d bidirectional int_links" % (int_num_links / 2))
     print("                       %d bidirectional ext_links" % (ext_num_links / 2))
+    if link_bins > 0:
+        print("                       evaluated in %d bins" % \
+              (len(int_dsent_out) + len(ext_dsent_out)))
 
     # Get dynamic and leakage total power consumptions
     for k, v in int_sum.iteritems():
@@ -392,75 +641,52 @@ def computeTotalLinkPower(num_cycles, num_cpus, num_routers, int_wire_length,
     print("    Dynamic power: %f" % total_dynamic)
     print("    Leakage power: %f" % total_leakage)
 
-    return (total_dynamic, total_leakage)
+    link_power = {}
+    for (section, dynamic, leakage) in \
+            (("int_links", int_dynamic, int_leakage),
+             ("ext_links", ext_dynamic, ext_leakage),
+             ("links", total_dynamic, total_leakage)):
+        link_power[section + "/Dynamic power"] = dynamic
+        link_power[section + "/Leakage power"] = leakage
+
+    return (total_dynamic, total_leakage, link_power)
 
 ## Compute the power and area used for all routers and the CPU die area
-def computeRouterPowerAndArea(routers, stats_file, config, router_config_file,
-                              int_links, ext_links, num_cycles, num_cpus):
-    results = []
+def computeRouterPowerAndArea(routers, stats, topology, router_config_file,
+                              int_links, ext_links, num_cycles, num_cpus,
+                              evaluator=None):
+    tasks = []
     num_keys = 15
     sum_strings = [""] * num_keys
     avg_strings = [""] * num_keys
-
-    for router in routers:
-        frequency = getClock(router, config)
-
-        # Count number of ports to int_links for this router
-        int_nports = 0
-        for int_link in int_links:
-
-            # int_links are defined unidirectionally
-            if config.get(int_link, "src_node") == router:
-                int_nports += 1
-            if config.get(int_link, "dst_node") == router:
-                int_nports += 1
-
-        # Count number of ports to ext_links for this router
-        ext_nports = 0
-        for ext_link in ext_links:
-            if config.get(ext_link, "int_node") == router:
-
-                # ext_links are defined bidirectionally
-                ext_nports += 2
-
-        # All ports are bidirectional
-        nports = int_nports + ext_nports
-
-        # Set port amounts in router config file
-        setConfigParameter(router_config_file, "NumberInputPorts", int_nports)
-        setConfigParameter(router_config_file, "NumberOutputPorts", ext_nports)
-
-        buf_activity_rd = getStatsForString(stats_file, router + ".buffer_reads")
-        buf_activity_wr = getStatsForString(stats_file, router + ".buffer_writes")
-        xbar_activity   = getStatsForString(stats_file, router + ".crossbar_activity")
-        sw_activity_in  = getStatsForString(stats_file, router + ".sw_input_arbiter_activity")
-        sw_activity_out = getStatsForString(stats_file, router + ".sw_output_arbiter_activity")
-
-        # Calculate injection (number of flits per cycle per port)
-        # for this router, based on stats
-        buf_rd_injrate  = ext_nports * buf_activity_rd / float(num_cycles) / int_nports
-        buf_wr_injrate  = ext_nports * buf_activity_wr / float(num_cycles) / int_nports
-        xbar_injrate    = ext_nports * xbar_activity / float(num_cycles) / int_nports
-        sa_injrate      = ext_nports * sw_activity_out / float(num_cycles) / int_nports
-        
-        # Set injection rates in router config file
-        setConfigParameter(router_config_file, "BufRdInjectionRate", buf_rd_injrate)
-        setConfigParameter(router_config_file, "BufWrInjectionRate", buf_wr_injrate)
-        setConfigParameter(router_config_file, "XbarInjectionRate", xbar_injrate)
-        setConfigParameter(router_config_file, "SAInjectionRate", sa_injrate)
-
-        # Initialize DSENT with router config file
-        dsent.initialize(router_config_file)
-
-        # Print results, overwriting relevant parameters, for this router
-        print("\n%s:" % router)
-
-        # Run DSENT
-        dsent_out = dsent.computeRouterPowerAndArea(frequency)
-        results.append(dict(dsent_out))
-
-        # Finalize DSENT
-        dsent.finalize()
+    config = topology.config
+
+    # Injection rates (number of flits per cycle per port) of all routers,
+    # based on stats
+    activity = RouterActivity(stats, routers)
+    injrates = activity.injectionRates(num_cycles, topology.int_ports,
+                                       topology.ext_ports)
+    injrates = dict((param, rates.tolist())
+                    for (param, rates) in injrates.iteritems())
+
+    for (i, router) in enumerate(routers):
+        frequency = topology.router_clocks[i]
+
+        # Number of ports to int_links and ext_links for this router, as
+        # counted by NetworkTopology
+        int_nports = topology.int_ports[i]
+        ext_nports = topology.ext_ports[i]
+
+        # Set port amounts and injection rates in router config file
+        tasks.append(DSENTTask("router", router_config_file,
+                               [("NumberInputPorts", int_nports),
+                                ("NumberOutputPorts", ext_nports)] +
+                               [(param, injrates[param][i])
+                                for (param, counter) in INJECTION_RATES],
+                               frequency, "\n%s:" % router))
+
+    # Run DSENT for all routers
+    results = (evaluator or DSENTEvaluator()).evaluate(tasks)
 
     # Calculate sum for all routers
     result_sum = Counter()
@@ -536,53 +762,42 @@ def computeRouterPowerAndArea(routers, stats_file, config, router_config_file,
     print("\tTotal core area excluding uncore and NoC: {0:f} mm^2".format(\
         num_cpus * core_area * 1e6))
     print("\tTotal CPU die area: {0:f} mm^2".format(die_area * 1e6))
-    
-    return (result_sum, int_wire_length, ext_wire_length)
 
-## Parse stats.txt for the specified key and return the associated value as float
-def getStatsForString(stats_file, key):
-    with open(stats_file, "rt") as f:
-        for line in f:
-            if key in line:
-
-                # Remove comments
-                comment_pos = line.find("#")
-                if comment_pos > -1:
-                    line = line[0:comment_pos]
-
-                # Return last column as float
-                split = line.split()
-                return float(split[-1])
-    return 0.0
-
-## Parse gem5 stats.txt file
-def parseStats(stats_file, config, router_config_file, link_config_file,
-               routers, int_links, ext_links, num_cpus):
-
-    # Get number of cycles for SE/FE simulation
-    num_cycles = getStatsForString(stats_file, "system.cpu0.numCycles")
-    if num_cycles == 0.0:
-        num_cycles = getStatsForString(stats_file, "system.cpu00.numCycles")
-    if num_cycles == 0.0:
-        num_cycles = getStatsForString(stats_file, "system.cpu000.numCycles")
-    if num_cycles == 0.0:
-        num_cycles = getStatsForString(stats_file, "system.cpu000.numCycles")
-
-    # Get number of cycles for Garnet_standalone simulation
-    if num_cycles == 0.0:
-        num_cycles = getStatsForString(stats_file, "sim_ticks")
+    # Areas in mm^2, named as printed above
+    die = {"die/Die area": model_die_size,
+           "die/Approximated core area": model_core_size,
+           "die/Scaled core area of one CPU": core_area * 1e6,
+           "die/Total core area excluding uncore and NoC":
+               num_cpus * core_area * 1e6,
+           "die/Total CPU die area": die_area * 1e6}
+
+    return (result_sum, int_wire_length, ext_wire_length, die)
+
+## Parse gem5 stats.txt file and return the power and area totals as a dict
+## of "section/name" -> float, named as in util/garnetdb.py
+def parseStats(stats_file, topology, router_config_file, link_config_file,
+               routers, int_links, ext_links, num_cpus, evaluator=None,
+               link_bins=0):
+
+    # Read all statistics in a single pass
+    stats = readStats(stats_file)
+
+    # Get number of cycles for SE/FE or Garnet_standalone simulation
+    num_cycles = stats.getNumCycles()
 
     # Compute the power and area used by the routers
-    (routers_sum, int_wire_length, ext_wire_length) = \
-        computeRouterPowerAndArea(routers, stats_file, config, router_config_file,
-                                    int_links, ext_links, num_cycles, num_cpus)
+    (routers_sum, int_wire_length, ext_wire_length, die) = \
+        computeRouterPowerAndArea(routers, stats, topology, router_config_file,
+                                    int_links, ext_links, num_cycles, num_cpus,
+                                    evaluator)
 
     # Compute total link power consumption
-    (link_dynamic, link_leakage) = \
+    (link_dynamic, link_leakage, link_power) = \
         computeTotalLinkPower(num_cycles, num_cpus, len(routers),
                               int_wire_length, ext_wire_length,
                               int_links, ext_links,
-                              stats_file, config, link_config_file)
+                              stats, topology, link_config_file, evaluator,
+                              link_bins)
 
     # Calculate sum power for all routers + links
     router_dynamic = 0.0
@@ -597,38 +812,184 @@ def parseStats(stats_file, config, router_config_file, link_config_file,
     print("    Dynamic power: %f" % (router_dynamic + link_dynamic))
     print("    Leakage power: %f" % (router_leakage + link_leakage))
 
+    # DSENT result names end in ": "
+    record = dict(("routers/" + k.rstrip(": "), v)
+                  for (k, v) in routers_sum.iteritems())
+    record.update(link_power)
+    record.update(die)
+    record["total/Dynamic power"] = router_dynamic + link_dynamic
+    record["total/Leakage power"] = router_leakage + link_leakage
+    return record
+
+## Compute the power and area of simulation directory outdir with DSENT and
+## write them to outdir/dsent_power.json
+def processOutdir(outdir, router_cfg, link_cfg, evaluator=None, link_bins=0):
+    cfg_str = os.path.join(outdir, "config.ini")
+    if not os.path.isfile(cfg_str):
+        # Fall back to the JSON configuration
+        cfg_str = os.path.join(outdir, "config.json")
+    stats_str = os.path.join(outdir, "stats.txt")
+
+    (topology, number_of_virtual_networks, vcs_per_vnet, buffers_per_data_vc,
+     buffers_per_control_vc, ni_flit_size_bits, num_cpus,
+     routers, int_links, ext_links) = parseConfig(cfg_str)
+
+    record = parseStats(stats_str, topology, router_cfg, link_cfg, routers,
+                        int_links, ext_links, num_cpus, evaluator, link_bins)
+
+    with open(os.path.join(outdir, DSENT_RECORD_FILE), "w") as f:
+        json.dump(record, f, indent=1, sort_keys=True)
+
+## Return the directories matching the given directories or glob patterns,
+## in argument order and without duplicates
+def expandOutdirs(patterns):
+    outdirs = []
+    seen = set()
+    for pattern in patterns:
+        for outdir in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.abspath(outdir) not in seen:
+                seen.add(os.path.abspath(outdir))
+                outdirs.append(outdir)
+    return outdirs
+
+## Process simulation directories one after another with the same DSENT
+## module, worker pool and cache, writing the output of each to
+## <directory>/out_name. A directory that fails gets the error in its
+## out_name instead. Returns the number of failed directories
+def processBatch(outdirs, out_name, evaluator, link_bins):
+    num_failed = 0
+    for (i, outdir) in enumerate(outdirs):
+        if not os.path.isfile(os.path.join(outdir, "stats.txt")):
+            print("%s not found" % os.path.join(outdir, "stats.txt"))
+            continue
+
+        out_file = os.path.join(outdir, out_name)
+        print("[%d/%d] Writing DSENT power and area model to: %s" % \
+              (i + 1, len(outdirs), out_file))
+        sys.stdout.flush()
+
+        saved_stdout = sys.stdout
+        with open(out_file, "w") as f:
+            sys.stdout = f
+            try:
+                processOutdir(outdir, os.path.join(outdir, "router.cfg"),
+                              os.path.join(outdir, "electrical-link.cfg"),
+                              evaluator, link_bins)
+                ok = True
+            except SystemExit:
+                # parseConfig exits on directories without a Garnet network
+                ok = False
+            except Exception:
+                # E.g. malformed config.ini or stats.txt, or a failed
+                # assertion on the model inputs
+                traceback.print_exc(file=f)
+                ok = False
+            finally:
+                sys.stdout = saved_stdout
+
+        if not ok:
+            print("%s: failed, see %s" % (outdir, out_file))
+            num_failed += 1
+            # Do not leave the results of an earlier run behind
+            record_file = os.path.join(outdir, DSENT_RECORD_FILE)
+            if os.path.isfile(record_file):
+                os.remove(record_file)
+
+        # Keep the results of finished directories if interrupted
+        if evaluator.cache is not None:
+            evaluator.cache.save()
+
+    return num_failed
+
 # This script parses the config.ini and the stats.txt from a run and
 # generates the power and the area of the on-chip network using DSENT
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: %s <simulation directory> " \
-              "<router config file> <link config file>" % sys.argv[0])
-        print("If unspecified, <router config file> will default to " \
-              "<simulation directory>/router.cfg and")
-        print("<link config file> will default to " \
-              "<simulation directory>/electrical-link.cfg")
+    parser = OptionParser(usage="%prog [options] <simulation directory> "
+                                "[<router config file> <link config file>]\n"
+                                "       %prog [options] --batch "
+                                "<simulation directory or glob>...",
+                          description="If unspecified, <router config file> "
+                                      "will default to <simulation directory>/router.cfg "
+                                      "and <link config file> will default to "
+                                      "<simulation directory>/electrical-link.cfg")
+    parser.add_option("-j", "--jobs", type="int", default=1,
+                      help="number of worker processes evaluating routers "
+                           "and links with DSENT; 0 uses all cores "
+                           "[default: %default]")
+    parser.add_option("--cache-file", default=DEFAULT_CACHE_FILE,
+                      help="file in which DSENT results are cached across "
+                           "simulation output directories [default: %default]")
+    parser.add_option("--no-cache", action="store_true", default=False,
+                      help="always evaluate every router and link with DSENT")
+    parser.add_option("--rate-digits", type="int", default=None,
+                      help="round injection rates to this many significant "
+                           "digits to increase DSENT cache hits")
+    parser.add_option("--link-bins", type="int", default=0,
+                      help="bin links of equal wire length by injection rate "
+                           "into this many buckets and evaluate each bin once "
+                           "instead of printing every link, e.g. 16; 0 "
+                           "evaluates and prints every link [default: %default]")
+    parser.add_option("--batch", action="store_true", default=False,
+                      help="process every given simulation directory or glob "
+                           "pattern with one worker pool, each with its own "
+                           "router.cfg and electrical-link.cfg")
+    parser.add_option("--out-name", default="dsent_out.txt",
+                      help="file in each simulation directory to which "
+                           "--batch writes the DSENT output [default: %default]")
+    (options, args) = parser.parse_args()
+
+    if len(args) < 1:
+        parser.print_help()
         exit(2)
 
     print("WARNING: configuration files for DSENT and McPAT are separate. " \
           "Changes made to one are not reflected in the other.")
 
-    cfg_str = os.path.join(sys.argv[1], "config.ini")
-    stats_str = os.path.join(sys.argv[1], "stats.txt")
+    cache = None
+    if not options.no_cache:
+        cache = DSENTCache(options.cache_file, options.rate_digits)
 
-    (config, number_of_virtual_networks, vcs_per_vnet, buffers_per_data_vc,
-     buffers_per_control_vc, ni_flit_size_bits, num_cpus,
-     routers, int_links, ext_links) = parseConfig(cfg_str)
-
-    router_cfg = os.path.join(sys.argv[1], "router.cfg")
-    link_cfg = os.path.join(sys.argv[1], "electrical-link.cfg")
+    num_jobs = options.jobs if options.jobs > 0 else cpu_count()
+    pool = None
+    if num_jobs > 1:
+        # Each worker runs its own DSENT instance, which keeps its
+        # technology models loaded across all simulation directories
+        pool = Pool(num_jobs)
 
-    if len(sys.argv) > 2:
-        router_cfg = sys.argv[2]
-    if len(sys.argv) > 3:
-        link_cfg = sys.argv[3]
-
-    parseStats(stats_str, config, router_cfg, link_cfg, routers, int_links,
-               ext_links, num_cpus)
+    num_failed = 0
+    try:
+        evaluator = DSENTEvaluator(pool, cache)
+        if options.batch:
+            num_failed = processBatch(expandOutdirs(args), options.out_name,
+                                      evaluator, options.link_bins)
+        else:
+            router_cfg = os.path.join(args[0], "router.cfg")
+            link_cfg = os.path.join(args[0], "electrical-link.cfg")
+
+            if len(args) > 1:
+                router_cfg = args[1]
+            if len(args) > 2:
+                link_cfg = args[2]
+
+            processOutdir(args[0], router_cfg, link_cfg, evaluator,
+                          options.link_bins)
+        if pool is not None:
+            pool.close()
+    except:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
+
+        if cache is not None:
+            cache.save()
+            print("\nDSENT cache: %d hits, %d evaluations" % (cache.hits,
+                                                            cache.misses))
+
+    if num_failed:
+        exit(1)
 
 if __name__ == "__main__":
     main()